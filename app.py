@@ -1,5 +1,7 @@
 # -*- coding:utf-8 -*-
 import sys
+import atexit
+import argparse
 
 from checker import Display
 
@@ -7,8 +9,30 @@ if __name__ == "__main__":
     # if sys.version_info[0] < 3 or (sys.version_info[0] == 3 and sys.version_info[1] < 10):
     #     print(f"CRITICAL ERROR: Python version must be >= than 3.10")
     #     sys.exit(1)
+    parser = argparse.ArgumentParser(description="Site status checker")
+    parser.add_argument(
+        "--profile", nargs="?", const="profile.txt", metavar="PATH",
+        help="run one pass under cProfile and write the slowest stages and targets (default: profile.txt)"
+    )
+    parser.add_argument("--trace", metavar="PATH", help="write the spans of the checks to a Chrome trace file")
+    args = parser.parse_args()
+
     try:
         app = Display()
+        if args.profile:
+            from checker.profiler import PassProfiler
+
+            print(PassProfiler(app.worker, args.profile, trace_path=args.trace).run())
+            sys.exit(0)
+
+        if args.trace:
+            from checker.config import TRACE_BATCH, TRACE_FLUSH_INTERVAL, TRACE_MAX_EVENTS
+            from checker.units.tracing import Tracer, ChromeTraceSink
+
+            Tracer.get_instance().enable(
+                ChromeTraceSink(args.trace, TRACE_BATCH, TRACE_FLUSH_INTERVAL, TRACE_MAX_EVENTS)
+            )
+            atexit.register(Tracer.get_instance().disable)
         app.create_schedule()
 
     except Exception as e:
@@ -0,0 +1,250 @@
+# -*- coding:utf-8 -*-
+"""
+Check-pass benchmark against local stand-ins (see benchmarks/standins.py):
+generates target .csv files of the given sizes, runs a full pass of the worker
+over each of them in a fresh interpreter and measures the throughput,
+p50/p99 latency of the targets and the peak RSS. The results are saved as JSON
+and can be compared with the results of another commit
+
+python benchmarks/check_pass.py [--sizes 10,1000,10000] [--mode threads] [--workers 16]
+                                [--mix ok=85,error=5,slow=5,closed=4,blackhole=1]
+                                [--timeout 1] [--output FILE] [--compare FILE]
+
+The stand-ins listen on ports 80 and 443 of 127.0.1.x, so root (or CAP_NET_BIND_SERVICE) is required
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import standins  # noqa: E402
+
+
+def get_percentile(values: list[float], q: float) -> float:
+    r"""
+    Returns the q-th percentile of the values (nearest rank)
+
+    Parameters
+    ------------
+        values: list[float]
+            Sorted values
+        q: float
+            Percentile (0-100)
+
+    Returns
+    --------
+        Percentile (float)
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(q / 100 * len(values)) - 1))]
+
+
+def write_targets(path: str, rows: int, mix: dict[str, int]) -> None:
+    r"""
+    Writes the target .csv file (the kinds of the rows follow the mix in a fixed order)
+
+    Parameters
+    ------------
+        path: str
+            Path of the file
+        rows: int
+            The number of rows
+        mix: dict[str, int]
+            Kind of the stand-in -> weight
+
+    Returns
+    --------
+        None
+    """
+    pattern = [kind for kind, weight in mix.items() for _ in range(weight)]
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("Host;Ports\n")
+        for index in range(rows):
+            file.write("{0}-{1}.{2};{3}\n".format(
+                pattern[index % len(pattern)], index, standins.DOMAIN, "80,443" if index % 2 else ""
+            ))
+
+
+def run_pass(path: str, rows: int, mode: str, workers: int, timeout: float) -> dict:
+    r"""
+    Runs one pass of the worker over the file (in the current interpreter)
+
+    Parameters
+    ------------
+        path: str
+            Path of the target .csv file
+        rows: int
+            The number of rows of the file
+        mode: str
+            "sequential", "threads" or "async"
+        workers: int
+            The number of threads in the "threads" mode
+        timeout: float
+            Timeout of the requests and connects in seconds
+
+    Returns
+    --------
+        Results of the pass (dict)
+    """
+    import resource
+    from time import perf_counter
+
+    from checker import config
+
+    config.CONNECTIVITY_URL = "http://{0}/".format(standins.ADDRESSES["ok"])
+    standins.install_dns(rows)
+
+    from checker.units.tracing import Tracer, TraceSink
+    from checker.units.controller import Controller
+    from checker.units.asynccontroller import AsyncController
+    from checker.units.probe import HTTPProbe
+    from checker.sitestatuschecker import SiteStatusChecker
+    from checker.asyncsitestatuschecker import AsyncSiteStatusChecker
+
+    class CheckSink(TraceSink):
+        __slots__ = ("durations", )
+
+        def __init__(self) -> None:
+            self.durations = []
+
+        def emit(self, name: str, start: int, duration: int, tid: int, args: dict) -> None:
+            if name == "check":
+                self.durations.append(duration / 1000)
+
+    Controller.PROBE = HTTPProbe(timeout=timeout)
+    AsyncController.TIMEOUT = timeout
+    worker = AsyncSiteStatusChecker(path) if mode == "async" else SiteStatusChecker(path)
+    worker.IGNORE_ERRORS = True
+    worker.WORKERS = workers if mode == "threads" else 0
+
+    sink = CheckSink()
+    Tracer.get_instance().enable(sink)
+    start = perf_counter()
+    results = sum(1 for value in worker() if not isinstance(value, str))
+    elapsed = perf_counter() - start
+    Tracer.get_instance().disable()
+
+    durations = sorted(sink.durations)
+    return dict(
+        rows=rows,
+        results=results,
+        elapsed_s=round(elapsed, 3),
+        throughput=round(len(durations) / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(get_percentile(durations, 50), 3),
+        p99_ms=round(get_percentile(durations, 99), 3),
+        max_rss_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    )
+
+
+def get_commit() -> str:
+    r"""
+    Returns the current commit of the repository ("" if git is not available)
+
+    Returns
+    --------
+        Commit hash (str)
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: list[dict], previous_path: str) -> None:
+    r"""
+    Prints the change of the results against the results saved by another run
+
+    Parameters
+    ------------
+        current: list[dict]
+            Results of this run
+        previous_path: str
+            Path of the previous JSON file
+
+    Returns
+    --------
+        None
+    """
+    with open(previous_path, "r", encoding="utf-8") as file:
+        previous = {result["rows"]: result for result in json.load(file)["results"]}
+    for result in current:
+        before = previous.get(result["rows"])
+        if before is None:
+            continue
+        print("{0:>8} rows: {1}".format(result["rows"], "\t".join(
+            "{0} {1:+.1%}".format(key, result[key] / before[key] - 1) if before[key] else "{0} n/a".format(key)
+            for key in ("throughput", "p50_ms", "p99_ms", "max_rss_mb")
+        )))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000", help="numbers of rows of the targets (default: 10,1000,10000)")
+    parser.add_argument("--mode", choices=("sequential", "threads", "async"), default="threads",
+                        help="worker mode (default: threads)")
+    parser.add_argument("--workers", type=int, default=16, help="threads in the threads mode (default: 16)")
+    parser.add_argument("--mix", default="ok=85,error=5,slow=5,closed=4,blackhole=1",
+                        help="weights of the stand-in kinds (default: ok=85,error=5,slow=5,closed=4,blackhole=1)")
+    parser.add_argument("--delay", type=float, default=0.05, help="delay of the slow stand-in in seconds (default: 0.05)")
+    parser.add_argument("--timeout", type=float, default=1.0, help="request and connect timeout in seconds (default: 1)")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file of the results (default: benchmark.json)")
+    parser.add_argument("--compare", metavar="FILE", help="JSON file of a previous run to compare with")
+    parser.add_argument("--run", metavar="CSV", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_pass(args.run, args.rows, args.mode, args.workers, args.timeout)))
+        return 0
+
+    mix = {kind: int(weight) for kind, weight in (item.split("=") for item in args.mix.split(","))}
+    unknown = set(mix) - set(standins.ADDRESSES)
+    if unknown:
+        parser.error("unknown stand-in kinds: {0}".format(", ".join(sorted(unknown))))
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, **standins.start(directory, delay=args.delay))
+        for rows in (int(size) for size in args.sizes.split(",")):
+            path = os.path.join(directory, "targets-{0}.csv".format(rows))
+            write_targets(path, rows, mix)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", path, "--rows", str(rows), "--mode", args.mode,
+                 "--workers", str(args.workers), "--timeout", str(args.timeout)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+            print("{rows:>8} rows: {elapsed_s:>9.3f} s\t{throughput:>9.1f} targets/s\t"
+                  "p50 {p50_ms:.3f} ms\tp99 {p99_ms:.3f} ms\tpeak RSS {max_rss_mb:.1f} MB".format(**results[-1]))
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(dict(
+            commit=get_commit(),
+            date=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            python=sys.version.split()[0],
+            mode=args.mode,
+            workers=args.workers,
+            mix=mix,
+            delay=args.delay,
+            timeout=args.timeout,
+            results=results,
+        ), file, indent=4)
+    print("saved to {0}".format(args.output))
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
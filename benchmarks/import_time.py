@@ -0,0 +1,72 @@
+# -*- coding:utf-8 -*-
+"""
+Import-time benchmark: fails (exit code 1) when
+`python -X importtime -c "import checker"` goes over the budget
+
+python benchmarks/import_time.py [--budget MS] [--module NAME] [--runs N]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> tuple[float, list[tuple[int, str]]]:
+    r"""
+    Imports the module in a fresh interpreter with -X importtime
+
+    Parameters
+    ------------
+        module: str
+            Module to import
+
+    Returns
+    --------
+        Cumulative import time of the module in ms and the slowest
+        imports (cumulative us, name) (tuple[float, list[tuple[int, str]]])
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import {0}".format(module)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            imports.append((int(cumulative), name.rstrip()))
+
+    # the interpreter startup (site) is reported before the imports of the module
+    startup = [index for index, (_, name) in enumerate(imports) if name == " site"]
+    imports = imports[startup[-1] + 1:] if startup else imports
+
+    total = next(us for us, name in imports if name.strip() == module)
+    return total / 1000, sorted(imports, reverse=True)[:10]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=25.0, help="import time budget in ms (default: 25)")
+    parser.add_argument("--module", default="checker", help="module to import (default: checker)")
+    parser.add_argument("--runs", type=int, default=5, help="the best of N runs is compared (default: 5)")
+    args = parser.parse_args()
+
+    results = [measure(args.module) for _ in range(args.runs)]
+    best, slowest = min(results, key=lambda result: result[0])
+
+    print("import {0}: {1:.1f} ms (budget {2:.1f} ms)".format(args.module, best, args.budget))
+    for us, name in slowest:
+        print("  {0:>8.1f} ms  {1}".format(us / 1000, name))
+
+    if best > args.budget:
+        print("FAILED: import time is over the budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
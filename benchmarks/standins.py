@@ -0,0 +1,199 @@
+# -*- coding:utf-8 -*-
+"""
+Local stand-ins of the network services checked by the benchmarks
+
+Every kind of endpoint gets its own loopback address (127.0.1.x) with ports 80 and 443
+(binding them needs root or CAP_NET_BIND_SERVICE):
+
+    ok          HTTP 200 and HTTPS with a certificate of the local CA
+    error       HTTP 500 and HTTPS
+    slow        HTTP 200 and HTTPS after a delay
+    blackhole   connections are accepted and never answered
+    closed      nothing listens (connection refused)
+
+Host names (<kind>-<n>.bench.test) are mapped to the addresses by the DNS cache,
+so no resolver or hosts file is touched
+"""
+import os
+import ssl
+import time
+import socket
+import subprocess
+
+from threading import Thread
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DOMAIN = "bench.test"
+ADDRESSES = {
+    "ok": "127.0.1.1",
+    "error": "127.0.1.2",
+    "slow": "127.0.1.3",
+    "blackhole": "127.0.1.4",
+    "closed": "127.0.1.5",
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    r"""
+    Answers every request with the status of the server after its delay
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        time.sleep(self.server.delay)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_HEAD = do_GET
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    r"""
+    HTTP server of the stand-ins (resets by the clients are not reported)
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address) -> None:
+        pass
+
+
+def create_ca(directory: str) -> tuple[str, str, str]:
+    r"""
+    Creates a local CA and a certificate of *.bench.test signed by it (openssl is required)
+
+    Parameters
+    ------------
+        directory: str
+            Directory of the files
+
+    Returns
+    --------
+        Paths of the CA certificate, the server certificate and the server key (tuple[str, str, str])
+    """
+    ca, ca_key = os.path.join(directory, "ca.pem"), os.path.join(directory, "ca.key")
+    cert, key = os.path.join(directory, "server.pem"), os.path.join(directory, "server.key")
+    csr, ext = os.path.join(directory, "server.csr"), os.path.join(directory, "server.ext")
+
+    with open(ext, "w") as file:
+        file.write("subjectAltName=DNS:*.{0},DNS:{0}\n".format(DOMAIN))
+    for command in (
+        ["req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", ca_key, "-out", ca,
+         "-days", "1", "-subj", "/CN=bench-ca"],
+        ["req", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", csr, "-subj", "/CN=*.{0}".format(DOMAIN)],
+        ["x509", "-req", "-in", csr, "-CA", ca, "-CAkey", ca_key, "-CAcreateserial",
+         "-out", cert, "-days", "1", "-extfile", ext],
+    ):
+        subprocess.run(["openssl"] + command, check=True, capture_output=True)
+    return ca, cert, key
+
+
+def serve_http(address: str, port: int, status: int = 200, delay: float = 0, context=None) -> StandInServer:
+    r"""
+    Starts an HTTP (HTTPS with the context) stand-in in a daemon thread
+
+    Parameters
+    ------------
+        address: str
+            Address to listen on
+        port: int
+            Port to listen on
+        status: int
+            Status code of the responses
+        delay: float
+            Delay of the responses in seconds
+        context: Optional[ssl.SSLContext]
+            TLS context (None - plain HTTP)
+
+    Returns
+    --------
+        Server (StandInServer)
+    """
+    server = StandInServer((address, port), StandInHandler)
+    server.status, server.delay = status, delay
+    if context is not None:
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_blackhole(address: str, port: int) -> socket.socket:
+    r"""
+    Starts a listener that accepts connections and never answers
+
+    Parameters
+    ------------
+        address: str
+            Address to listen on
+        port: int
+            Port to listen on
+
+    Returns
+    --------
+        Listening socket (socket.socket)
+    """
+    listener = socket.create_server((address, port), backlog=1024)
+
+    def accept() -> None:
+        connections = []
+        while True:
+            connections.append(listener.accept()[0])
+
+    Thread(target=accept, daemon=True).start()
+    return listener
+
+
+def start(directory: str, delay: float = 0.05) -> dict[str, str]:
+    r"""
+    Starts all stand-ins
+
+    Parameters
+    ------------
+        directory: str
+            Directory of the CA files
+        delay: float
+            Delay of the slow endpoint in seconds
+
+    Returns
+    --------
+        Environment variables that make requests and ssl trust the local CA (dict[str, str])
+    """
+    ca, cert, key = create_ca(directory)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+
+    for kind, status, kind_delay in (("ok", 200, 0), ("error", 500, 0), ("slow", 200, delay)):
+        serve_http(ADDRESSES[kind], 80, status, kind_delay)
+        serve_http(ADDRESSES[kind], 443, status, kind_delay, context)
+    for port in (80, 443):
+        serve_blackhole(ADDRESSES["blackhole"], port)
+    return {"REQUESTS_CA_BUNDLE": ca, "SSL_CERT_FILE": ca}
+
+
+def install_dns(hosts: int) -> None:
+    r"""
+    Maps <kind>-<n>.bench.test (n < hosts) to the addresses of the stand-ins in the DNS cache
+
+    Parameters
+    ------------
+        hosts: int
+            The number of host names of every kind
+
+    Returns
+    --------
+        None
+    """
+    from checker.units.resolver import DNSCache
+
+    cache = DNSCache.get_instance()
+    cache.size = max(cache.size, hosts * len(ADDRESSES) * 2)
+    for kind, address in ADDRESSES.items():
+        for type in (0, socket.SOCK_STREAM):
+            answer = socket.getaddrinfo(address, None, socket.AF_INET, type)
+            for index in range(hosts):
+                cache.put(("{0}-{1}.{2}".format(kind, index, DOMAIN), 0, type), answer, ttl=86400)
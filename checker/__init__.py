@@ -18,15 +18,36 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-from checker.display import *
-from checker.sitestatuschecker import *
-from checker.units import *
+import importlib
 
 __version__ = "0.0.1pre"
 __title__ = 'SiteStatusChecker'
 __author__ = "Dmitry Filinov (D1ffic00lt)"
 __copyright__ = "Copyright 2022-2023 {}".format(__author__)
 __all__ = (
-    "Display", "SiteStatusChecker",
-    "controller", "exceptions", "reader"
-)
\ No newline at end of file
+    "Display", "SiteStatusChecker", "AsyncSiteStatusChecker",
+    "asynccontroller", "connectivity", "context", "controller", "exceptions", "flight", "metrics", "pinger", "probe",
+    "reader", "resolver", "result", "scanner", "timeouts", "tls", "tracing"
+)
+
+# heavy dependencies (requests, ping3, schedule) are imported on first use
+_LAZY_OBJECTS = {
+    "Display": "checker.display",
+    "SiteStatusChecker": "checker.sitestatuschecker",
+    "AsyncSiteStatusChecker": "checker.asyncsitestatuschecker",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_OBJECTS:
+        value = getattr(importlib.import_module(_LAZY_OBJECTS[name]), name)
+    elif name in __all__:
+        value = importlib.import_module("checker.units.{0}".format(name))
+    else:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
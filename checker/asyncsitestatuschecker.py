@@ -0,0 +1,265 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+
+from time import perf_counter
+from typing import Any, AsyncGenerator, Generator, Iterable, Optional
+
+from checker.sitestatuschecker import SiteStatusChecker
+from checker.units.asynccontroller import AsyncController
+from checker.units.context import PassContext
+from checker.units.exceptions import CheckTimeoutError
+from checker.units.flight import SingleFlight
+from checker.units.metrics import Metrics
+from checker.units.tracing import Tracer
+from checker.units.reader import CSVReader, ReadObject
+
+__all__ = (
+    "AsyncSiteStatusChecker",
+)
+
+class AsyncSiteStatusChecker(SiteStatusChecker):
+    r"""
+    SiteStatusChecker that runs the checks of all sites on one event loop
+    (results are returned in the order of completion)
+
+    CONCURRENCY: int = 64
+        the maximum number of sites checked at the same time
+
+    check_async(reader: ReadObject, context: PassContext) -> Any
+        Coroutine that checks one site and records the result (STORE and Metrics)
+    wait(pending: dict[asyncio.Task, ReadObject], deadline: Optional[float]) -> list[tuple[asyncio.Task, ReadObject]]
+        Waits for the first completed checks (until the deadline) and removes them from pending
+    expire(pending: dict[asyncio.Task, ReadObject]) -> list[tuple[ReadObject, CheckTimeoutError]]
+        Cancels the checks that are not completed before the end of the PASS_BUDGET
+    iter_checks_async(readers: Iterable[ReadObject], deadline: Optional[float] = None,
+                      flight: Optional[SingleFlight] = None) -> AsyncGenerator
+        Asynchronous generator of (site, result) of the checks
+    iter_checks(readers: Iterable[ReadObject], deadline: Optional[float] = None,
+                flight: Optional[SingleFlight] = None, timings: Optional[dict] = None) -> Generator
+        Checks the sites on a new event loop and yields (site, result)
+    run() -> AsyncGenerator
+        Asynchronous generator of the adapted results of the checks
+    __call__() -> Any
+        Calls one iteration of the worker
+    """
+    CONCURRENCY: int = 64
+
+    @Tracer.get_instance().span("check")
+    async def check_async(self, reader: ReadObject, context: PassContext) -> Any:
+        r"""
+        Coroutine that checks one site and records the result (STORE and Metrics)
+
+        Parameters
+        ------------
+            reader: ReadObject
+                site to check
+            context: PassContext
+                results of the batched stages
+
+        Returns
+        --------
+           Result of the controller (Any)
+        """
+        metrics = Metrics.get_instance()
+        metrics.enter()
+        controller = AsyncController(reader, context)
+        try:
+            result = await controller()
+        finally:
+            metrics.leave()
+        metrics.record(reader.host, result)
+        self.record(reader, result, controller.status_code)
+        return result
+
+    @staticmethod
+    async def wait(
+            pending: dict[asyncio.Task, ReadObject], deadline: Optional[float]
+    ) -> list[tuple[asyncio.Task, ReadObject]]:
+        r"""
+        Waits for the first completed checks (until the deadline) and removes them from pending
+
+        Parameters
+        ------------
+            pending: dict[asyncio.Task, ReadObject]
+                task of the check -> checked site
+            deadline: Optional[float]
+                perf_counter() value of the end of the pass budget (None - no budget)
+
+        Returns
+        --------
+           Completed tasks and their sites, empty if the deadline passed (list[tuple[asyncio.Task, ReadObject]])
+        """
+        timeout = None if deadline is None else max(deadline - perf_counter(), 0)
+        done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        return [(task, pending.pop(task)) for task in done]
+
+    async def expire(self, pending: dict[asyncio.Task, ReadObject]) -> list[tuple[ReadObject, CheckTimeoutError]]:
+        r"""
+        Cancels the checks that are not completed before the end of the PASS_BUDGET
+
+        Parameters
+        ------------
+            pending: dict[asyncio.Task, ReadObject]
+                task of the check -> checked site
+
+        Returns
+        --------
+           Sites of the cancelled checks and their errors (list[tuple[ReadObject, CheckTimeoutError]])
+        """
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        errors = [(reader, self.get_timeout_error(reader)) for reader in pending.values()]
+        pending.clear()
+        return errors
+
+    async def iter_checks_async(
+            self, readers: Iterable[ReadObject], deadline: Optional[float] = None,
+            flight: Optional[SingleFlight] = None
+    ) -> AsyncGenerator:
+        r"""
+        Asynchronous generator of (site, result) of the checks in the order of completion
+        (the sites that are not checked before the deadline are returned with CheckTimeoutError)
+
+        Parameters
+        ------------
+            readers: Iterable[ReadObject]
+                sites to check
+            deadline: Optional[float]
+                perf_counter() value of the end of the pass budget (None - no budget)
+            flight: Optional[SingleFlight]
+                probes shared by the checks (new for every batch by default)
+
+        Returns
+        --------
+           Asynchronous generator of (ReadObject, result of the controller) (AsyncGenerator)
+        """
+        batches = self.get_batches(deadline, flight, readers)
+        pending = {}
+        expired = False
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+
+            targets, context = batch
+            for reader in targets:
+                if expired:
+                    yield reader, self.get_timeout_error(reader)
+                    continue
+                pending[asyncio.ensure_future(self.check_async(reader, context))] = reader
+                if len(pending) < self.CONCURRENCY:
+                    continue
+
+                done = await self.wait(pending, deadline)
+                if not done:
+                    expired = True
+                    for timed_out, error in await self.expire(pending):
+                        yield timed_out, error
+                for task, checked in done:
+                    yield checked, task.result()
+
+        while pending:
+            done = await self.wait(pending, deadline)
+            if not done:
+                expired = True
+                for timed_out, error in await self.expire(pending):
+                    yield timed_out, error
+            for task, checked in done:
+                yield checked, task.result()
+
+        if expired and flight is not None:
+            flight.cancel()
+
+    def iter_checks(
+            self, readers: Iterable[ReadObject], deadline: Optional[float] = None,
+            flight: Optional[SingleFlight] = None, timings: Optional[dict] = None
+    ) -> Generator:
+        r"""
+        Checks the sites on a new event loop (CONCURRENCY at the same time) and yields (site, result)
+        in the order of completion, the sites that are not checked before the deadline
+        are returned with CheckTimeoutError
+
+        Parameters
+        ------------
+            readers: Iterable[ReadObject]
+                sites to check
+            deadline: Optional[float]
+                perf_counter() value of the end of the pass budget (None - no budget)
+            flight: Optional[SingleFlight]
+                probes shared by the checks (new for every batch by default)
+            timings: Optional[dict]
+                not used (the checks share one thread)
+
+        Returns
+        --------
+           Generator of (ReadObject, result of the controller) (Generator)
+        """
+        loop = asyncio.new_event_loop()
+        results = self.iter_checks_async(readers, deadline, flight)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    async def run(self) -> AsyncGenerator:
+        r"""
+        Asynchronous generator of the adapted results of the checks
+        (the sites that are not checked before the end of the PASS_BUDGET are returned as CheckTimeoutError),
+        the shared probes are counted by Metrics (ssc_probes_saved_total)
+
+        Returns
+        --------
+           Asynchronous generator of the results (AsyncGenerator)
+        """
+        async for _, result in self.iter_checks_async(CSVReader.__call__(self), self.get_deadline(), SingleFlight()):
+            worker = self.adapt(result)
+            if worker is not None:
+                yield worker
+
+    def __call__(self) -> Any:
+        r"""
+        Runs all iterations of the worker
+
+        Returns
+        --------
+           Returns the generator from the full cycle of the worker's execution (Any)
+        """
+        if (yield from self.get_input_errors()):
+            return
+
+        loop = asyncio.new_event_loop()
+        results = self.run()
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
@@ -0,0 +1,292 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import queue
+import atexit
+import argparse
+
+from threading import Thread
+from time import monotonic
+from typing import Any, Optional, TextIO
+
+from checker.policy import IntervalPolicy
+from checker.sitestatuschecker import SiteStatusChecker
+from checker.units.exceptions import SSCException, CSVReaderException, FileInvalidFormat
+from checker.units.result import CheckResult
+
+__all__ = (
+    "BatchRunner", "main"
+)
+
+class BatchRunner(object):
+    r"""
+    Non-interactive single pass of the worker with a wall-clock deadline
+    (for cron, CI health gates and batch jobs), the exit code summarises the pass:
+
+        0 - all sites are up
+        1 - at least one site failed (error or a port is not opened)
+        2 - the .csv file is invalid (or has invalid rows without --ignore-errors)
+        3 - the outcome of some sites is unknown (no internet connection), none failed
+        4 - the deadline passed before all sites were checked
+
+    worker: SiteStatusChecker
+        Worker of the pass
+    writer: Optional[NDJSONWriter]
+        NDJSON writer of the results (None - text to the stream)
+    stream: TextIO
+        Stream of the text results (stdout by default)
+    deadline: Optional[float]
+        Wall-clock limit of the pass in seconds (None - no limit)
+    counts: dict[str, int]
+        Outcome ("ok", "failed", "unknown") -> the number of sites
+
+    emit(value: Any) -> None
+        Outputs one value of the worker and counts its outcome
+    get_exit_code(input_error: bool, timed_out: bool) -> int
+        Returns the exit code of the pass
+    run() -> int
+        Runs the pass and returns the exit code
+    """
+    __slots__ = (
+        "worker", "writer", "stream", "deadline", "counts"
+    )
+    OK: int = 0
+    FAILED: int = 1
+    INPUT_ERROR: int = 2
+    UNKNOWN: int = 3
+    TIMEOUT: int = 4
+
+    def __init__(
+            self, worker: SiteStatusChecker, writer=None,
+            stream: Optional[TextIO] = None, deadline: Optional[float] = None
+    ) -> None:
+        self.worker = worker
+        self.writer = writer
+        self.stream = sys.stdout if stream is None else stream
+        self.deadline = deadline
+        self.counts = {"ok": 0, "failed": 0, "unknown": 0}
+
+    def emit(self, value: Any) -> None:
+        r"""
+        Outputs one value of the worker (results to the stream or the writer,
+        errors and info in the text format to stderr) and counts its outcome
+
+        Parameters
+        ------------
+            value: Any
+                Result of one site, error or text
+
+        Returns
+        --------
+            None
+        """
+        if value is None:
+            return
+        if isinstance(value, (CheckResult, list, SSCException)) and not isinstance(value, CSVReaderException):
+            outcome = IntervalPolicy.get_outcome(value)
+            self.counts["unknown" if outcome is None else "ok" if outcome else "failed"] += 1
+
+        if self.writer is not None:
+            self.writer.write(value)
+        elif isinstance(value, SSCException):
+            print("[{0}]: {1}".format("ERROR" if isinstance(value, CSVReaderException) else "WARNING", value), file=sys.stderr)
+        elif isinstance(value, str):
+            print("[INFO]: {0}".format(value), file=sys.stderr)
+        else:
+            self.stream.write("".join("{0}\n".format(output) for output in (value if isinstance(value, list) else [value])))
+
+    def get_exit_code(self, input_error: bool, timed_out: bool) -> int:
+        r"""
+        Returns the exit code of the pass
+
+        Parameters
+        ------------
+            input_error: bool
+                Whether the pass was stopped by an error of the .csv file
+            timed_out: bool
+                Whether the deadline passed
+
+        Returns
+        --------
+            Exit code (int)
+        """
+        if input_error:
+            return self.INPUT_ERROR
+        if timed_out:
+            return self.TIMEOUT
+        if self.counts["failed"]:
+            return self.FAILED
+        if self.counts["unknown"]:
+            return self.UNKNOWN
+        return self.OK
+
+    def run(self) -> int:
+        r"""
+        Runs the pass in a background thread and outputs its results until it ends or the deadline passes
+
+        Returns
+        --------
+            Exit code (int)
+        """
+        results = queue.Queue(maxsize=1024)
+        done = object()
+
+        def produce() -> None:
+            try:
+                for value in self.worker():
+                    results.put(value)
+            except Exception as ex:
+                results.put(ex)
+            finally:
+                results.put(done)
+
+        start = monotonic()
+        Thread(target=produce, name="batch-pass", daemon=True).start()
+
+        input_error = timed_out = False
+        while True:
+            timeout = None if self.deadline is None else self.deadline - (monotonic() - start)
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise queue.Empty
+                value = results.get(timeout=timeout)
+            except queue.Empty:
+                timed_out = True
+                break
+            if value is done:
+                break
+            if isinstance(value, Exception) and not isinstance(value, SSCException):
+                raise value
+            if isinstance(value, FileInvalidFormat) or (
+                    isinstance(value, CSVReaderException) and not self.worker.IGNORE_ERRORS
+            ):
+                input_error = True
+            self.emit(value)
+
+        if self.writer is not None:
+            self.writer.close()
+        self.stream.flush()
+        print(
+            "[INFO]: {0} sites checked in {1:.3f} s: {2} ok, {3} failed, {4} unknown{5}".format(
+                sum(self.counts.values()), monotonic() - start, self.counts["ok"], self.counts["failed"],
+                self.counts["unknown"], " (deadline passed)" if timed_out else ""
+            ), file=sys.stderr
+        )
+        return self.get_exit_code(input_error, timed_out)
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, repr(self.worker))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    r"""
+    Entry point of the batch mode (python -m checker FILE [options])
+
+    Parameters
+    ------------
+        argv: Optional[list[str]]
+            Command line arguments (sys.argv[1:] by default)
+
+    Returns
+    --------
+        Exit code (int)
+    """
+    from checker import config
+
+    parser = argparse.ArgumentParser(
+        prog="python -m checker", description="Checks every site of the .csv file once and exits "
+        "(0 - all sites are up, 1 - some failed, 2 - invalid file, 3 - no internet connection, 4 - deadline passed)"
+    )
+    parser.add_argument("file", help=".csv (or .csv.gz) file of the sites")
+    parser.add_argument("--ignore-errors", action="store_true", help="skip invalid rows of the file (IGNORE_ERRORS)")
+    parser.add_argument("--print-errors", action="store_true", help="print the invalid rows (YIELD_ERRORS)")
+    parser.add_argument("--concurrency", type=int,
+                        help="threads (or coroutines with --async) checking sites, 0 - one by one "
+                             "(default: WORKERS, CONCURRENCY with --async)")
+    parser.add_argument("--async", dest="use_async", action="store_true", default=config.ASYNC_MODE,
+                        help="check the sites on one event loop (default: ASYNC_MODE)")
+    parser.add_argument("--format", choices=("text", "ndjson"), default=config.OUTPUT_FORMAT,
+                        help="output format of the results (default: OUTPUT_FORMAT)")
+    parser.add_argument("--output", default="-", help="file of the results, - for stdout (default: -)")
+    parser.add_argument("--deadline", type=float, help="wall-clock limit of the pass in seconds")
+    parser.add_argument("--budget", type=float, default=config.PASS_BUDGET,
+                        help="time budget of the checks in seconds, unchecked sites are reported "
+                             "as timeouts (default: PASS_BUDGET)")
+    parser.add_argument("--shards", type=int, default=config.SHARD_PROCESSES,
+                        help="local processes the sites are split between (default: SHARD_PROCESSES)")
+    parser.add_argument("--nodes", default=",".join(config.SHARD_NODES),
+                        help="comma-separated addresses (host:port) of the remote shard servers (default: SHARD_NODES)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.file):
+        parser.error("file {0} does not exist".format(args.file))
+
+    concurrency = args.concurrency
+    if concurrency is None:
+        concurrency = config.CONCURRENCY if args.use_async else config.WORKERS
+
+    nodes = [node for node in args.nodes.split(",") if node]
+    if args.shards > 0 or nodes:
+        from checker.shard import ShardedSiteStatusChecker
+
+        worker = ShardedSiteStatusChecker(args.file)
+        worker.PROCESSES = args.shards
+        worker.NODES = nodes
+        worker.REPLICAS = config.SHARD_REPLICAS
+        worker.GRACE = config.SHARD_GRACE
+        worker.ASYNC = args.use_async
+        worker.WORKERS = concurrency
+        worker.CONCURRENCY = max(concurrency, 1)
+        atexit.register(worker.close)
+    elif args.use_async:
+        from checker.asyncsitestatuschecker import AsyncSiteStatusChecker
+
+        worker = AsyncSiteStatusChecker(args.file)
+        worker.CONCURRENCY = max(concurrency, 1)
+    else:
+        worker = SiteStatusChecker(args.file)
+        worker.WORKERS = concurrency
+        worker.KEEP_ORDER = config.KEEP_ORDER
+    worker.BATCH_SIZE = config.BATCH_SIZE
+    worker.MAX_IN_FLIGHT = config.MAX_IN_FLIGHT
+    worker.PASS_BUDGET = args.budget
+    worker.IGNORE_ERRORS = args.ignore_errors
+    worker.YIELD_ERRORS = args.print_errors
+
+    writer, stream = None, sys.stdout
+    if args.format == "ndjson":
+        from checker.writer import NDJSONWriter
+
+        writer = NDJSONWriter(args.output, batch=config.OUTPUT_BATCH, flush_interval=config.OUTPUT_FLUSH_INTERVAL)
+    elif args.output != "-":
+        stream = open(args.output, "a", encoding="utf-8")
+
+    try:
+        code = BatchRunner(worker, writer, stream, deadline=args.deadline).run()
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    if code == BatchRunner.TIMEOUT:
+        # checks that are still running are abandoned (the pool would wait for them at exit)
+        sys.stderr.flush()
+        os._exit(code)
+    return code
@@ -3,6 +3,84 @@ FORMAT = '[%(asctime)s] [%(levelname)s]: %(message)s'
 DATE_FORMAT = "[%Y-%m-%d %H:%M:%S]"
 LOG_PATH = "logs.log"
 
+ASYNC_MODE = False  # run the checks on the event loop (AsyncSiteStatusChecker)
+CONCURRENCY = 64  # the maximum number of sites checked at the same time in ASYNC_MODE
+WORKERS = 0  # the number of threads checking sites (0 - sites are checked one by one)
+KEEP_ORDER = True  # return the results of the threads in the order of the .csv file
+BATCH_SIZE = 1000  # the number of sites whose IP addresses are pinged and port-scanned together
+MAX_IN_FLIGHT = 512  # the maximum number of simultaneous connects of the port scan
+PLAN_CACHE_SIZE = 100000  # the maximum number of compiled .csv rows reused by the next passes
+
+SHARD_PROCESSES = 0  # the number of local shard processes of the batch mode (0 - the sites are checked in this process)
+SHARD_NODES = []  # addresses ("host:port") of the remote shard servers (python -m checker.shard)
+SHARD_REPLICAS = 100  # the number of points of every shard on the consistent hash ring
+SHARD_HOST = "127.0.0.1"  # address of the shard server
+SHARD_PORT = 9109  # port of the shard server
+SHARD_GRACE = 30  # seconds a shard may stay silent after the PASS_BUDGET, then its sites are reported as timeouts
+
+SCHEDULE_INTERVAL = 3600  # default check interval of a site in seconds (the "Interval" column overrides it)
+SCHEDULE_JITTER = 30  # the maximum random delay of a check in seconds
+SCHEDULE_MAX_RUNNING = 64  # the maximum number of checks running at the same time
+RELOAD_INTERVAL = 5  # interval of the .csv file change checks in seconds (0 - the file is not reloaded)
+
+ADAPTIVE_SCHEDULE = False  # adapt the check interval of every site to its history (AdaptivePolicy)
+ADAPTIVE_MIN_INTERVAL = 300  # check interval of failing and flapping sites in seconds
+ADAPTIVE_MAX_INTERVAL = 21600  # the maximum check interval of stable sites in seconds
+ADAPTIVE_FACTOR = 2  # every successful check in a row multiplies the interval by this factor
+ADAPTIVE_HISTORY = 10  # the number of the last outcomes stored for every site
+ADAPTIVE_FLAPS = 2  # the number of outcome changes in the history that makes the site flapping
+
+TIMEOUT_DEFAULT = 5  # timeout of the network calls of a target without history in seconds
+TIMEOUT_MIN = 0.5  # the minimum learned timeout in seconds
+TIMEOUT_MAX = 15  # the maximum learned timeout in seconds
+TIMEOUT_MULTIPLIER = 3  # the learned timeout is this multiple of the rolling p99 latency of the target and stage
+TIMEOUT_WINDOW = 50  # the number of the last latency samples per target and stage
+TIMEOUT_MIN_SAMPLES = 5  # the number of samples after which the timeout is learned
+PASS_BUDGET = 0  # time budget of one pass in seconds, unfinished checks are reported as timeouts (0 - no budget)
+
+PROBE_METHOD = "HEAD"  # method of the http probes ("HEAD" - a capped GET if the server rejects HEAD, "GET" - capped GET)
+PROBE_MAX_BYTES = 1024  # the maximum number of body bytes read by the GET probe before the connection is closed
+
+STORE = False  # append the results of the checks to the time-series store (ResultStore)
+STORE_PATH = "results"  # directory of the store
+STORE_BATCH = 1000  # the number of buffered results that triggers a write
+STORE_FLUSH_INTERVAL = 10  # the maximum time between writes in seconds
+STORE_RAW_DAYS = 7  # retention of the raw results in days
+STORE_MINUTE_DAYS = 30  # retention of the minute rollups in days
+STORE_HOUR_DAYS = 365  # retention of the hour rollups in days
+
+OUTPUT_FORMAT = "text"  # "text" - console, "ndjson" - one JSON object per result (NDJSONWriter)
+OUTPUT_PATH = "results.ndjson"  # file of the NDJSON results ("-" - stdout)
+OUTPUT_BATCH = 1000  # the number of buffered NDJSON lines that triggers a write
+OUTPUT_FLUSH_INTERVAL = 1  # the maximum time between NDJSON writes in seconds
+
+TRACE_BATCH = 1000  # the number of buffered spans that triggers a write of the --trace file
+TRACE_FLUSH_INTERVAL = 5  # the maximum time between writes of the --trace file in seconds
+TRACE_MAX_EVENTS = 1000000  # spans per --trace file, the full file is moved to PATH.1 (0 - no rotation)
+
+METRICS = False  # expose the metrics in the Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_HOST = "127.0.0.1"  # address of the metrics endpoint
+METRICS_PORT = 9108  # port of the metrics endpoint
+METRICS_REFRESH = 5  # interval between renders of the metrics snapshot in seconds
+
+CONNECTIVITY_URL = "http://www.google.com/"  # internet connection probe endpoint (can be a local stand-in)
+CONNECTIVITY_TTL = 30  # lifetime of a successful probe in seconds
+CONNECTIVITY_RETRY = 10  # interval between probes without internet connection in seconds
+CONNECTIVITY_FAILURES = 2  # the number of failed probes in a row after which there is no connection
+CONNECTIVITY_TIMEOUT = 3  # probe timeout in seconds
+
+DNS_CACHE_SIZE = 10000  # the maximum number of hosts in the DNS cache
+DNS_TTL = 300  # lifetime of the resolved addresses in seconds
+DNS_MIN_TTL = 30  # the minimum lifetime of the resolved addresses in seconds
+DNS_MAX_TTL = 3600  # the maximum lifetime of the resolved addresses in seconds
+DNS_NEGATIVE_TTL = 60  # lifetime of NXDOMAIN answers in seconds
+RDNS_WORKERS = 32  # the number of simultaneous reverse lookups of the IP targets of a pass
+
+CERT_CACHE_TTL = 86400  # lifetime of the cached valid certificates in seconds (TLSInspector)
+CERT_REFRESH_DAYS = 14  # certificates expiring sooner are checked by a handshake on every pass
+CERT_CACHE_SIZE = 10000  # the maximum number of cached certificates and TLS sessions
+CERT_TICKET_WAIT = 0.05  # the maximum wait for the session tickets after a full TLS 1.3 handshake in seconds
+
 IP = r"(25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(25[0-5]" \
      r"|2[0-4][0-9]|[01]?[0-9][0-9]?)\.(25[0-5]|2[0-4]" \
      r"[0-9]|[01]?[0-9][0-9]?)\.(25[0-5]|2[0-4][0-9]|" \
@@ -20,13 +20,15 @@ DEALINGS IN THE SOFTWARE.
 """
 import os
 import sys
-import schedule
+import atexit
 
 from datetime import datetime
+from typing import Any
 
 from checker.config import *
 from checker.sitestatuschecker import SiteStatusChecker
-from checker.units.exceptions import SSCException, FileInvalidFormat, DataInvalidFormat
+from checker.store import ResultStore
+from checker.units.exceptions import SSCException, CSVReaderException, FileInvalidFormat, DataInvalidFormat
 
 __all__ = (
     "Display",
@@ -40,16 +42,19 @@ class Display(object):
         A function to get the file name and to initialize the worker
     create_schedule() -> None
         A function to create a schedule for checking sites
-        (the function creates a schedule that runs the show function every hour)
+        (every site is checked every hour or with the interval from the .csv file)
     show() -> None
         Calls one iteration of the worker
+    output(value: Any) -> None
+        Passes the result of the worker to the console
     """
     __slots__ = (
-        "worker", "ignore_errors"
+        "worker", "ignore_errors", "writer"
     )
     def __init__(self) -> None:
         self.worker = None
         self.ignore_errors = False
+        self.writer = None
         self.get_file_name()
 
     def get_file_name(self) -> None:
@@ -68,9 +73,37 @@ class Display(object):
         if self.ignore_errors:
             print_errors = True if input(f"{self.get_time()} [INFO]: Print errors? (Y/N): ").lower() == "y" else False
 
-        worker = SiteStatusChecker(filename)
+        if ASYNC_MODE:
+            from checker.asyncsitestatuschecker import AsyncSiteStatusChecker
+
+            worker = AsyncSiteStatusChecker(filename)
+            worker.CONCURRENCY = CONCURRENCY
+        else:
+            worker = SiteStatusChecker(filename)
+            worker.WORKERS = WORKERS
+            worker.KEEP_ORDER = KEEP_ORDER
+        worker.BATCH_SIZE = BATCH_SIZE
+        worker.MAX_IN_FLIGHT = MAX_IN_FLIGHT
+        worker.PASS_BUDGET = PASS_BUDGET
         worker.IGNORE_ERRORS = self.ignore_errors
         worker.YIELD_ERRORS = print_errors
+        if STORE:
+            worker.STORE = ResultStore(
+                STORE_PATH, batch=STORE_BATCH, flush_interval=STORE_FLUSH_INTERVAL,
+                raw_days=STORE_RAW_DAYS, minute_days=STORE_MINUTE_DAYS, hour_days=STORE_HOUR_DAYS
+            )
+            atexit.register(worker.STORE.close)
+        if OUTPUT_FORMAT == "ndjson":
+            from checker.writer import NDJSONWriter
+
+            self.writer = NDJSONWriter(OUTPUT_PATH, batch=OUTPUT_BATCH, flush_interval=OUTPUT_FLUSH_INTERVAL)
+            atexit.register(self.writer.close)
+        if METRICS:
+            from checker.exporter import MetricsExporter
+
+            exporter = MetricsExporter(METRICS_HOST, METRICS_PORT, refresh=METRICS_REFRESH)
+            exporter.start()
+            print(f"{self.get_time()} [INFO]: Metrics on http://{exporter.host}:{exporter.port}/metrics")
 
         self.worker = worker
         print(f"{self.get_time()} [INFO]: Worker created")
@@ -78,14 +111,30 @@ class Display(object):
     def create_schedule(self) -> None:
         r"""
         A function to create a schedule for checking sites
-        (the function creates a schedule that runs the show function every hour)
+        (every site is checked every hour or with the interval from the .csv file,
+        with ADAPTIVE_SCHEDULE the interval adapts to the history of the site,
+        the thread sleeps until the next site is due, changes of the .csv file
+        are applied every RELOAD_INTERVAL seconds)
 
         :return: None
         """
-        self.show()
-        schedule.every().hour.do(self.show)
-        while True:
-            schedule.run_pending()
+        from checker.policy import IntervalPolicy, AdaptivePolicy
+        from checker.scheduler import Scheduler
+
+        if ADAPTIVE_SCHEDULE:
+            policy = AdaptivePolicy(
+                SCHEDULE_INTERVAL, min_interval=ADAPTIVE_MIN_INTERVAL, max_interval=ADAPTIVE_MAX_INTERVAL,
+                factor=ADAPTIVE_FACTOR, history=ADAPTIVE_HISTORY, flaps=ADAPTIVE_FLAPS
+            )
+        else:
+            policy = IntervalPolicy(SCHEDULE_INTERVAL)
+
+        print(f"{self.get_time()} [INFO]: Schedule starting...")
+        Scheduler(
+            self.worker, self.output, interval=SCHEDULE_INTERVAL,
+            jitter=SCHEDULE_JITTER, max_running=SCHEDULE_MAX_RUNNING, policy=policy,
+            reload_interval=RELOAD_INTERVAL
+        ).run()
 
     @staticmethod
     def get_time():
@@ -99,16 +148,31 @@ class Display(object):
         """
         print(f"{self.get_time()} [INFO]: Check starting...")
         for i in self.worker():
-            if isinstance(i, list):
-                for j in i:
-                    if j is not None:
-                        self.__send(j)
-                continue
-
-            if i is not None:
-                self.__send(i)
+            self.output(i)
+        if self.writer is not None:
+            self.writer.flush()
         print(f"{self.get_time()} [INFO]: Check completed!")
 
+    def output(self, value: Any) -> None:
+        r"""
+        Passes the result of the worker to the console
+        (or to the NDJSON writer with OUTPUT_FORMAT = "ndjson", errors of the .csv file stay on the console)
+
+        :return: None
+        """
+        if self.writer is not None and not isinstance(value, CSVReaderException):
+            self.writer.write(value)
+            return
+
+        if isinstance(value, list):
+            for i in value:
+                if i is not None:
+                    self.__send(i)
+            return
+
+        if value is not None:
+            self.__send(value)
+
     def __send(self, value) -> None:
         if isinstance(value, DataInvalidFormat):
             print(f"{self.get_time()} [ERROR]:", value)
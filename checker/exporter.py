@@ -0,0 +1,123 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from threading import Thread, Event
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional
+
+from checker.units.metrics import Metrics
+
+__all__ = (
+    "MetricsExporter",
+)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    r"""
+    Serves the snapshot of the exporter on /metrics
+    """
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        snapshot = self.server.exporter.snapshot
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(snapshot)))
+        self.end_headers()
+        self.wfile.write(snapshot)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class MetricsExporter(object):
+    r"""
+    Local HTTP endpoint that exposes the metrics in the Prometheus text format
+
+    The metrics are rendered by a background thread every `refresh` seconds,
+    scrapes get the last rendered snapshot, so they never touch the running checks
+
+    host: str
+        Address of the endpoint
+    port: int
+        Port of the endpoint (0 - any free port)
+    refresh: float
+        Interval between renders of the snapshot in seconds
+    metrics: Metrics
+        Rendered metrics (Metrics.get_instance() by default)
+    snapshot: bytes
+        Last rendered metrics
+
+    start() -> None
+        Renders the first snapshot and starts the server and render threads
+    stop() -> None
+        Stops the threads
+    """
+    __slots__ = (
+        "host", "port", "refresh", "metrics", "snapshot", "_server", "_stop"
+    )
+    def __init__(
+            self, host: str = "127.0.0.1", port: int = 9108,
+            refresh: float = 5, metrics: Optional[Metrics] = None
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.refresh = refresh
+        self.metrics = Metrics.get_instance() if metrics is None else metrics
+        self.snapshot = b""
+        self._server = None
+        self._stop = Event()
+
+    def start(self) -> None:
+        r"""
+        Renders the first snapshot and starts the server and render threads
+
+        Returns
+        --------
+            None
+        """
+        self.snapshot = self.metrics.render()
+        self._server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.exporter = self
+        self.port = self._server.server_address[1]
+        self._stop.clear()
+        Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        Thread(target=self.__run, name="metrics-render", daemon=True).start()
+
+    def stop(self) -> None:
+        r"""
+        Stops the threads
+
+        Returns
+        --------
+            None
+        """
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __run(self) -> None:
+        while not self._stop.wait(self.refresh):
+            self.snapshot = self.metrics.render()
+
+    def __repr__(self) -> str:
+        return "{0}({1}:{2})".format(self.__class__.__name__, self.host, self.port)
@@ -0,0 +1,212 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from collections import deque
+from typing import Any, Optional
+
+from checker.units.exceptions import SSCException, InternetConnectionError
+from checker.units.reader import ReadObject
+from checker.units.result import CheckResult
+
+__all__ = (
+    "IntervalPolicy", "AdaptivePolicy"
+)
+
+class IntervalPolicy(object):
+    r"""
+    Policy of the check intervals: every site is checked with its own
+    interval ("Interval" column) or the default one.
+    Subclasses change the interval from the history of the checks
+
+    interval: float
+        Default check interval in seconds
+
+    get_outcome(result: Any) -> Optional[bool]
+        Converts the result of the controller to the outcome of the check
+    record(target: ReadObject, result: Any) -> None
+        Stores the result of the check
+    get_interval(target: ReadObject) -> float
+        Returns the interval until the next check of the site
+    forget(target: ReadObject) -> None
+        Removes the history of the site
+    """
+    __slots__ = (
+        "interval",
+    )
+    def __init__(self, interval: float = 3600) -> None:
+        self.interval = interval
+
+    @staticmethod
+    def get_outcome(result: Any) -> Optional[bool]:
+        r"""
+        Converts the result of the controller to the outcome of the check
+
+        Parameters
+        ------------
+            result: Any
+                Result of the controller
+
+        Returns
+        --------
+            True if the site is up (all ports are opened), False if it is not,
+            None if the outcome is unknown (no internet connection) (Optional[bool])
+        """
+        if isinstance(result, InternetConnectionError):
+            return None
+        if isinstance(result, SSCException):
+            return False
+        if isinstance(result, CheckResult):
+            result = [result]
+        if isinstance(result, list):
+            return all(output.port_status is not False for output in result)
+        return None
+
+    def record(self, target: ReadObject, result: Any) -> None:
+        r"""
+        Stores the result of the check
+
+        Parameters
+        ------------
+            target: ReadObject
+                Checked site
+            result: Any
+                Result of the controller
+
+        Returns
+        --------
+            None
+        """
+
+    def get_interval(self, target: ReadObject) -> float:
+        r"""
+        Returns the interval until the next check of the site
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+
+        Returns
+        --------
+            Interval in seconds (float)
+        """
+        return self.interval if target.interval is None else target.interval
+
+    def forget(self, target: ReadObject) -> None:
+        r"""
+        Removes the history of the site
+
+        Parameters
+        ------------
+            target: ReadObject
+                Removed site
+
+        Returns
+        --------
+            None
+        """
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, self.interval)
+
+
+class AdaptivePolicy(IntervalPolicy):
+    r"""
+    Adaptive check intervals: every successful check in a row multiplies the interval
+    of the site by `factor` up to `max_interval`, a failed or flapping site
+    (the outcome changed at least `flaps` times in the last `history` checks)
+    is rechecked every `min_interval` until it recovers
+
+    min_interval: float
+        Interval of failing and flapping sites in seconds
+    max_interval: float
+        The maximum interval of stable sites in seconds
+    factor: float
+        Backoff multiplier of the interval
+    history: int
+        The number of the last outcomes stored for every site
+    flaps: int
+        The number of outcome changes in the history that makes the site flapping
+
+    is_flapping(target: ReadObject) -> bool
+        Checks whether the outcome of the site keeps changing
+    """
+    __slots__ = (
+        "min_interval", "max_interval", "factor", "history", "flaps",
+        "outcomes", "intervals"
+    )
+    def __init__(
+            self, interval: float = 3600, min_interval: float = 300, max_interval: float = 21600,
+            factor: float = 2, history: int = 10, flaps: int = 2
+    ) -> None:
+        super().__init__(interval)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.history = history
+        self.flaps = flaps
+
+        self.outcomes: dict[ReadObject, deque] = {}
+        self.intervals: dict[ReadObject, float] = {}
+
+    def is_flapping(self, target: ReadObject) -> bool:
+        r"""
+        Checks whether the outcome of the site keeps changing
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+
+        Returns
+        --------
+            Flapping status (bool)
+        """
+        outcomes = list(self.outcomes.get(target, ()))
+        return sum(a != b for a, b in zip(outcomes, outcomes[1:])) >= self.flaps
+
+    def record(self, target: ReadObject, result: Any) -> None:
+        outcome = self.get_outcome(result)
+        if outcome is None:
+            return
+        self.outcomes.setdefault(target, deque(maxlen=self.history)).append(outcome)
+
+        if not outcome or self.is_flapping(target):
+            self.intervals[target] = self.min_interval
+            return
+
+        previous = self.intervals.get(target)
+        if previous is None:
+            self.intervals[target] = super().get_interval(target)
+        else:
+            self.intervals[target] = min(previous * self.factor, self.max_interval)
+
+    def get_interval(self, target: ReadObject) -> float:
+        interval = self.intervals.get(target)
+        return super().get_interval(target) if interval is None else interval
+
+    def forget(self, target: ReadObject) -> None:
+        self.outcomes.pop(target, None)
+        self.intervals.pop(target, None)
+
+    def __repr__(self) -> str:
+        return "{0}({1}, {2}, {3})".format(
+            self.__class__.__name__, self.min_interval, self.interval, self.max_interval
+        )
@@ -0,0 +1,143 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import io
+import pstats
+import cProfile
+
+from collections import defaultdict
+from time import perf_counter
+from typing import Optional
+
+from checker.units.tracing import Tracer, MemoryTraceSink, ChromeTraceSink
+
+__all__ = (
+    "PassProfiler",
+)
+
+class PassProfiler(object):
+    r"""
+    Runs one pass of the worker under cProfile with the stage tracing enabled
+    and writes the slowest stages, targets and functions to a text report
+
+    cProfile sees only the calling thread, the spans cover the threads
+    of the pool and the event loop as well
+
+    worker: SiteStatusChecker
+        Worker to profile
+    path: str
+        Path of the report
+    trace_path: Optional[str]
+        Path of the Chrome trace of the pass (None - the trace is not written)
+    top: int
+        The number of rows in each section of the report
+
+    get_report(sink: MemoryTraceSink, stats: pstats.Stats, elapsed: float) -> str
+        Returns the text report of the pass
+    run() -> str
+        Runs the pass and writes the report, returns the report
+    """
+    __slots__ = (
+        "worker", "path", "trace_path", "top"
+    )
+    def __init__(self, worker, path: str = "profile.txt", trace_path: Optional[str] = None, top: int = 20) -> None:
+        self.worker = worker
+        self.path = path
+        self.trace_path = trace_path
+        self.top = top
+
+    def get_report(self, sink: MemoryTraceSink, stats: pstats.Stats, elapsed: float) -> str:
+        r"""
+        Returns the text report of the pass
+
+        Parameters
+        ------------
+            sink: MemoryTraceSink
+                Spans of the pass
+            stats: pstats.Stats
+                cProfile statistics of the pass
+            elapsed: float
+                Wall-clock time of the pass in seconds
+
+        Returns
+        --------
+            Report (str)
+        """
+        stages, targets = defaultdict(list), defaultdict(int)
+        for event in sink.events:
+            if event["name"] == "check":
+                targets[event["args"].get("arg")] += event["dur"]
+            else:
+                stages[event["name"]].append(event["dur"])
+
+        lines = ["pass: {0:.3f} s, {1} targets".format(elapsed, len(targets)), "", "slowest stages:"]
+        lines.append("{0:>24}\t{1:>8}\t{2:>12}\t{3:>12}\t{4:>12}".format("stage", "calls", "total ms", "mean ms", "max ms"))
+        for name, durations in sorted(stages.items(), key=lambda item: -sum(item[1]))[:self.top]:
+            lines.append("{0:>24}\t{1:>8}\t{2:>12.3f}\t{3:>12.3f}\t{4:>12.3f}".format(
+                name, len(durations), sum(durations) / 1000,
+                sum(durations) / len(durations) / 1000, max(durations) / 1000
+            ))
+
+        lines += ["", "slowest targets:"]
+        for host, duration in sorted(targets.items(), key=lambda item: -item[1])[:self.top]:
+            lines.append("{0:>12.3f} ms\t{1}".format(duration / 1000, host))
+
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        lines += ["", "slowest functions:", output.getvalue()]
+        return "\n".join(lines)
+
+    def run(self) -> str:
+        r"""
+        Runs the pass (the results are discarded) and writes the report
+
+        Returns
+        --------
+            Report (str)
+        """
+        tracer = Tracer.get_instance()
+        previous = tracer.sink
+        sink = MemoryTraceSink()
+        tracer.enable(sink)
+
+        profile = cProfile.Profile()
+        start = perf_counter()
+        profile.enable()
+        try:
+            for _ in self.worker():
+                pass
+        finally:
+            profile.disable()
+            tracer.sink = previous
+        elapsed = perf_counter() - start
+
+        if self.trace_path:
+            trace = ChromeTraceSink(self.trace_path)
+            for event in sink.events:
+                trace.write(event)
+            trace.close()
+        report = self.get_report(sink, pstats.Stats(profile), elapsed)
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(report)
+        return report
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, self.path)
@@ -0,0 +1,316 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import heapq
+import random
+
+from time import monotonic
+from itertools import count
+from threading import Condition, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from checker.policy import IntervalPolicy
+from checker.sitestatuschecker import SiteStatusChecker
+from checker.units.exceptions import SSCException, CheckerException
+from checker.units.flight import SingleFlight
+from checker.units.reader import ReadObject
+from checker.watcher import CSVWatcher
+
+__all__ = (
+    "Scheduler",
+)
+
+class Scheduler(object):
+    r"""
+    Heap-based scheduler of the checks: the thread sleeps until the next site is due,
+    the interval of every site is given by the policy (by default the "Interval" column
+    or the default interval), the next check is scheduled when the current one is completed,
+    due times get a random jitter so that sites do not fire in the same second,
+    the sites that are due together are checked as one batch by the engine of the worker
+    (event loop or thread pool, with the PASS_BUDGET of the worker as the deadline of the batch),
+    changes of the .csv file are applied without a restart (only added and removed sites)
+
+    worker: SiteStatusChecker
+        Worker whose sites are checked (SiteStatusChecker or AsyncSiteStatusChecker)
+    callback: Callable[[Any], None]
+        Function that receives the adapted results (and errors) of the checks
+    interval: float
+        Default check interval in seconds
+    jitter: float
+        The maximum random delay added to every due time in seconds
+    max_running: int
+        The maximum number of checks running at the same time
+    policy: IntervalPolicy
+        Policy of the check intervals (IntervalPolicy(interval) by default)
+    reload_interval: float
+        Interval of the .csv file change checks in seconds (0 - the file is not reloaded)
+    watcher: CSVWatcher
+        Watcher of the .csv file of the worker
+
+    add(target: ReadObject, due: Optional[float] = None) -> None
+        Adds the site to the schedule
+    get_interval(target: ReadObject) -> float
+        Returns the check interval of the site
+    get_jitter() -> float
+        Returns a random delay
+    pop_due() -> list[ReadObject]
+        Removes the due sites from the heap
+    check(targets: list[ReadObject]) -> None
+        Checks the due sites with the engine of the worker and schedules their next checks
+    done(target: ReadObject) -> None
+        Schedules the next check of the site
+    reload() -> None
+        Applies the changes of the .csv file to the schedule
+    run() -> None
+        Runs the schedule until stop() is called
+    stop() -> None
+        Stops the schedule
+    """
+    __slots__ = (
+        "worker", "callback", "interval", "jitter", "max_running", "policy",
+        "reload_interval", "watcher", "_heap", "_counter", "_condition", "_stopped", "_slots", "_removed"
+    )
+    def __init__(
+            self, worker: SiteStatusChecker, callback: Callable[[Any], None],
+            interval: float = 3600, jitter: float = 30, max_running: int = 64,
+            policy: Optional[IntervalPolicy] = None, reload_interval: float = 0
+    ) -> None:
+        self.worker = worker
+        self.callback = callback
+        self.interval = interval
+        self.jitter = jitter
+        self.max_running = max_running
+        self.policy = IntervalPolicy(interval) if policy is None else policy
+        self.reload_interval = reload_interval
+        self.watcher = CSVWatcher(worker)
+
+        self._heap = []
+        self._counter = count()
+        self._condition = Condition()
+        self._stopped = False
+        self._slots = BoundedSemaphore(max_running)
+        self._removed = set()
+
+    def add(self, target: ReadObject, due: Optional[float] = None) -> None:
+        r"""
+        Adds the site to the schedule
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+            due: Optional[float]
+                Time of the first check (time.monotonic), now + jitter by default
+
+        Returns
+        --------
+            None
+        """
+        if due is None:
+            due = monotonic() + self.get_jitter()
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._counter), target))
+            self._condition.notify()
+
+    def get_interval(self, target: ReadObject) -> float:
+        r"""
+        Returns the check interval of the site (given by the policy)
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+
+        Returns
+        --------
+            Interval in seconds (float)
+        """
+        return self.policy.get_interval(target)
+
+    def get_jitter(self) -> float:
+        r"""
+        Returns a random delay
+
+        Returns
+        --------
+            Delay in seconds from 0 to jitter (float)
+        """
+        return random.uniform(0, self.jitter)
+
+    def pop_due(self) -> list[ReadObject]:
+        r"""
+        Removes the due sites from the heap (at most BATCH_SIZE of the worker and max_running),
+        sites removed from the .csv file are dropped
+
+        Returns
+        --------
+            Due sites (list[ReadObject])
+        """
+        now = monotonic()
+        limit = min(self.worker.BATCH_SIZE, self.max_running)
+        targets = []
+        with self._condition:
+            while self._heap and self._heap[0][0] <= now and len(targets) < limit:
+                target = heapq.heappop(self._heap)[2]
+                if target in self._removed:
+                    self._removed.discard(target)
+                    continue
+                targets.append(target)
+        return targets
+
+    def check(self, targets: list[ReadObject]) -> None:
+        r"""
+        Checks the due sites with the engine of the worker (ASYNC_MODE, WORKERS, KEEP_ORDER
+        and PASS_BUDGET of the worker are applied to the batch), passes the results to the callback
+        and schedules the next checks of the sites, failed checks are passed to the callback
+        as CheckerException
+
+        Parameters
+        ------------
+            targets: list[ReadObject]
+                Due sites
+
+        Returns
+        --------
+            None
+        """
+        pending = list(targets)
+        try:
+            for target, result in self.worker.iter_checks(targets, self.worker.get_deadline(), SingleFlight()):
+                pending.remove(target)
+                try:
+                    self.policy.record(target, result)
+                    result = self.worker.adapt(result)
+                    if result is not None:
+                        self.callback(result)
+                except Exception as e:
+                    self.callback(CheckerException("check failed ({0}: {1})".format(target.host, e)))
+                finally:
+                    self.done(target)
+        except Exception as e:
+            for target in pending:
+                self.callback(CheckerException("check failed ({0}: {1})".format(target.host, e)))
+        finally:
+            for target in pending:
+                self.done(target)
+
+    def done(self, target: ReadObject) -> None:
+        r"""
+        Schedules the next check of the site and frees its slot
+
+        Parameters
+        ------------
+            target: ReadObject
+                Checked site
+
+        Returns
+        --------
+            None
+        """
+        self.add(target, monotonic() + self.get_interval(target) + self.get_jitter())
+        self._slots.release()
+
+    def reload(self) -> None:
+        r"""
+        Applies the changes of the .csv file to the schedule: added sites are scheduled,
+        removed sites are dropped, unchanged sites keep their schedule and history
+        (errors of the new rows are passed to the callback as warnings)
+
+        Returns
+        --------
+            None
+        """
+        added, removed = self.watcher.poll()
+        for error in self.watcher.errors:
+            self.callback(SSCException("{0}: {1}".format(self.worker.filename, error)))
+
+        with self._condition:
+            self._removed.update(removed)
+        for target in removed:
+            self.policy.forget(target)
+        for target in added:
+            self.add(target)
+
+    def run(self) -> None:
+        r"""
+        Runs the schedule until stop() is called: errors of the .csv file are passed
+        to the callback, then every site is checked when it is due
+
+        Returns
+        --------
+            None
+        """
+        errors = self.worker.get_input_errors()
+        while True:
+            try:
+                self.callback(next(errors))
+            except StopIteration as stop:
+                if stop.value:
+                    return
+                break
+
+        for target in self.watcher.load():
+            self.add(target)
+
+        next_reload = monotonic() + self.reload_interval
+        with ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="scheduler") as pool:
+            while True:
+                with self._condition:
+                    while not self._stopped:
+                        timeouts = [self._heap[0][0] - monotonic()] if self._heap else []
+                        if self.reload_interval > 0:
+                            timeouts.append(next_reload - monotonic())
+                        timeout = min(timeouts) if timeouts else None
+                        if timeout is not None and timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    if self._stopped:
+                        break
+
+                if self.reload_interval > 0 and monotonic() >= next_reload:
+                    self.reload()
+                    next_reload = monotonic() + self.reload_interval
+
+                targets = self.pop_due()
+                if not targets:
+                    continue
+
+                for _ in targets:
+                    self._slots.acquire()
+                pool.submit(self.check, targets)
+
+    def stop(self) -> None:
+        r"""
+        Stops the schedule (running checks are completed)
+
+        Returns
+        --------
+            None
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __repr__(self) -> str:
+        return "{0}({1}, {2})".format(self.__class__.__name__, repr(self.worker), len(self))
@@ -0,0 +1,1008 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+import sys
+import json
+import queue
+import socket
+import hashlib
+import argparse
+import multiprocessing
+
+from bisect import bisect
+from socketserver import ThreadingTCPServer, StreamRequestHandler
+from threading import Thread
+from time import perf_counter, sleep
+from typing import Any, Generator, Iterable, Optional
+
+from checker import config
+from checker.asyncsitestatuschecker import AsyncSiteStatusChecker
+from checker.sitestatuschecker import SiteStatusChecker
+from checker.units import exceptions
+from checker.units.exceptions import SSCException, CheckerException
+from checker.units.flight import SingleFlight
+from checker.units.reader import CSVReader, ReadObject
+from checker.units.result import CheckResult
+from checker.writer import NDJSONWriter
+
+__all__ = (
+    "HashRing", "ShardProtocol", "ShardChecker", "AsyncShardChecker", "ShardServer",
+    "ShardClient", "ShardedSiteStatusChecker", "serve", "main"
+)
+
+class HashRing(object):
+    r"""
+    Consistent hash ring of the shards: every shard owns `replicas` points of the ring and
+    a site belongs to the shard of the first point after the hash of its key (host name and ports), so a site stays
+    on the same shard across passes and adding or removing a shard moves only its own sites
+
+    replicas: int
+        The number of points of every shard
+    nodes: list[str]
+        Names of the shards
+
+    get_hash(value: str) -> int
+        Returns the position of the value on the ring
+    add(node: str) -> None
+        Adds the shard to the ring
+    remove(node: str) -> None
+        Removes the shard from the ring
+    get_node(key: str) -> str
+        Returns the shard of the key
+    """
+    __slots__ = (
+        "replicas", "nodes", "_points", "_owners"
+    )
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100) -> None:
+        self.replicas = replicas
+        self.nodes: list[str] = []
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def get_hash(value: str) -> int:
+        r"""
+        Returns the position of the value on the ring (first 8 bytes of its BLAKE2 digest)
+
+        Parameters
+        ------------
+            value: str
+                Host or point name
+
+        Returns
+        --------
+            Position on the ring (int)
+        """
+        return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, node: str) -> None:
+        r"""
+        Adds the shard to the ring
+
+        Parameters
+        ------------
+            node: str
+                Name of the shard
+
+        Returns
+        --------
+            None
+        """
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.replicas):
+            point = self.get_hash("{0}#{1}".format(node, replica))
+            index = bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        r"""
+        Removes the shard from the ring (its sites move to the next shards of the ring)
+
+        Parameters
+        ------------
+            node: str
+                Name of the shard
+
+        Returns
+        --------
+            None
+        """
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def get_node(self, key: str) -> str:
+        r"""
+        Returns the shard of the key
+
+        Parameters
+        ------------
+            key: str
+                Host of the site
+
+        Returns
+        --------
+            Name of the shard (str)
+        """
+        if not self._points:
+            raise LookupError("the ring has no shards")
+        index = bisect(self._points, self.get_hash(key))
+        return self._owners[index % len(self._owners)]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __repr__(self) -> str:
+        return "{0}({1}, replicas={2})".format(self.__class__.__name__, self.nodes, self.replicas)
+
+
+class ShardProtocol(object):
+    r"""
+    Line protocol between the coordinator and the shards (one JSON value per line):
+
+        coordinator -> shard: settings of the pass, one line per site, {"end": true}
+        shard -> coordinator: one line per checked site {"site": index, "value": value}, {"done": true}
+
+    Values are encoded as in NDJSONWriter (results of one site with several ports as one array),
+    the index is the position of the site in the pass (the coordinator knows which sites are not checked yet)
+
+    encode_target(target: ReadObject) -> bytes
+        Returns the line of the site
+    decode_target(line: bytes) -> Optional[ReadObject]
+        Returns the site of the line (None - end of the sites)
+    encode_value(value: Any) -> bytes
+        Returns the line of the value of the worker
+    decode_value(line: bytes) -> Any
+        Returns the value of the worker of the line
+    encode_result(site: int, value: Any) -> bytes
+        Returns the line of the value of the checked site
+    decode_result(line: bytes) -> tuple[int, Any]
+        Returns the index of the site and its value
+    get_value(data: Any) -> Any
+        Returns the value of the worker of the decoded JSON
+    """
+    END: bytes = b'{"end":true}\n'
+    DONE: bytes = b'{"done":true}\n'
+
+    @staticmethod
+    def encode_target(target: ReadObject) -> bytes:
+        r"""
+        Returns the line of the site
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+
+        Returns
+        --------
+            JSON line (bytes)
+        """
+        return json.dumps(
+            {"host": target.host, "ports": ",".join(map(str, target.ports)), "interval": target.interval},
+            separators=(",", ":")
+        ).encode("utf-8") + b"\n"
+
+    @staticmethod
+    def decode_target(line: bytes) -> Optional[ReadObject]:
+        r"""
+        Returns the site of the line
+
+        Parameters
+        ------------
+            line: bytes
+                JSON line
+
+        Returns
+        --------
+            Site, None if the line is the end of the sites (Optional[ReadObject])
+        """
+        data = json.loads(line)
+        if data.get("end"):
+            return None
+        return ReadObject(data["host"], data["ports"] or None, data.get("interval"))
+
+    @staticmethod
+    def encode_value(value: Any) -> bytes:
+        r"""
+        Returns the line of the value of the worker
+
+        Parameters
+        ------------
+            value: Any
+                CheckResult, list of CheckResult, error or text
+
+        Returns
+        --------
+            JSON line (bytes)
+        """
+        if isinstance(value, list):
+            line = "[{0}]".format(",".join(NDJSONWriter.get_lines(value)))
+        else:
+            line = NDJSONWriter.get_lines(value)[0]
+        return line.encode("utf-8") + b"\n"
+
+    @staticmethod
+    def decode_value(line: bytes) -> Any:
+        r"""
+        Returns the value of the worker of the line (errors are restored as their classes)
+
+        Parameters
+        ------------
+            line: bytes
+                JSON line
+
+        Returns
+        --------
+            CheckResult, list of CheckResult, error or text (Any)
+        """
+        return ShardProtocol.get_value(json.loads(line))
+
+    @staticmethod
+    def encode_result(site: int, value: Any) -> bytes:
+        r"""
+        Returns the line of the value of the checked site
+
+        Parameters
+        ------------
+            site: int
+                Index of the site in the pass
+            value: Any
+                CheckResult, list of CheckResult, error or None
+
+        Returns
+        --------
+            JSON line (bytes)
+        """
+        if value is None:
+            return '{{"site":{0}}}\n'.format(site).encode("utf-8")
+        return '{{"site":{0},"value":'.format(site).encode("utf-8") + ShardProtocol.encode_value(value)[:-1] + b"}\n"
+
+    @staticmethod
+    def decode_result(line: bytes) -> tuple[int, Any]:
+        r"""
+        Returns the index of the checked site and its value
+
+        Parameters
+        ------------
+            line: bytes
+                JSON line
+
+        Returns
+        --------
+            Index of the site and CheckResult, list of CheckResult, error or None (tuple[int, Any])
+        """
+        data = json.loads(line)
+        value = data.get("value")
+        return data["site"], None if value is None else ShardProtocol.get_value(value)
+
+    @staticmethod
+    def get_value(data: Any) -> Any:
+        r"""
+        Returns the value of the worker of the decoded JSON line (errors are restored as their classes)
+
+        Parameters
+        ------------
+            data: Any
+                Decoded JSON line
+
+        Returns
+        --------
+            CheckResult, list of CheckResult, error or text (Any)
+        """
+        if isinstance(data, list):
+            return [CheckResult(**output) for output in data]
+        if "error" in data:
+            error = getattr(exceptions, data["error"], None)
+            if not isinstance(error, type) or not issubclass(error, SSCException):
+                error = SSCException
+            return error(data["message"])
+        if "info" in data:
+            return data["info"]
+        return CheckResult(**data)
+
+
+class ShardChecker(SiteStatusChecker):
+    r"""
+    SiteStatusChecker of the sites received from the coordinator (instead of the .csv file)
+
+    targets: list[ReadObject]
+        Sites of the pass
+
+    read() -> Generator
+        Yields the sites of the pass
+    create(targets: list[ReadObject], settings: dict) -> ShardChecker
+        Creates the worker of the pass with the settings of the coordinator
+    """
+    def __init__(self, targets: list[ReadObject]) -> None:
+        self.targets = targets
+        super().__init__("shard")
+
+    def read(self) -> Generator:
+        yield from self.targets
+
+    @staticmethod
+    def create(targets: list[ReadObject], settings: dict) -> "ShardChecker":
+        r"""
+        Creates the worker of the pass with the settings of the coordinator
+
+        Parameters
+        ------------
+            targets: list[ReadObject]
+                Sites of the pass
+            settings: dict
+                Settings of the pass ("async", "workers", "concurrency", "batch_size",
+                "max_in_flight", "pass_budget")
+
+        Returns
+        --------
+            Worker (ShardChecker)
+        """
+        if settings.get("async"):
+            worker = AsyncShardChecker(targets)
+            worker.CONCURRENCY = settings.get("concurrency", config.CONCURRENCY)
+        else:
+            worker = ShardChecker(targets)
+            worker.WORKERS = settings.get("workers", config.WORKERS)
+        worker.KEEP_ORDER = False
+        worker.BATCH_SIZE = settings.get("batch_size", config.BATCH_SIZE)
+        worker.MAX_IN_FLIGHT = settings.get("max_in_flight", config.MAX_IN_FLIGHT)
+        worker.PASS_BUDGET = settings.get("pass_budget", config.PASS_BUDGET)
+        worker.IGNORE_ERRORS = True
+        return worker
+
+
+class AsyncShardChecker(ShardChecker, AsyncSiteStatusChecker):
+    r"""
+    AsyncSiteStatusChecker of the sites received from the coordinator
+    """
+
+
+class ShardHandler(StreamRequestHandler):
+    r"""
+    Runs the passes of one coordinator connection (the connection is kept between passes),
+    every checked site is sent with its index as soon as it is checked
+    """
+    def handle(self) -> None:
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            settings = json.loads(line)
+
+            targets = []
+            for line in self.rfile:
+                target = ShardProtocol.decode_target(line)
+                if target is None:
+                    break
+                targets.append(target)
+            else:
+                return
+
+            worker = ShardChecker.create(targets, settings)
+            sites = {id(target): index for index, target in enumerate(targets)}
+            try:
+                for target, result in worker.iter_checks(targets, worker.get_deadline(), SingleFlight()):
+                    self.wfile.write(ShardProtocol.encode_result(sites[id(target)], worker.adapt(result)))
+                self.wfile.write(ShardProtocol.DONE)
+            except OSError:
+                # the coordinator dropped the shard (read timeout) or exited
+                return
+
+
+class ShardServer(ThreadingTCPServer):
+    r"""
+    Shard that checks the sites sent by the coordinator (python -m checker.shard),
+    the caches of the process (DNS, connectivity, learned timeouts) stay warm between passes
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9109) -> None:
+        super().__init__((host, port), ShardHandler)
+
+
+def serve(host: str, port: int, connection=None, overrides: Optional[dict] = None) -> None:
+    r"""
+    Runs the shard server until the process is stopped
+
+    Parameters
+    ------------
+        host: str
+            Address of the server
+        port: int
+            Port of the server (0 - any free port)
+        connection: Optional[multiprocessing.connection.Connection]
+            Connection the address of the server is sent to (local shards)
+        overrides: Optional[dict]
+            Settings of the config module of the coordinator (local shards)
+
+    Returns
+    --------
+        None
+    """
+    for name, value in (overrides or {}).items():
+        setattr(config, name, value)
+
+    server = ShardServer(host, port)
+    if connection is not None:
+        connection.send(server.server_address)
+        connection.close()
+        Thread(target=watch_parent, args=(os.getppid(),), name="shard-watchdog", daemon=True).start()
+    server.serve_forever()
+
+
+def watch_parent(parent: int) -> None:
+    r"""
+    Stops the local shard when the coordinator process exits (even without cleanup)
+
+    Parameters
+    ------------
+        parent: int
+            PID of the coordinator
+
+    Returns
+    --------
+        None
+    """
+    while os.getppid() == parent:
+        sleep(1)
+    os._exit(0)
+
+
+class ShardClient(object):
+    r"""
+    Connection of the coordinator to one shard
+
+    node: str
+        Name of the shard on the hash ring
+    address: tuple[str, int]
+        Address of the shard server
+    sent: int
+        The number of sites sent in the current pass
+    received: int
+        The number of values received in the current pass
+    pending: dict[int, ReadObject]
+        Index in the pass -> site that is sent and not checked yet
+    error: Optional[str]
+        Reason of the failure of the connection in the current pass
+    connected: bool
+        Whether the connection is open
+
+    connect(timeout: float) -> None
+        Connects to the shard (if it is not connected)
+    start(timeout: Optional[float]) -> None
+        Resets the statistics of the pass and sets the read timeout
+    add(target: ReadObject) -> bytes
+        Registers the site as pending and returns its line
+    send(data: bytes) -> None
+        Sends the lines to the shard
+    receive() -> Generator
+        Yields the values of the current pass until the shard is done
+    close() -> None
+        Closes the connection
+    """
+    __slots__ = (
+        "node", "address", "sent", "received", "pending", "error", "_socket", "_file"
+    )
+    def __init__(self, node: str, address: tuple[str, int]) -> None:
+        self.node = node
+        self.address = address
+        self.sent = 0
+        self.received = 0
+        self.pending: dict[int, ReadObject] = {}
+        self.error: Optional[str] = None
+        self._socket: Optional[socket.socket] = None
+        self._file = None
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    def connect(self, timeout: float = 5) -> None:
+        r"""
+        Connects to the shard (if it is not connected)
+
+        Parameters
+        ------------
+            timeout: float
+                Connect timeout in seconds
+
+        Returns
+        --------
+            None
+        """
+        if self._socket is not None:
+            return
+        sock = socket.create_connection(self.address, timeout=timeout)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket = sock
+        self._file = sock.makefile("rb")
+
+    def start(self, timeout: Optional[float] = None) -> None:
+        r"""
+        Resets the statistics of the pass and sets the timeout of the reads and writes
+
+        Parameters
+        ------------
+            timeout: Optional[float]
+                The maximum silence of the shard in seconds (None - no timeout)
+
+        Returns
+        --------
+            None
+        """
+        self.sent = self.received = 0
+        self.pending = {}
+        self.error = None
+        if self._socket is not None:
+            self._socket.settimeout(timeout)
+
+    def add(self, target: ReadObject) -> bytes:
+        r"""
+        Registers the site as pending (until its value is received) and returns its line
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+
+        Returns
+        --------
+            JSON line (bytes)
+        """
+        self.pending[self.sent] = target
+        self.sent += 1
+        return ShardProtocol.encode_target(target)
+
+    def send(self, data: bytes) -> None:
+        r"""
+        Sends the lines to the shard
+
+        Parameters
+        ------------
+            data: bytes
+                JSON lines
+
+        Returns
+        --------
+            None
+        """
+        sock = self._socket
+        if sock is None:
+            raise ConnectionError("connection to the shard is closed")
+        sock.sendall(data)
+
+    def receive(self) -> Generator:
+        r"""
+        Yields the values of the current pass until the shard is done
+        (the sites of the values are removed from pending)
+
+        Returns
+        --------
+            Generator of the values of the worker of the shard (Generator)
+        """
+        for line in self._file:
+            if line == ShardProtocol.DONE:
+                return
+            site, value = ShardProtocol.decode_result(line)
+            self.pending.pop(site, None)
+            self.received += 1
+            if value is not None:
+                yield value
+        raise ConnectionError("connection closed by the shard")
+
+    def close(self) -> None:
+        r"""
+        Closes the connection
+
+        Returns
+        --------
+            None
+        """
+        sock, file = self._socket, self._file
+        if sock is None:
+            return
+        self._socket = self._file = None
+        try:
+            # wakes up the collector blocked on the connection in another thread
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            file.close()
+        finally:
+            sock.close()
+
+    def __repr__(self) -> str:
+        return "{0}({1}, {2}:{3})".format(self.__class__.__name__, self.node, *self.address)
+
+
+class ShardedSiteStatusChecker(SiteStatusChecker):
+    r"""
+    SiteStatusChecker that splits the sites of every pass between shards (local processes
+    and remote shard servers) by consistent hashing of their keys (ReadObject.key) and merges their results
+    (in the order of completion), the sites of a shard that fails during the pass are sent to the next shards
+    of the ring, the sites of a shard that is silent for PASS_BUDGET + GRACE seconds are reported as timeouts
+
+    PROCESSES: int = 0
+        the number of local shard processes (started on the first pass and kept)
+    NODES: list[str] = []
+        addresses ("host:port") of the remote shard servers
+    REPLICAS: int = 100
+        the number of points of every shard on the hash ring
+    ASYNC: bool = False
+        the shards check their sites on the event loop (CONCURRENCY) instead of threads (WORKERS)
+    CONCURRENCY: int = 64
+        the maximum number of sites checked at the same time by a shard in ASYNC mode
+    SEND_BATCH: int = 1000
+        the number of sites sent to a shard in one write
+    GRACE: float = 30
+        seconds a shard may stay silent after the PASS_BUDGET (no read timeout without the budget)
+
+    start() -> list[ShardClient]
+        starts the local shards and creates the clients of all shards
+    connect() -> Generator
+        connects to the shards, yields the descriptions of the unreachable ones
+    get_settings() -> dict
+        returns the settings of the pass sent to the shards
+    get_read_timeout() -> Optional[float]
+        returns the maximum silence of a shard in seconds
+    dispatch(ring: HashRing, clients: dict[str, ShardClient], readers: Iterable[ReadObject]) -> None
+        sends the sites of the pass to their shards
+    collect(client: ShardClient, results: queue.Queue) -> None
+        puts the values of the shard to the results
+    run_round(ring: HashRing, clients: dict[str, ShardClient], readers: Iterable[ReadObject]) -> Generator
+        sends the sites to the shards of the ring and yields the merged values
+    get_shard_description(clients: list[ShardClient], elapsed: float) -> str
+        adapts the pass statistics of the shards to console output
+    close() -> None
+        closes the connections and stops the local shards
+    __call__() -> Any
+        Calls one iteration of the worker
+    """
+    PROCESSES: int = 0
+    NODES: list[str] = []
+    REPLICAS: int = 100
+    ASYNC: bool = False
+    CONCURRENCY: int = 64
+    SEND_BATCH: int = 1000
+    GRACE: float = 30
+
+    def __init__(self, filename: str) -> None:
+        super().__init__(filename)
+        self.clients: Optional[list[ShardClient]] = None
+        self.processes: list[multiprocessing.Process] = []
+
+    def start(self) -> list[ShardClient]:
+        r"""
+        Starts the local shard processes (with the settings of the config module of this process)
+        and creates the clients of all shards, local shards are named local-0, local-1, ...
+        and remote shards by their addresses
+
+        Returns
+        --------
+            Clients of the shards (list[ShardClient])
+        """
+        if self.clients is not None:
+            return self.clients
+
+        overrides = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+        context = multiprocessing.get_context("spawn")
+        clients = []
+        for index in range(self.PROCESSES):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=serve, args=("127.0.0.1", 0, sender, overrides), name="shard-{0}".format(index), daemon=True
+            )
+            process.start()
+            sender.close()
+            if not receiver.poll(30):
+                process.terminate()
+                raise RuntimeError("local shard {0} did not start".format(index))
+            clients.append(ShardClient("local-{0}".format(index), tuple(receiver.recv())))
+            self.processes.append(process)
+
+        for node in self.NODES:
+            host, _, port = node.rpartition(":")
+            clients.append(ShardClient(node, (host or "127.0.0.1", int(port or 9109))))
+        self.clients = clients
+        return clients
+
+    def connect(self) -> Generator:
+        r"""
+        Connects to the shards, the unreachable shards are left out of the pass
+        (their sites move to the next shards of the ring)
+
+        Returns
+        --------
+            Generator of the descriptions of the unreachable shards (Generator)
+        """
+        for client in self.start():
+            try:
+                client.connect()
+            except OSError as e:
+                client.close()
+                yield "shard {0} is unreachable, its sites are checked by the other shards ({1})".format(client.node, e)
+
+    def get_settings(self) -> dict:
+        r"""
+        Returns the settings of the pass sent to the shards
+
+        Returns
+        --------
+            Settings of the pass (dict)
+        """
+        return {
+            "async": self.ASYNC, "workers": self.WORKERS, "concurrency": self.CONCURRENCY,
+            "batch_size": self.BATCH_SIZE, "max_in_flight": self.MAX_IN_FLIGHT, "pass_budget": self.PASS_BUDGET
+        }
+
+    def get_read_timeout(self) -> Optional[float]:
+        r"""
+        Returns the maximum silence of a shard (the shards report their unchecked sites
+        as timeouts at the end of the PASS_BUDGET, a shard that is silent longer is hung)
+
+        Returns
+        --------
+            PASS_BUDGET + GRACE in seconds, None if there is no budget (Optional[float])
+        """
+        if self.PASS_BUDGET > 0:
+            return self.PASS_BUDGET + self.GRACE
+        return None
+
+    def dispatch(self, ring: HashRing, clients: dict[str, ShardClient], readers: Iterable[ReadObject]) -> None:
+        r"""
+        Sends the sites to their shards (in batches of SEND_BATCH lines), a shard that can not
+        receive its sites is closed (its collector moves the pending sites to the next round)
+
+        Parameters
+        ------------
+            ring: HashRing
+                Ring of the connected shards
+            clients: dict[str, ShardClient]
+                Name of the shard -> client
+            readers: Iterable[ReadObject]
+                Sites to send
+
+        Returns
+        --------
+            None
+        """
+        settings = json.dumps(self.get_settings(), separators=(",", ":")).encode("utf-8") + b"\n"
+        buffers = {node: [settings] for node in clients}
+        failed = set()
+
+        def send(node: str) -> None:
+            data, buffers[node] = b"".join(buffers[node]), []
+            if node in failed:
+                return
+            try:
+                clients[node].send(data)
+            except OSError:
+                failed.add(node)
+                clients[node].close()
+
+        for reader in readers:
+            node = ring.get_node(str(reader.key))
+            buffers[node].append(clients[node].add(reader))
+            if len(buffers[node]) >= self.SEND_BATCH:
+                send(node)
+
+        for node in clients:
+            buffers[node].append(ShardProtocol.END)
+            send(node)
+
+    def collect(self, client: ShardClient, results: queue.Queue) -> None:
+        r"""
+        Puts the values of the shard to the results, the client is put when the shard is done
+        (a hung shard is closed and its pending sites are put as timeouts, a failed shard is closed
+        and its pending sites are left to the next round)
+
+        Parameters
+        ------------
+            client: ShardClient
+                Client of the shard
+            results: queue.Queue
+                Queue of the merged values
+
+        Returns
+        --------
+            None
+        """
+        try:
+            for value in client.receive():
+                results.put(value)
+        except socket.timeout:
+            client.close()
+            results.put(CheckerException("shard {0} is not responding, {1} of {2} sites are not checked".format(
+                client.node, len(client.pending), client.sent
+            )))
+            for site in sorted(client.pending):
+                results.put(self.get_timeout_error(client.pending[site]))
+            client.pending = {}
+        except (OSError, ValueError) as e:
+            client.error = str(e)
+            client.close()
+        finally:
+            results.put(client)
+
+    @staticmethod
+    def get_shard_description(clients: list[ShardClient], elapsed: float) -> str:
+        r"""
+        Adapts the pass statistics of the shards to console output
+
+        Parameters
+        ------------
+            clients: list[ShardClient]
+                Clients of the shards of the pass
+            elapsed: float
+                wall-clock time of the pass in seconds
+
+        Returns
+        --------
+           textual representation of the statistics (str)
+        """
+        shards = "\t|\t".join("{0}: {1} sites".format(client.node, client.sent) for client in clients)
+        return "shards: {0}\t|\twall: {1:.3f} s\t|\t{2}".format(len(clients), elapsed, shards)
+
+    def close(self) -> None:
+        r"""
+        Closes the connections and stops the local shards
+
+        Returns
+        --------
+            None
+        """
+        for client in self.clients or []:
+            client.close()
+        for process in self.processes:
+            process.terminate()
+        self.clients, self.processes = None, []
+
+    def run_round(self, ring: HashRing, clients: dict[str, ShardClient], readers: Iterable[ReadObject]) -> Generator:
+        r"""
+        Sends the sites to the shards of the ring and yields the merged values until every shard is done
+
+        Parameters
+        ------------
+            ring: HashRing
+                Ring of the connected shards
+            clients: dict[str, ShardClient]
+                Name of the shard -> client (of the shards of the ring)
+            readers: Iterable[ReadObject]
+                Sites of the round
+
+        Returns
+        --------
+            Generator of the adapted values (Generator)
+        """
+        timeout = self.get_read_timeout()
+        for client in clients.values():
+            client.start(timeout)
+        results = queue.Queue(maxsize=1024)
+        for client in clients.values():
+            Thread(target=self.collect, args=(client, results), name="shard-{0}".format(client.node), daemon=True).start()
+        dispatcher = Thread(
+            target=self.dispatch, args=(ring, clients, readers), name="shard-dispatch", daemon=True
+        )
+        dispatcher.start()
+
+        remaining = len(clients)
+        while remaining:
+            value = results.get()
+            if isinstance(value, ShardClient):
+                remaining -= 1
+                continue
+            worker = self.adapt(value)
+            if worker is not None:
+                yield worker
+        # the failed shards close their connections, so the dispatcher is not blocked on them
+        dispatcher.join()
+        for client in clients.values():
+            if client.error is not None:
+                yield CheckerException("shard {0} failed, {1} of {2} sites are moved to the next shards ({3})".format(
+                    client.node, len(client.pending), client.sent, client.error
+                ))
+
+    def __call__(self) -> Any:
+        r"""
+        Runs all iterations of the worker (the pending sites of the failed shards are checked
+        by the next shards of the ring in the following rounds)
+
+        Returns
+        --------
+           Returns the generator from the full cycle of the worker's execution (Any)
+        """
+        if (yield from self.get_input_errors()):
+            return
+
+        yield from self.connect()
+        clients = {client.node: client for client in self.clients if client.connected}
+        if not clients:
+            yield CheckerException("no shards are available")
+            return
+
+        start = perf_counter()
+        ring = HashRing(clients, replicas=self.REPLICAS)
+        sent = dict.fromkeys(clients, 0)
+        readers = CSVReader.__call__(self)
+        while True:
+            active = {node: clients[node] for node in ring.nodes}
+            yield from self.run_round(ring, active, readers)
+            for client in active.values():
+                sent[client.node] += client.sent
+
+            readers = [
+                client.pending[site] for client in active.values() if not client.connected for site in sorted(client.pending)
+            ]
+            for client in active.values():
+                if not client.connected:
+                    ring.remove(client.node)
+            if not readers:
+                break
+            if not len(ring):
+                for reader in readers:
+                    yield CheckerException("no shards are available, the site is not checked ({0})".format(reader.host))
+                break
+
+        for client in clients.values():
+            client.sent = sent[client.node]
+        yield self.get_shard_description(list(clients.values()), perf_counter() - start)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    r"""
+    Entry point of the shard server (python -m checker.shard [--host HOST] [--port PORT])
+
+    Parameters
+    ------------
+        argv: Optional[list[str]]
+            Command line arguments (sys.argv[1:] by default)
+
+    Returns
+    --------
+        Exit code (int)
+    """
+    parser = argparse.ArgumentParser(prog="python -m checker.shard", description="Shard server of the site status checker")
+    parser.add_argument("--host", default=config.SHARD_HOST, help="address of the server (default: SHARD_HOST)")
+    parser.add_argument("--port", type=int, default=config.SHARD_PORT, help="port of the server (default: SHARD_PORT)")
+    args = parser.parse_args(argv)
+
+    print("[INFO]: shard listening on {0}:{1}".format(args.host, args.port), file=sys.stderr)
+    try:
+        serve(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
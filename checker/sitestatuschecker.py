@@ -18,11 +18,21 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-from typing import Union, Any
+from time import perf_counter
+from collections import deque, defaultdict
+from threading import current_thread
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Union, Any, Generator, Iterable, Optional
 
+from checker.units.context import PassContext
+from checker.units.flight import SingleFlight
 from checker.units.controller import Controller
-from checker.units.exceptions import SSCException, FileInvalidFormat
-from checker.units.reader import CSVReader
+from checker.units.metrics import Metrics
+from checker.units.tracing import Tracer
+from checker.units.exceptions import SSCException, FileInvalidFormat, CheckTimeoutError
+from checker.units.reader import CSVReader, ReadObject
+from checker.units.result import CheckResult
+from checker.store import ResultStore
 
 __all__ = (
     "SiteStatusChecker",
@@ -39,17 +49,59 @@ class SiteStatusChecker(CSVReader):
     YIELD_ERRORS: bool = False
         the parameter is responsible for displaying errors
         from the contents of the .csv file
+    WORKERS: int = 0
+        the number of threads checking sites (0 - sites are checked one by one)
+    KEEP_ORDER: bool = True
+        return results of the thread pool in the order of the .csv file
+        (otherwise in the order of completion)
+    BATCH_SIZE: int = 1000
+        the number of sites whose batched stages (ping, port scan) are run together
+    MAX_IN_FLIGHT: int = 512
+        the maximum number of simultaneous connects of the port scan
+    STORE: Optional[ResultStore] = None
+        the store the results of the checks are appended to (None - results are not stored)
+    PASS_BUDGET: float = 0
+        time budget of one pass in seconds, the sites that are not checked
+        before its end are reported as CheckTimeoutError (0 - no budget)
 
     error_checker(value: Any) -> bool
         the function checks the value argument for
         belonging to the parent error class (SSCException)
-    get_text_description(outputs: Union[dict, list]) -> str
+    get_text_description(outputs: Union[CheckResult, list]) -> Union[str, list[str]]
         adapts controller output to console output
+    get_input_errors() -> Generator
+        yields errors of the .csv file, returns True if the check must be stopped
+    adapt(worker: Any) -> Any
+        adapts the result of the controller (results are formatted only when they are printed)
+    get_deadline() -> Optional[float]
+        returns the end of the PASS_BUDGET of the pass started now
+    get_timeout_error(reader: ReadObject) -> CheckTimeoutError
+        returns the error of the site that was not checked before the end of the PASS_BUDGET
+    get_batches(deadline: Optional[float] = None, flight: Optional[SingleFlight] = None,
+                readers: Optional[Iterable[ReadObject]] = None) -> Generator
+        splits the sites into batches and runs the batched stages for each of them
+    record(reader: ReadObject, result: Any, status_code: Optional[int] = None) -> None
+        appends the result of the controller to the STORE
+    check(reader: ReadObject, context: PassContext) -> tuple[Any, str, float]
+        checks one site, records the result (STORE and Metrics) and measures the time spent by the thread
+    get_timing_description(timings: dict, elapsed: float, workers: int) -> str
+        adapts the timings of the thread pool to console output
+    iter_checks(readers: Iterable[ReadObject], deadline: Optional[float] = None,
+                flight: Optional[SingleFlight] = None, timings: Optional[dict] = None) -> Generator
+        checks the sites (in the thread pool or one by one) and yields (site, result)
+    run_in_pool() -> Generator
+        checks the sites in the thread pool
     __call__() -> Any
         Calls one iteration of the worker
     """
     IGNORE_ERRORS: bool = False
     YIELD_ERRORS: bool = False
+    WORKERS: int = 0
+    KEEP_ORDER: bool = True
+    BATCH_SIZE: int = 1000
+    MAX_IN_FLIGHT: int = 512
+    STORE: Optional[ResultStore] = None
+    PASS_BUDGET: float = 0
 
     def __init__(self, filename: str) -> None:
         super().__init__(filename)
@@ -75,71 +127,317 @@ class SiteStatusChecker(CSVReader):
         return False
 
     @staticmethod
-    def get_text_description(outputs: Union[dict, list]) -> str:
+    def get_text_description(outputs: Union[CheckResult, list]) -> Union[str, list[str]]:
         r"""
         Adapts controller output to console output
 
         Parameters
         ------------
-            outputs: Union[dict, list]
+            outputs: Union[CheckResult, list]
                 controller's iteration result
 
         Returns
         --------
-           returns a textual representation of the controller's iteration result (str)
+           returns a textual representation of the controller's iteration result (Union[str, list[str]])
         """
-        if isinstance(outputs, dict):
-            return "host: {0}\t|\tip: {1}\t|\tRTT: {2:.3f} ms\t|\tport: ???\t|\tmulty ip: {3}".format(
-                *outputs.values()
-            )
-        else:
-            result = []
-
-            for output in outputs:
-                if len(output.values()) == 6:
-                    result.append(
-                        "host: {0}\t|\tip: {1}\t|\tRTT: {2:.3f} ms\t|\tport: {3}\t|\tstatus: {4}\t|\tmulty ip: {5}".format(
-                            *output.values()
-                        )
-                    )
-                elif "ssl" in output.keys():
-                    result.append(
-                        "host: {0}\t|\tip: {1}\t|\tRTT: {2:.3f} ms\t|\tport: {3}\t"
-                        "|\tstatus: {4}\t|\tmulty ip: {5}\t|\tssl: {6}".format(
-                            *output.values()
-                        )
-                    )
-                else:
-                    result.append(
-                        "host: {0}\t|\tip: {1}\t|\tRTT: {2:.3f} ms\t|\tport: ???\t|\tmulty ip: {3}".format(
-                            *output.values()
-                        )
-                    )
-
-            return result
+        if isinstance(outputs, CheckResult):
+            return str(outputs)
+        return [str(output) for output in outputs]
 
-    def __call__(self) -> Any:
+    def get_input_errors(self) -> Generator:
         r"""
-        Runs all iterations of the worker
+        Yields errors of the .csv file
 
         Returns
         --------
-           Returns the generator from the full cycle of the worker's execution (Any)
+           Generator of the errors, its return value is True if the check must be stopped (Generator)
         """
         if isinstance(self.input_error_status, SSCException):
             if isinstance(self.input_error_status, FileInvalidFormat) or not self.IGNORE_ERRORS:
                 yield self.input_error_status
-                return
+                return True
             if self.YIELD_ERRORS:
                 yield self.input_error_status
+        return False
+
+    def adapt(self, worker: Any) -> Any:
+        r"""
+        Adapts the result of the controller: errors and results are returned as is
+        (CheckResult is formatted only when it is printed)
+
+        Parameters
+        ------------
+            worker: Any
+                controller's iteration result
+
+        Returns
+        --------
+           Error, CheckResult, list of CheckResult or None (Any)
+        """
+        return worker
+
+    def get_deadline(self) -> Optional[float]:
+        r"""
+        Returns the end of the PASS_BUDGET of the pass started now
+
+        Returns
+        --------
+           perf_counter() value of the end of the budget, None if there is no budget (Optional[float])
+        """
+        if self.PASS_BUDGET > 0:
+            return perf_counter() + self.PASS_BUDGET
+        return None
+
+    @staticmethod
+    def get_timeout_error(reader: ReadObject) -> CheckTimeoutError:
+        r"""
+        Returns the error of the site that was not checked before the end of the PASS_BUDGET
+
+        Parameters
+        ------------
+            reader: ReadObject
+                site that was not checked
+
+        Returns
+        --------
+           CheckTimeoutError
+        """
+        return CheckTimeoutError("pass budget exceeded ({0})".format(reader.host))
+
+    def get_batches(
+            self, deadline: Optional[float] = None, flight: Optional[SingleFlight] = None,
+            readers: Optional[Iterable[ReadObject]] = None
+    ) -> Generator:
+        r"""
+        Splits the sites into batches of BATCH_SIZE and runs the batched stages
+        (every unique IP address of the batch is pinged once and
+        every unique (ip, port) pair is connected once) for each of them,
+        the batched stages are skipped after the deadline
+
+        Parameters
+        ------------
+            deadline: Optional[float]
+                perf_counter() value of the end of the pass budget (None - no budget)
+            flight: Optional[SingleFlight]
+                probes shared by all batches of the pass (new for every batch by default)
+            readers: Optional[Iterable[ReadObject]]
+                sites to split (the sites of the .csv file by default)
+
+        Returns
+        --------
+           Generator of (list[ReadObject], PassContext) (Generator)
+        """
+        batch = []
+        for reader in CSVReader.__call__(self) if readers is None else readers:
+            batch.append(reader)
+            if len(batch) >= self.BATCH_SIZE:
+                yield batch, self.__build_context(batch, deadline, flight)
+                batch = []
+        if batch:
+            yield batch, self.__build_context(batch, deadline, flight)
+
+    def __build_context(
+            self, batch: list[ReadObject], deadline: Optional[float], flight: Optional[SingleFlight]
+    ) -> PassContext:
+        if deadline is not None and perf_counter() >= deadline:
+            return PassContext(flight=flight)
+        return PassContext.build(batch, max_in_flight=self.MAX_IN_FLIGHT, deadline=deadline, flight=flight)
+
+    def record(self, reader: ReadObject, result: Any, status_code: Optional[int] = None) -> None:
+        r"""
+        Appends the result of the controller to the STORE (if it is set)
+
+        Parameters
+        ------------
+            reader: ReadObject
+                checked site
+            result: Any
+                result of the controller
+            status_code: Optional[int]
+                HTTP status code of the site
+
+        Returns
+        --------
+           None
+        """
+        if self.STORE is not None:
+            self.STORE.append_result(reader, result, status_code)
 
-        for reader in super().__call__():
-            worker = Controller(reader)()
-            if self.error_checker(worker):
+    @Tracer.get_instance().span("check")
+    def check(self, reader: ReadObject, context: PassContext) -> tuple[Any, str, float]:
+        r"""
+        Checks one site, records the result (STORE and Metrics) and measures the time spent by the thread
+
+        Parameters
+        ------------
+            reader: ReadObject
+                site to check
+            context: PassContext
+                results of the batched stages
+
+        Returns
+        --------
+           Result of the controller, name of the thread and time of the check in seconds (tuple[Any, str, float])
+        """
+        metrics = Metrics.get_instance()
+        metrics.enter()
+        start = perf_counter()
+        try:
+            controller = Controller(reader, context)
+            result = controller()
+        finally:
+            elapsed = perf_counter() - start
+            metrics.leave()
+        metrics.record(reader.host, result)
+        if self.STORE is not None:
+            probe = controller.probes.get(reader.host)
+            self.record(reader, result, probe.status_code if probe is not None else None)
+        return result, current_thread().name, elapsed
+
+    @staticmethod
+    def get_timing_description(timings: dict, elapsed: float, workers: int) -> str:
+        r"""
+        Adapts the timings of the thread pool to console output
+
+        Parameters
+        ------------
+            timings: dict
+                thread name -> list of the check times
+            elapsed: float
+                wall-clock time of the iteration in seconds
+            workers: int
+                size of the thread pool
+
+        Returns
+        --------
+           textual representation of the timings (str)
+        """
+        busy = sum(sum(times) for times in timings.values())
+        threads = "\t|\t".join(
+            "{0}: {1} sites, {2:.3f} s".format(name, len(times), sum(times))
+            for name, times in sorted(timings.items())
+        )
+        return "workers: {0}\t|\twall: {1:.3f} s\t|\tbusy: {2:.3f} s\t|\tutilization: {3:.0%}\t|\t{4}".format(
+            workers, elapsed, busy, busy / (elapsed * workers) if elapsed else 0, threads
+        )
+
+    def iter_checks(
+            self, readers: Iterable[ReadObject], deadline: Optional[float] = None,
+            flight: Optional[SingleFlight] = None, timings: Optional[dict] = None
+    ) -> Generator:
+        r"""
+        Checks the sites in the thread pool (if WORKERS > 0) or one by one, the results of the pool
+        are returned in the order of the sites if KEEP_ORDER else in the order of completion,
+        the sites that are not checked before the deadline are returned with CheckTimeoutError
+
+        Parameters
+        ------------
+            readers: Iterable[ReadObject]
+                sites to check
+            deadline: Optional[float]
+                perf_counter() value of the end of the pass budget (None - no budget)
+            flight: Optional[SingleFlight]
+                probes shared by the checks (new for every batch by default)
+            timings: Optional[dict]
+                thread name -> list of the check times (filled if it is given)
+
+        Returns
+        --------
+           Generator of (ReadObject, result of the controller) (Generator)
+        """
+        timings = defaultdict(list) if timings is None else timings
+        batches = self.get_batches(deadline, flight, readers)
+        if self.WORKERS <= 0:
+            for batch, context in batches:
+                for reader in batch:
+                    if deadline is not None and perf_counter() >= deadline:
+                        yield reader, self.get_timeout_error(reader)
+                        continue
+                    result, name, elapsed = self.check(reader, context)
+                    timings[name].append(elapsed)
+                    yield reader, result
+            return
+
+        readers = ((reader, context) for batch, context in batches for reader in batch)
+        pool = ThreadPoolExecutor(max_workers=self.WORKERS, thread_name_prefix="worker")
+        pending = deque()
+        expired = False
+        try:
+            while True:
+                for reader, context in readers:
+                    pending.append((pool.submit(self.check, reader, context), reader))
+                    if len(pending) >= self.WORKERS * 2:
+                        break
+                if not pending:
+                    break
+
+                timeout = None if deadline is None else max(deadline - perf_counter(), 0)
+                if self.KEEP_ORDER:
+                    done, _ = wait([pending[0][0]], timeout=timeout)
+                else:
+                    done, _ = wait([future for future, _ in pending], timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    expired = True
+                    break
+                for future, reader in [item for item in pending if item[0] in done]:
+                    result, name, elapsed = future.result()
+                    timings[name].append(elapsed)
+                    yield reader, result
+                pending = deque(item for item in pending if item[0] not in done)
+
+            for future, reader in pending:
+                if future.cancel() or not future.done():
+                    yield reader, self.get_timeout_error(reader)
+                    continue
+                result, name, elapsed = future.result()
+                timings[name].append(elapsed)
+                yield reader, result
+            for reader, _ in readers:
+                yield reader, self.get_timeout_error(reader)
+        finally:
+            # the checks that are still running after the end of the budget are not waited for
+            pool.shutdown(wait=not expired, cancel_futures=True)
+
+    def run_in_pool(self) -> Generator:
+        r"""
+        Checks the sites in the thread pool (WORKERS threads), the results are returned
+        in the order of the .csv file if KEEP_ORDER else in the order of completion,
+        the sites that are not checked before the end of the PASS_BUDGET are returned
+        as CheckTimeoutError, the last value is the description of the thread timings
+        (the shared probes are counted by Metrics)
+
+        Returns
+        --------
+           Generator of the adapted results (Generator)
+        """
+        timings = defaultdict(list)
+        start = perf_counter()
+        for _, result in self.iter_checks(CSVReader.__call__(self), self.get_deadline(), SingleFlight(), timings):
+            worker = self.adapt(result)
+            if worker is not None:
                 yield worker
-                continue
+
+        yield self.get_timing_description(timings, perf_counter() - start, self.WORKERS)
+
+    def __call__(self) -> Any:
+        r"""
+        Runs all iterations of the worker
+
+        Returns
+        --------
+           Returns the generator from the full cycle of the worker's execution (Any)
+        """
+        if (yield from self.get_input_errors()):
+            return
+
+        if self.WORKERS > 0:
+            yield from self.run_in_pool()
+            return
+
+        for _, result in self.iter_checks(CSVReader.__call__(self), self.get_deadline(), SingleFlight()):
+            worker = self.adapt(result)
             if worker is not None:
-                yield self.get_text_description(worker)
+                yield worker
 
     def __str__(self) -> str:
         return "[{0}]".format(", ".join([str(obj) for obj in self.units]))
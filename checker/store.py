@@ -0,0 +1,430 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+import math
+import time
+import struct
+
+from bisect import bisect_right
+from threading import Event, Lock, Thread
+from datetime import datetime, timezone, timedelta
+from typing import Any, Optional
+
+from checker.units.result import CheckResult
+
+__all__ = (
+    "ResultStore",
+)
+
+# RTT histogram bounds of the hourly rollups (ms, log scale from 0.1 ms to ~10 s)
+RTT_BOUNDS = tuple(0.1 * 1.3 ** i for i in range(44))
+
+
+class ResultStore(object):
+    r"""
+    Compact append-only store of the check results
+
+    Every result is a fixed-width binary record in a daily raw file
+    (raw-YYYYMMDD.bin), host names, IP addresses and error classes are stored
+    once in names.txt and referenced by id. Records are written in batches,
+    on every flush (and every flush_interval seconds by a background thread) closed minutes and hours are downsampled into rollups
+    (1m-YYYYMMDD.bin with count/ok/sum/min/max RTT and 1h-YYYYMM.bin with
+    an RTT histogram as well), so that queries over days read only the rollups.
+    Files older than their retention are deleted on open and close, so the disk usage is bounded
+
+    path: str
+        Directory of the store
+    batch: int
+        The number of buffered records that triggers a flush
+    flush_interval: float
+        The maximum time between flushes in seconds (0 - no background flushes)
+    raw_days: int
+        Retention of the raw records in days
+    minute_days: int
+        Retention of the minute rollups in days
+    hour_days: int
+        Retention of the hour rollups in days
+
+    get_id(name: str) -> int
+        Returns the id of the name (host, ip, error class)
+    append(host: str, ip: str = "", port: int = 0, rtt: float = nan, port_status: Optional[bool] = None,
+           ssl: Optional[bool] = None, status_code: int = 0, error: str = "", timestamp: Optional[float] = None) -> None
+        Buffers one result
+    append_result(target: ReadObject, result: Any, status_code: Optional[int] = None) -> None
+        Buffers the result of the controller
+    flush() -> None
+        Writes the buffered records and closed rollups
+    compact(now: Optional[float] = None) -> None
+        Deletes files older than their retention
+    read_raw(day: datetime) -> Generator
+        Reads the raw records of the day
+    read_hours(host: str, start: float, end: float) -> list[tuple]
+        Reads the hourly rollups of the host
+    percentile(host: str, q: float, start: float, end: float) -> Optional[float]
+        Returns the q-th percentile of the RTT of the host (from the hourly rollups)
+    close() -> None
+        Stops the background flushes and flushes the store
+    """
+    __slots__ = (
+        "path", "batch", "flush_interval", "raw_days", "minute_days", "hour_days",
+        "names", "_new_names", "_buffer", "_minutes", "_hours", "_flushed_at", "_lock", "_stop"
+    )
+    RAW = struct.Struct("<dIIHfbbhI")
+    MINUTE = struct.Struct("<IIIIdff")
+    HOUR = struct.Struct("<IIIIdff{0}I".format(len(RTT_BOUNDS) + 1))
+
+    def __init__(
+            self, path: str = "results", batch: int = 1000, flush_interval: float = 10,
+            raw_days: int = 7, minute_days: int = 30, hour_days: int = 365
+    ) -> None:
+        self.path = path
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.raw_days = raw_days
+        self.minute_days = minute_days
+        self.hour_days = hour_days
+
+        self.names: dict[str, int] = {}
+        self._new_names = []
+        self._buffer = []
+        self._minutes = {}
+        self._hours = {}
+        self._flushed_at = time.monotonic()
+        self._lock = Lock()
+        self._stop = Event()
+
+        os.makedirs(path, exist_ok=True)
+        names = os.path.join(path, "names.txt")
+        if os.path.exists(names):
+            with open(names, "r", encoding="utf-8") as file:
+                for index, name in enumerate(file.read().splitlines()):
+                    self.names[name] = index
+        self.compact()
+        if flush_interval > 0:
+            Thread(target=self.__run, name="store-flush", daemon=True).start()
+
+    def get_id(self, name: str) -> int:
+        r"""
+        Returns the id of the name (host, ip, error class), new names are added
+
+        Parameters
+        ------------
+            name: str
+                Name to store
+
+        Returns
+        --------
+            Id of the name (int)
+        """
+        index = self.names.get(name)
+        if index is None:
+            index = self.names[name] = len(self.names)
+            self._new_names.append(name)
+        return index
+
+    def append(
+            self, host: str, ip: str = "", port: int = 0, rtt: float = math.nan,
+            port_status: Optional[bool] = None, ssl: Optional[bool] = None,
+            status_code: int = 0, error: str = "", timestamp: Optional[float] = None
+    ) -> None:
+        r"""
+        Buffers one result (the store is flushed when the buffer is full or flush_interval passed)
+
+        Parameters
+        ------------
+            host: str
+                Host of the site
+            ip: str
+                IP address
+            port: int
+                Port (0 - no port)
+            rtt: float
+                RTT in ms (nan - unknown)
+            port_status: Optional[bool]
+                Port status (None - not checked)
+            ssl: Optional[bool]
+                Validity of the ssl certificate (None - not checked)
+            status_code: int
+                HTTP status code (0 - unknown)
+            error: str
+                Error class ("" - no error)
+            timestamp: Optional[float]
+                Time of the check (time.time() by default)
+
+        Returns
+        --------
+            None
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            host_id = self.get_id(host)
+            self._buffer.append(self.RAW.pack(
+                timestamp, host_id, self.get_id(ip), port, rtt,
+                -1 if port_status is None else int(port_status), -1 if ssl is None else int(ssl),
+                status_code, self.get_id(error)
+            ))
+            self.__aggregate(host_id, timestamp, rtt, not error and port_status is not False)
+            full = len(self._buffer) >= self.batch
+
+        if full or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def append_result(self, target, result: Any, status_code: Optional[int] = None) -> None:
+        r"""
+        Buffers the result of the controller
+
+        Parameters
+        ------------
+            target: ReadObject
+                Checked site
+            result: Any
+                Result of the controller (CheckResult, list of CheckResult or error),
+                the RTT of a ping without reply (CheckResult.NO_REPLY) is stored as unknown (nan)
+            status_code: Optional[int]
+                HTTP status code of the site
+
+        Returns
+        --------
+            None
+        """
+        if target.host is None or result is None:
+            return
+        if isinstance(result, Exception):
+            self.append(target.host, error=result.__class__.__name__)
+            return
+
+        for output in result if isinstance(result, list) else [result]:
+            rtt = math.nan if output.ping is None or output.ping >= CheckResult.NO_REPLY else output.ping
+            self.append(
+                target.host, output.host_ip, output.port or 0, rtt,
+                output.port_status, output.ssl, status_code or 0
+            )
+
+    def flush(self, force: bool = False) -> None:
+        r"""
+        Writes the buffered records and closed rollups (one write per file)
+
+        Parameters
+        ------------
+            force: bool
+                Write the rollups that are not closed yet as well
+
+        Returns
+        --------
+            None
+        """
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+            names, self._new_names = self._new_names, []
+            now = math.inf if force else time.time()
+            minutes = self.__pop_closed(self._minutes, now if force else now - now % 60)
+            hours = self.__pop_closed(self._hours, now if force else now - now % 3600)
+            self._flushed_at = time.monotonic()
+
+            if names:
+                with open(os.path.join(self.path, "names.txt"), "a", encoding="utf-8") as file:
+                    file.write("".join(name.replace("\n", " ") + "\n" for name in names))
+
+            files = {}
+            for record in buffer:
+                files.setdefault(self.__get_file("raw", self.RAW.unpack_from(record)[0]), []).append(record)
+            for (host_id, start), (count, ok, total, low, high, _) in minutes.items():
+                files.setdefault(self.__get_file("1m", start), []).append(
+                    self.MINUTE.pack(start, host_id, count, ok, total, low, high)
+                )
+            for (host_id, start), (count, ok, total, low, high, histogram) in hours.items():
+                files.setdefault(self.__get_file("1h", start), []).append(
+                    self.HOUR.pack(start, host_id, count, ok, total, low, high, *histogram)
+                )
+            for filename, records in files.items():
+                with open(filename, "ab") as file:
+                    file.write(b"".join(records))
+
+    def compact(self, now: Optional[float] = None) -> None:
+        r"""
+        Deletes files older than their retention
+
+        Parameters
+        ------------
+            now: Optional[float]
+                Current time (time.time() by default)
+
+        Returns
+        --------
+            None
+        """
+        today = datetime.fromtimestamp(time.time() if now is None else now, timezone.utc)
+        limits = {
+            "raw": (today - timedelta(days=self.raw_days)).strftime("%Y%m%d"),
+            "1m": (today - timedelta(days=self.minute_days)).strftime("%Y%m%d"),
+            "1h": (today - timedelta(days=self.hour_days)).strftime("%Y%m"),
+        }
+        for filename in os.listdir(self.path):
+            kind, _, date = filename[:-len(".bin")].partition("-")
+            if filename.endswith(".bin") and kind in limits and date < limits[kind]:
+                os.remove(os.path.join(self.path, filename))
+
+    def read_raw(self, day: datetime):
+        r"""
+        Reads the raw records of the day
+
+        Parameters
+        ------------
+            day: datetime
+                Day of the records (UTC)
+
+        Returns
+        --------
+            Generator of (timestamp, host, ip, port, rtt, port_status, ssl, status_code, error) (Generator)
+        """
+        names = {index: name for name, index in self.names.items()}
+        filename = os.path.join(self.path, "raw-{0}.bin".format(day.strftime("%Y%m%d")))
+        if not os.path.exists(filename):
+            return
+        with open(filename, "rb") as file:
+            for timestamp, host, ip, port, rtt, port_status, ssl, status_code, error in self.RAW.iter_unpack(file.read()):
+                yield (
+                    timestamp, names[host], names[ip], port, rtt, None if port_status < 0 else bool(port_status),
+                    None if ssl < 0 else bool(ssl), status_code, names[error]
+                )
+
+    def read_hours(self, host: str, start: float, end: float) -> list[tuple]:
+        r"""
+        Reads the hourly rollups of the host (including the hour that is not closed yet)
+
+        Parameters
+        ------------
+            host: str
+                Host of the site
+            start: float
+                Start of the range (timestamp)
+            end: float
+                End of the range (timestamp)
+
+        Returns
+        --------
+            List of (hour, count, ok, sum rtt, min rtt, max rtt, histogram) (list[tuple])
+        """
+        host_id = self.names.get(host)
+        if host_id is None:
+            return []
+
+        months = sorted({
+            datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y%m")
+            for timestamp in range(int(start - start % 3600), int(end) + 1, 3600)
+        })
+        rollups = []
+        for month in months:
+            filename = os.path.join(self.path, "1h-{0}.bin".format(month))
+            if not os.path.exists(filename):
+                continue
+            with open(filename, "rb") as file:
+                for hour, record_host, count, ok, total, low, high, *histogram in self.HOUR.iter_unpack(file.read()):
+                    if record_host == host_id and start - 3600 < hour <= end:
+                        rollups.append((hour, count, ok, total, low, high, histogram))
+
+        with self._lock:
+            for (record_host, hour), (count, ok, total, low, high, histogram) in self._hours.items():
+                if record_host == host_id and start - 3600 < hour <= end:
+                    rollups.append((hour, count, ok, total, low, high, list(histogram)))
+        return sorted(rollups, key=lambda rollup: rollup[0])
+
+    def percentile(self, host: str, q: float, start: float, end: float) -> Optional[float]:
+        r"""
+        Returns the q-th percentile of the RTT of the host (from the hourly rollups,
+        the value is the upper bound of the histogram bucket)
+
+        Parameters
+        ------------
+            host: str
+                Host of the site
+            q: float
+                Percentile (0-100)
+            start: float
+                Start of the range (timestamp)
+            end: float
+                End of the range (timestamp)
+
+        Returns
+        --------
+            RTT in ms or None if there are no samples (Optional[float])
+        """
+        histogram = [0] * (len(RTT_BOUNDS) + 1)
+        high = 0.0
+        for rollup in self.read_hours(host, start, end):
+            histogram = [a + b for a, b in zip(histogram, rollup[6])]
+            high = max(high, rollup[5])
+
+        total = sum(histogram)
+        if not total:
+            return None
+        rank = q / 100 * total
+        seen = 0
+        for index, count in enumerate(histogram):
+            seen += count
+            if seen >= rank and count:
+                return min(RTT_BOUNDS[index], high) if index < len(RTT_BOUNDS) else high
+        return high
+
+    def close(self) -> None:
+        r"""
+        Stops the background flushes and flushes the store (including the rollups that are not closed yet)
+
+        Returns
+        --------
+            None
+        """
+        self._stop.set()
+        self.flush(force=True)
+        self.compact()
+
+    def __run(self) -> None:
+        # writes the results of the sites that are checked rarely and the rollups of the closed minutes
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def __aggregate(self, host_id: int, timestamp: float, rtt: float, ok: bool) -> None:
+        for aggregates, size in ((self._minutes, 60), (self._hours, 3600)):
+            key = (host_id, int(timestamp - timestamp % size))
+            aggregate = aggregates.get(key)
+            if aggregate is None:
+                histogram = [0] * (len(RTT_BOUNDS) + 1) if size == 3600 else None
+                aggregate = aggregates[key] = [0, 0, 0.0, math.inf, 0.0, histogram]
+            aggregate[0] += 1
+            aggregate[1] += ok
+            if not math.isnan(rtt):
+                aggregate[2] += rtt
+                aggregate[3] = min(aggregate[3], rtt)
+                aggregate[4] = max(aggregate[4], rtt)
+                if size == 3600:
+                    aggregate[5][bisect_right(RTT_BOUNDS, rtt)] += 1
+
+    @staticmethod
+    def __pop_closed(aggregates: dict, current: float) -> dict:
+        closed = {key: aggregates.pop(key) for key in [key for key in aggregates if key[1] < current]}
+        return {key: value[:3] + [0.0 if value[3] == math.inf else value[3]] + value[4:] for key, value in closed.items()}
+
+    def __get_file(self, kind: str, timestamp: float) -> str:
+        date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y%m" if kind == "1h" else "%Y%m%d")
+        return os.path.join(self.path, "{0}-{1}.bin".format(kind, date))
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, self.path)
@@ -18,8 +18,19 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-import checker.units.controller
-import checker.units.exceptions
-import checker.units.reader
+import importlib
 
-__all__ = ("controller", "exceptions", "reader")
\ No newline at end of file
+__all__ = (
+    "asynccontroller", "connectivity", "context", "controller", "exceptions", "flight", "metrics", "pinger", "probe",
+    "reader", "resolver", "result", "scanner", "timeouts", "tls", "tracing"
+)
+
+
+def __getattr__(name: str):
+    if name not in __all__:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+    return importlib.import_module("{0}.{1}".format(__name__, name))
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,647 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import re
+import ssl
+import socket
+import asyncio
+import urllib.parse
+
+from time import perf_counter
+
+from typing import Union, Any, Optional
+
+from checker.units.exceptions import (
+    IgnoreInternetExceptions, CheckerException, InternetConnectionError, SSCException
+)
+from checker.units.context import PassContext
+from checker.units.metrics import Metrics
+from checker.units.tracing import Tracer
+from checker.units.reader import ReadObject
+from checker.units.result import CheckResult
+from checker.units.resolver import DNSCache
+from checker.units.scanner import PortScanner
+from checker.units.timeouts import TimeoutPolicy
+from checker.units.tls import TLSInspector, CertificateInfo
+from checker.units.probe import HTTPProbe
+from checker.config import IP, TIMEOUT_DEFAULT, PROBE_METHOD, PROBE_MAX_BYTES
+from checker.config import headers
+
+__all__ = ("AsyncController", )
+
+metrics = Metrics.get_instance()
+tracer = Tracer.get_instance()
+timeouts = TimeoutPolicy.get_instance()
+
+class AsyncController(object):
+    r"""
+    Asynchronous version of the Controller class:
+    all checks for a single site are performed on the event loop,
+    the result (CheckResult, list of CheckResult or CheckerException) is the same as in Controller
+
+    get_correct_url(url: str) -> str
+        The function for getting the correct type of link (http://url/)
+    get_timeout(target: str, stage: str) -> float
+        Returns the timeout of the stage of the target learned by TimeoutPolicy
+    resolve(host: str) -> str
+        Coroutine that returns the first address of the host from the DNS cache
+    get_address(host: str) -> Optional[str]
+        Coroutine that returns the first address of the host (None if it is not resolved)
+    close(writer: asyncio.StreamWriter, timeout: float) -> None
+        Coroutine that closes the connection and waits until it is closed
+    fetch_status(url: str) -> Optional[int]
+        Coroutine that makes a GET request and returns the response status code
+    get_ip_success(ip: str) -> bool
+        Coroutine that checks the availability of the ip address of the site
+    get_status_code(url: str) -> int
+        Coroutine that returns a code after a get request to the site
+    check_port(host: str, port: int) -> bool
+        Coroutine checking port availability (closed or open)
+    get_ip_from_host(host: str) -> Union[set, bool]
+        Coroutine that gets an IP address from a domain name
+    get_host_from_ip(host: str) -> Union[bool, str]
+        Coroutine that gets a domain name by IP address (from the reverse lookups of the pass)
+    get_certificate(self, hostname: str, address: Optional[str] = None) -> CertificateInfo
+        Coroutine that returns the certificate of the host (cached by TLSInspector)
+    check_ssl(self, host: str) -> bool
+        Coroutine checks for the presence (relevance) of the site's ssl certificates
+    ping(self, ip: str) -> float
+        Coroutine that returns the RTT of the ip address
+    check_domains(self, target: ReadObject) -> Any
+        Coroutine that conducts all basic checks for the site
+    __call__(self) -> Any
+        Coroutine performs all necessary checks for the site and returns
+    """
+    __slots__ = (
+        "target", "context", "status_code"
+    )
+    TIMEOUT: float = TIMEOUT_DEFAULT
+    MAX_REDIRECTS: int = 5
+
+    def __init__(self, target: ReadObject, context: Optional[PassContext] = None) -> None:
+        self.target: ReadObject = target
+        self.context: PassContext = PassContext() if context is None else context
+        self.status_code: Optional[int] = None
+
+    @staticmethod
+    def get_correct_url(url: str) -> str:
+        r"""
+        The function for getting the correct type of link (http://url/)
+
+        Parameters
+        ------------
+            url: str
+                Link to format
+
+        Returns
+        --------
+            Formatted link (str)
+        """
+        if "http://" in url or "https://" in url:
+            return url
+        return "http://" + url
+
+    def get_timeout(self, target: str, stage: str) -> float:
+        r"""
+        Returns the timeout of the stage of the target learned by TimeoutPolicy
+        (TIMEOUT for targets without history)
+
+        Parameters
+        ------------
+            target: str
+                Host name or IP address
+            stage: str
+                "http", "tls", "tcp" or "icmp"
+
+        Returns
+        --------
+            Timeout in seconds (float)
+        """
+        return timeouts.get_timeout(target, stage, self.TIMEOUT)
+
+    @staticmethod
+    @metrics.timed("dns")
+    async def resolve(host: str) -> str:
+        r"""
+        Coroutine that returns the first address of the host from the DNS cache
+        (raises socket.gaierror if the host can not be resolved)
+
+        Parameters
+        ------------
+            host: str
+                Domain name or IP address
+
+        Returns
+        --------
+            IP address (str)
+        """
+        cache = DNSCache.get_instance()
+        if cache.is_ip(host):
+            return host
+        addresses = await asyncio.to_thread(cache.getaddrinfo, host, None, 0, socket.SOCK_STREAM)
+        return addresses[0][-1][0]
+
+    async def get_address(self, host: str) -> Optional[str]:
+        r"""
+        Coroutine that returns the first address of the host from the DNS cache (None if it is not resolved)
+
+        Parameters
+        ------------
+            host: str
+                Domain name or IP address
+
+        Returns
+        --------
+            IP address or None if the host is not resolved (Optional[str])
+        """
+        try:
+            return await self.resolve(host)
+        except (socket.gaierror, UnicodeError, IndexError):
+            return None
+
+    @staticmethod
+    async def close(writer: asyncio.StreamWriter, timeout: float) -> None:
+        r"""
+        Coroutine that closes the connection and waits until it is closed (at most timeout seconds)
+
+        Parameters
+        ------------
+            writer: asyncio.StreamWriter
+                Stream of the connection
+            timeout: float
+                The maximum wait in seconds
+
+        Returns
+        --------
+            None
+        """
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout=timeout)
+        except (asyncio.TimeoutError, OSError, ssl.SSLError):
+            pass
+
+    async def fetch_status(self, url: str) -> Optional[int]:
+        r"""
+        Coroutine that makes a HEAD request (following redirects, GET if the server rejects HEAD)
+        and returns the response status code, at most PROBE_MAX_BYTES of the response body are read
+        (the request is shared by all sites of the pass with the same address and host)
+
+        Parameters
+        ------------
+            url: str
+                Link to request
+
+        Returns
+        --------
+            Response status code or None if the response could not be received (Optional[int])
+        """
+        url = self.get_correct_url(url)
+        address = await self.get_address(urllib.parse.urlsplit(url).hostname)
+        return await self.context.flight.do_async(("http", address, 80, url.split("://", 1)[1]), self.__fetch, url)
+
+    @metrics.timed("http")
+    async def __fetch(self, url: str) -> Optional[int]:
+        host = urllib.parse.urlsplit(url).hostname
+        timeout = self.get_timeout(host, "http")
+        start = perf_counter()
+        try:
+            return await self.__fetch_status(url, timeout)
+        finally:
+            timeouts.observe(host, "http", min(perf_counter() - start, timeout))
+
+    async def __fetch_status(self, url: str, timeout: float) -> Optional[int]:
+        method = PROBE_METHOD.upper()
+        host = urllib.parse.urlsplit(url).hostname
+        received = 0
+        try:
+            for _ in range(self.MAX_REDIRECTS + 1):
+                parts = urllib.parse.urlsplit(self.get_correct_url(url))
+                is_https = parts.scheme == "https"
+                port = parts.port or (443 if is_https else 80)
+                path = parts.path or "/"
+                if parts.query:
+                    path += "?" + parts.query
+
+                try:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(
+                            await self.resolve(parts.hostname), port,
+                            ssl=ssl.create_default_context() if is_https else None,
+                            server_hostname=parts.hostname if is_https else None
+                        ), timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    return None
+                try:
+                    writer.write(
+                        "{0} {1} HTTP/1.1\r\nHost: {2}\r\nUser-Agent: {3}\r\nConnection: close\r\n\r\n".format(
+                            method, path, parts.netloc, headers["User-Agent"]
+                        ).encode("latin-1")
+                    )
+                    await writer.drain()
+                    status_line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+                    received += len(status_line)
+                    status = int(status_line.split()[1])
+
+                    location = None
+                    while True:
+                        line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+                        received += len(line)
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        if name.strip().lower() == "location":
+                            location = value.strip()
+                    if method == "GET" and PROBE_MAX_BYTES:
+                        received += len(await asyncio.wait_for(reader.read(PROBE_MAX_BYTES), timeout=timeout))
+                except (asyncio.TimeoutError, IndexError, ValueError):
+                    return None
+                finally:
+                    await self.close(writer, timeout)
+
+                if method == "HEAD" and status in HTTPProbe.FALLBACK:
+                    method = "GET"
+                    continue
+                if status // 100 != 3 or location is None:
+                    return status
+                url = urllib.parse.urljoin(parts.geturl(), location)
+            return status
+        finally:
+            if received:
+                metrics.receive(host, received)
+
+    @tracer.span("get_ip_success")
+    @IgnoreInternetExceptions(check_ip=True)
+    async def get_ip_success(self, ip: str) -> bool:
+        r"""
+        Coroutine that checks the availability of the ip address of the site
+
+        Parameters
+        ------------
+            ip: str
+                IP address to check
+
+        Returns
+        --------
+            Returns the availability status of an ip address (bool)
+        """
+        try:
+            return await self.fetch_status(ip) is not None
+        except OSError:
+            return False
+
+    @tracer.span("get_status_code")
+    @IgnoreInternetExceptions()
+    async def get_status_code(self, url: str) -> int:
+        r"""
+        Coroutine that returns a code after a get request to the site
+
+        Parameters
+        ------------
+            url: str
+                Link to get response status code
+
+        Returns
+        --------
+            Response status code (int)
+        """
+        try:
+            status = await self.fetch_status(url)
+        except (OSError, ssl.SSLError):
+            return 403
+        self.status_code = status
+        return 403 if status is None else status
+
+    @tracer.span("check_port")
+    @IgnoreInternetExceptions()
+    async def check_port(self, host: str, port: int) -> bool:
+        r"""
+        Coroutine checking port availability (closed or open)
+        (from the port scan of the pass, the port is connected if it is not there)
+
+        Parameters
+        ------------
+            host: str
+                Domain name needed to check the port
+            port: str
+                port to check (closed or open)
+
+        Returns
+        ------------
+            Port availability (closed or open) (bool)
+        """
+        try:
+            address = await self.resolve(host)
+        except (socket.gaierror, UnicodeError, IndexError):
+            return False
+
+        entry = self.context.ports.get((address, port))
+        if entry is None:
+            entry = await self.context.flight.do_async(("tcp", address, port, None), self.__connect, address, port)
+        status, latency = entry
+        if latency is not None:
+            metrics.observe("tcp", latency)
+        return status == PortScanner.OPEN
+
+    async def __connect(self, address: str, port: int) -> tuple[str, Optional[float]]:
+        timeout = self.get_timeout(address, "tcp")
+        start = perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, port), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            timeouts.observe(address, "tcp", timeout)
+            self.context.ports[(address, port)] = (PortScanner.TIMEOUT, None)
+        except (OSError, OverflowError):
+            self.context.ports[(address, port)] = (PortScanner.CLOSED, None)
+        else:
+            latency = perf_counter() - start
+            await self.close(writer, timeout)
+            self.context.ports[(address, port)] = (PortScanner.OPEN, latency)
+            timeouts.observe(address, "tcp", latency)
+        return self.context.ports[(address, port)]
+
+    @staticmethod
+    @tracer.span("get_ip_from_host")
+    @IgnoreInternetExceptions()
+    @metrics.timed("dns")
+    async def get_ip_from_host(host: str) -> Union[set, bool]:
+        r"""
+        Coroutine that gets an IP address from a domain name
+
+        Parameters
+        ------------
+            host: str
+                Domain name to be expanded into one or more IP addresses
+
+        Returns
+        ------------
+            One or more IP addresses or False
+            (if it was not possible to get the IP address)
+            (Union[set, bool])
+        """
+        try:
+            return set(
+                i[-1][0] for i in await asyncio.to_thread(DNSCache.get_instance().getaddrinfo, host, 80)
+            )
+        except (socket.gaierror, UnicodeError, IndexError):
+            return False
+
+    @tracer.span("get_host_from_ip")
+    @IgnoreInternetExceptions()
+    async def get_host_from_ip(self, host: str) -> Union[bool, str]:
+        r"""
+        Coroutine that gets a domain name by IP address
+        (from the reverse lookups of the pass, the address is looked up through the DNS cache if it is not there)
+
+        Parameters
+        ------------
+            host: str
+                IP address to be expanded into a domain name
+
+        Returns
+        ------------
+            Returns the domain name if possible, false otherwise (Union[bool, str])
+        """
+        if host in self.context.names:
+            return self.context.names[host] or False
+        return await self.context.flight.do_async(("rdns", host, None, None), self.__get_host_from_ip, host)
+
+    @staticmethod
+    async def __get_host_from_ip(host: str) -> Union[bool, str]:
+        try:
+            return await asyncio.to_thread(DNSCache.get_instance().gethostbyaddr, host)
+        except (socket.gaierror, socket.herror, UnicodeError):
+            return False
+
+    async def get_certificate(self, hostname: str, address: Optional[str] = None) -> CertificateInfo:
+        r"""
+        Coroutine that returns the certificate of the host: only the TLS handshake is performed
+        (the session of the previous handshake is resumed), valid certificates are cached by TLSInspector
+        and the handshake is shared by all sites of the pass with the same address and host
+
+        Parameters
+        ------------
+            hostname: str
+                Host name to get the certificate of (SNI)
+            address: Optional[str]
+                IP address of the host (the first resolved address by default)
+
+        Returns
+        --------
+            Certificate (CertificateInfo)
+        """
+        if address is None:
+            address = await self.get_address(hostname)
+            if address is None:
+                return CertificateInfo(False, error="can't get ip from the host ({0})".format(hostname))
+        info = TLSInspector.get_instance().get(address, hostname)
+        if info is not None:
+            return info
+        return await self.context.flight.do_async(("tls", address, 443, hostname), self.__handshake, address, hostname)
+
+    @metrics.timed("tls")
+    async def __handshake(self, address: str, hostname: str) -> CertificateInfo:
+        timeout = self.get_timeout(hostname, "tls")
+        start = perf_counter()
+        try:
+            return await asyncio.to_thread(TLSInspector.get_instance().handshake, address, hostname, timeout)
+        finally:
+            timeouts.observe(hostname, "tls", min(perf_counter() - start, timeout))
+
+    @tracer.span("check_ssl")
+    @IgnoreInternetExceptions()
+    async def check_ssl(self, host: str) -> bool:
+        r"""
+        Coroutine checks for the presence (relevance) of the site's ssl certificates
+
+        Parameters
+        ------------
+            host: str
+                Link to get ssl status
+
+        Returns
+        --------
+            ssl status (bool)
+        """
+        return (await self.get_certificate(urllib.parse.urlsplit(self.get_correct_url(host)).hostname)).valid
+
+    @tracer.span("ping")
+    async def ping(self, ip: str) -> float:
+        r"""
+        Coroutine that returns the RTT of the ip address
+        (from the batched ping of the pass, the address is pinged if it is not there)
+
+        Parameters
+        ------------
+            ip: str
+                IP address to ping
+
+        Returns
+        --------
+            RTT in ms (CheckResult.NO_REPLY if there is no response) (float)
+        """
+        if ip in self.context.rtts:
+            host_ping = self.context.rtts[ip]
+        else:
+            host_ping = await self.context.flight.do_async(("icmp", ip, None, None), self.__ping, ip)
+        if host_ping is None:
+            return CheckResult.NO_REPLY
+        metrics.observe("icmp", host_ping / 1000)
+        return host_ping
+
+    async def __ping(self, ip: str) -> Optional[float]:
+        from ping3 import ping
+
+        self.context.rtts[ip] = await asyncio.to_thread(ping, ip, timeout=self.get_timeout(ip, "icmp"), unit="ms")
+        return self.context.rtts[ip]
+
+    async def check_domains(self, target: ReadObject) -> Any:
+        r"""
+        Coroutine that conducts all basic checks for the site
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site (IP address or domain name) for which you want to
+                perform all the necessary checks for errors
+
+        Returns
+        ------------
+            Error class with message or status IP or domain name (Any)
+        """
+        if target.address is not None and not target.is_localhost:
+            ip = target.address
+            ip_status = await self.get_ip_success(ip)
+
+            if not isinstance(ip_status, InternetConnectionError) and not ip_status:
+                return CheckerException("ip is not success ({0})".format(ip))
+
+            if not await self.get_host_from_ip(ip):
+                return CheckerException("cant get host name by address")
+
+            if not all(await asyncio.gather(self.check_port(ip, 443), self.check_port(ip, 80))):
+                return CheckerException("HTTPS or HTT ports closed ({0})".format(ip))
+
+            status_code = await self.get_status_code(ip)
+        else:
+            if isinstance(await self.get_ip_from_host(target.hostname), bool):
+                return CheckerException("can't get ip from the host ({0})".format(target.host))
+
+            if not target.is_localhost:
+                ip_status = await self.get_ip_success(target.host)
+
+                if not ip_status and not isinstance(ip_status, InternetConnectionError):
+                    return CheckerException("ip is not success ({0})".format(target.host))
+
+                if not all(await asyncio.gather(
+                        self.check_port(target.hostname, 443), self.check_port(target.hostname, 80)
+                )):
+                    return CheckerException("HTTPS or HTT ports closed {0}".format(target.host))
+
+            status_code = await self.get_status_code(target.host)
+        if isinstance(status_code, SSCException):
+            return status_code
+        if status_code // 100 == 5:
+            return CheckerException("server error ({0})".format(status_code))
+        return target.address is not None
+
+    async def check_ip(self, host_display_name: str, ip: str, multy_ip: bool) -> list[CheckResult]:
+        r"""
+        Coroutine that checks all ports of the target on one ip address
+
+        Parameters
+        ------------
+            host_display_name: str
+                Host name for the output
+            ip: str
+                IP address to check
+            multy_ip: bool
+                Whether the host has more than one ip address
+
+        Returns
+        ------------
+            Results of the checks for each port (list[CheckResult])
+        """
+        ports = self.target.ports
+        host_ping, *port_statuses = await asyncio.gather(
+            self.ping(ip), *[self.check_port(ip, port) for port in ports]
+        )
+        certificate = await self.get_certificate(self.target.hostname, ip) if 443 in ports else None
+
+        return [
+            CheckResult(
+                self.target.host, host_display_name, ip, host_ping, multy_ip, port=port,
+                port_status=bool(port_status), ssl=certificate.valid if port == 443 else None,
+                ssl_days=certificate.days_left if port == 443 and certificate.valid else None
+            ) for port, port_status in zip(ports, port_statuses)
+        ]
+
+    @IgnoreInternetExceptions()
+    async def __call__(self) -> Any:
+        r"""
+        Coroutine performs all necessary checks for the site and returns
+
+        Returns
+        ------------
+            The coroutine returns the result of the check for one site (Any)
+        """
+        target = self.target
+        if target.host is None:
+            return
+        is_ip = await self.check_domains(target)
+
+        if isinstance(is_ip, SSCException):
+            return is_ip
+
+        host_ip = await self.get_ip_from_host(target.hostname) if not is_ip else [target.address]
+
+        if isinstance(host_ip, InternetConnectionError):
+            return host_ip
+
+        host_ip = list(filter(lambda x: len(re.findall(IP, x)) == 1, host_ip))
+
+        if target.is_localhost:
+            return CheckResult(
+                target.host, "localhost", "127.0.0.1", await self.ping(host_ip[0]), len(host_ip) > 1
+            )
+
+        if is_ip:
+            host_name = await self.get_host_from_ip(target.address)
+            host_display_name = host_name if isinstance(host_name, str) else "???"
+        else:
+            host_display_name = target.host
+
+        if not self.target.ports:
+            pings = await asyncio.gather(*[self.ping(ip) for ip in host_ip])
+            return [
+                CheckResult(self.target.host, host_display_name, ip, host_ping, len(host_ip) > 1)
+                for ip, host_ping in zip(host_ip, pings)
+            ]
+
+        results = await asyncio.gather(
+            *[self.check_ip(host_display_name, ip, len(host_ip) > 1) for ip in host_ip]
+        )
+        return [check_result for result in results for check_result in result]
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, repr(self.target))
@@ -0,0 +1,198 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+
+from time import monotonic
+from threading import Thread, Event, Lock
+from typing import Optional
+
+from checker import config
+from checker.units.metrics import Metrics
+
+__all__ = (
+    "ConnectivityMonitor",
+)
+
+class ConnectivityMonitor(object):
+    r"""
+    Process-wide internet connection monitor (circuit breaker)
+
+    The probe result is cached for `ttl` seconds and refreshed by a background thread,
+    so checking the connection costs no requests.
+    After `failures` failed probes in a row the breaker opens (no connection),
+    then every `retry_after` seconds one probe is made in the half-open state:
+    success closes the breaker, failure opens it again.
+
+    url: str
+        Probe endpoint (config.CONNECTIVITY_URL), can be a local stand-in
+    ttl: float
+        Lifetime of a successful probe result in seconds
+    retry_after: float
+        Interval between probes when the breaker is open in seconds
+    failures: int
+        The number of failed probes in a row that opens the breaker
+    timeout: float
+        Probe timeout in seconds
+
+    get_instance() -> ConnectivityMonitor
+        Returns the monitor of the current process (creates and starts it if necessary)
+    probe() -> bool
+        Makes one request to the probe endpoint
+    refresh() -> bool
+        Probes the endpoint and updates the state of the breaker
+    is_connected() -> bool
+        Returns the cached connection status
+    start() -> None
+        Makes the first probe and starts the background thread
+    stop() -> None
+        Stops the background thread
+    """
+    __slots__ = (
+        "url", "ttl", "retry_after", "failures", "timeout",
+        "state", "failed_probes", "checked_at", "_pid", "_lock", "_stop", "_thread"
+    )
+    CLOSED: str = "closed"
+    OPEN: str = "open"
+    HALF_OPEN: str = "half-open"
+
+    _instance: Optional["ConnectivityMonitor"] = None
+    _instance_lock: Lock = Lock()
+
+    def __init__(
+            self, url: Optional[str] = None, ttl: Optional[float] = None,
+            retry_after: Optional[float] = None, failures: Optional[int] = None,
+            timeout: Optional[float] = None
+    ) -> None:
+        self.url = config.CONNECTIVITY_URL if url is None else url
+        self.ttl = config.CONNECTIVITY_TTL if ttl is None else ttl
+        self.retry_after = config.CONNECTIVITY_RETRY if retry_after is None else retry_after
+        self.failures = config.CONNECTIVITY_FAILURES if failures is None else failures
+        self.timeout = config.CONNECTIVITY_TIMEOUT if timeout is None else timeout
+
+        self.state = self.CLOSED
+        self.failed_probes = 0
+        self.checked_at = None
+        self._pid = os.getpid()
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    @classmethod
+    def get_instance(cls) -> "ConnectivityMonitor":
+        r"""
+        Returns the monitor of the current process (creates and starts it if necessary)
+
+        Returns
+        --------
+            Connectivity monitor (ConnectivityMonitor)
+        """
+        instance = cls._instance
+        if instance is not None and instance._pid == os.getpid():
+            return instance
+
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._pid != os.getpid():
+                instance = cls()
+                instance.start()
+                cls._instance = instance
+            return cls._instance
+
+    def probe(self) -> bool:
+        r"""
+        Makes one request to the probe endpoint
+
+        Returns
+        --------
+            Probe status (bool)
+        """
+        import requests
+
+        try:
+            requests.head(self.url, timeout=self.timeout)
+        except requests.RequestException:
+            return False
+        return True
+
+    def refresh(self) -> bool:
+        r"""
+        Probes the endpoint and updates the state of the breaker
+
+        Returns
+        --------
+            Connection status (bool)
+        """
+        with self._lock:
+            start = monotonic()
+            connected = self.probe()
+            Metrics.get_instance().observe("connectivity", monotonic() - start)
+            if connected:
+                self.failed_probes = 0
+                self.state = self.CLOSED
+            else:
+                self.failed_probes += 1
+                if self.state == self.HALF_OPEN or self.failed_probes >= self.failures:
+                    self.state = self.OPEN
+            self.checked_at = monotonic()
+        return self.state != self.OPEN
+
+    def is_connected(self) -> bool:
+        r"""
+        Returns the cached connection status (no requests are made)
+
+        Returns
+        --------
+            Connection status (bool)
+        """
+        return self.state != self.OPEN
+
+    def start(self) -> None:
+        r"""
+        Makes the first probe (its failure opens the breaker immediately)
+        and starts the background thread
+
+        Returns
+        --------
+            None
+        """
+        if not self.refresh() or self.failed_probes:
+            self.state = self.OPEN
+        self._stop.clear()
+        self._thread = Thread(target=self.__run, name="connectivity-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        r"""
+        Stops the background thread
+
+        Returns
+        --------
+            None
+        """
+        self._stop.set()
+
+    def __run(self) -> None:
+        while not self._stop.wait(self.retry_after if self.state == self.OPEN else self.ttl):
+            if self.state == self.OPEN:
+                self.state = self.HALF_OPEN
+            self.refresh()
+
+    def __repr__(self) -> str:
+        return "{0}({1}, {2})".format(self.__class__.__name__, self.url, self.state)
@@ -0,0 +1,275 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import re
+import socket
+
+from time import perf_counter
+from threading import Thread
+from typing import Iterable, Optional
+
+from checker.units.flight import SingleFlight
+from checker.units.pinger import BatchPinger
+from checker.units.reader import ReadObject
+from checker.units.resolver import DNSCache
+from checker.units.scanner import PortScanner
+from checker.units.timeouts import TimeoutPolicy
+from checker.config import IP, RDNS_WORKERS
+
+__all__ = (
+    "PassContext",
+)
+
+class PassContext(object):
+    r"""
+    Results of the batched stages shared by all controllers of one pass
+
+    rtts: dict[str, Optional[float]]
+        IP address -> RTT in ms (None if there is no reply)
+    ports: dict[tuple[str, int], tuple[str, Optional[float]]]
+        (IP address, port) -> (port status, connect latency in seconds)
+    names: dict[str, Optional[str]]
+        IP address of an IP target -> host name (None if the address has no name)
+    flight: SingleFlight
+        Probes of the pass shared by the controllers (HTTP, TLS, reverse DNS and the probes missing in rtts, ports and names)
+
+    get_target_ips(target: ReadObject, resolved: Optional[dict[str, Optional[list[tuple]]]] = None) -> list[str]
+        Returns the IPv4 addresses that the controller will ping for the target
+    get_target_ports(target: ReadObject, resolved: Optional[dict[str, Optional[list[tuple]]]] = None)
+            -> set[tuple[str, int]]
+        Returns the (ip, port) pairs that the controller will check for the target
+    get_addresses(target: ReadObject, resolved: Optional[dict[str, Optional[list[tuple]]]] = None) -> list[tuple]
+        Returns the getaddrinfo result of the host name of the target
+    get_target_address(target: ReadObject) -> Optional[str]
+        Returns the IP address whose host name the controller will look up for the target
+    build(targets: Iterable[ReadObject], timeout: Optional[float] = None, max_in_flight: int = 512,
+          deadline: Optional[float] = None, flight: Optional[SingleFlight] = None) -> PassContext
+        Runs the batched stages for the targets
+    """
+    __slots__ = (
+        "rtts", "ports", "names", "flight"
+    )
+    def __init__(
+            self, rtts: Optional[dict[str, Optional[float]]] = None,
+            ports: Optional[dict[tuple[str, int], tuple[str, Optional[float]]]] = None,
+            names: Optional[dict[str, Optional[str]]] = None, flight: Optional[SingleFlight] = None
+    ) -> None:
+        self.rtts = {} if rtts is None else rtts
+        self.ports = {} if ports is None else ports
+        self.names = {} if names is None else names
+        self.flight = SingleFlight() if flight is None else flight
+
+    @staticmethod
+    def get_addresses(
+            target: ReadObject, resolved: Optional[dict[str, Optional[list[tuple]]]] = None
+    ) -> list[tuple]:
+        r"""
+        Returns the getaddrinfo result of the host name of the target
+        (taken from `resolved` if it is given, the host names missing in it are not resolved)
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+            resolved: Optional[dict[str, Optional[list[tuple]]]]
+                Host names resolved by DNSCache.resolve (None - look the host name up)
+
+        Returns
+        --------
+            List of (family, type, proto, canonname, sockaddr) (list[tuple])
+        """
+        if resolved is not None:
+            return resolved.get(target.hostname) or []
+        try:
+            return DNSCache.get_instance().getaddrinfo(target.hostname, 80)
+        except (socket.gaierror, UnicodeError):
+            return []
+
+    @staticmethod
+    def get_target_ips(target: ReadObject, resolved: Optional[dict[str, Optional[list[tuple]]]] = None) -> list[str]:
+        r"""
+        Returns the IPv4 addresses that the controller will ping for the target
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+            resolved: Optional[dict[str, Optional[list[tuple]]]]
+                Host names resolved by DNSCache.resolve (None - look the host name up)
+
+        Returns
+        --------
+            IP addresses (list[str])
+        """
+        if target.host is None:
+            return []
+        if target.address is not None:
+            return [target.address]
+        addresses = PassContext.get_addresses(target, resolved)
+        return [i[-1][0] for i in addresses if len(re.findall(IP, i[-1][0])) == 1]
+
+    @staticmethod
+    def get_target_ports(
+            target: ReadObject, resolved: Optional[dict[str, Optional[list[tuple]]]] = None
+    ) -> set[tuple[str, int]]:
+        r"""
+        Returns the (ip, port) pairs that the controller will check for the target
+        (80 and 443 of the first address and the ports of the target on every address)
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+            resolved: Optional[dict[str, Optional[list[tuple]]]]
+                Host names resolved by DNSCache.resolve (None - look the host name up)
+
+        Returns
+        --------
+            (IP address, port) pairs (set[tuple[str, int]])
+        """
+        if target.host is None:
+            return set()
+        pairs = set()
+
+        if not target.is_localhost:
+            if target.address is not None:
+                address = target.address
+            else:
+                address = next(
+                    (i[-1][0] for i in PassContext.get_addresses(target, resolved) if i[1] == socket.SOCK_STREAM), None
+                )
+            if address is not None:
+                pairs.update(((address, 80), (address, 443)))
+
+        for ip in PassContext.get_target_ips(target, resolved):
+            pairs.update((ip, port) for port in target.ports)
+        return pairs
+
+    @staticmethod
+    def get_target_address(target: ReadObject) -> Optional[str]:
+        r"""
+        Returns the IP address whose host name the controller will look up for the target
+
+        Parameters
+        ------------
+            target: ReadObject
+                Site to check
+
+        Returns
+        --------
+            IP address or None if the target is not an IP address (Optional[str])
+        """
+        if target.is_localhost:
+            return None
+        return target.address
+
+    @classmethod
+    def build(
+            cls, targets: Iterable[ReadObject], timeout: Optional[float] = None, max_in_flight: int = 512,
+            deadline: Optional[float] = None, flight: Optional[SingleFlight] = None
+    ) -> "PassContext":
+        r"""
+        Runs the batched stages for the targets: the host names are resolved concurrently (once per name), every unique IP address is pinged once,
+        every unique (ip, port) pair is connected once and the host names of the IP targets
+        are looked up (the stages run at the same time), the timeouts of the addresses are learned by TimeoutPolicy (and cut at the deadline)
+
+        Parameters
+        ------------
+            targets: Iterable[ReadObject]
+                Sites of the pass
+            timeout: Optional[float]
+                Ping and connect timeout of the addresses without history in seconds (TimeoutPolicy default)
+            max_in_flight: int
+                The maximum number of simultaneous connects
+            deadline: Optional[float]
+                perf_counter() value of the end of the pass budget (None - no budget)
+            flight: Optional[SingleFlight]
+                Probes shared with the other batches of the pass (new by default)
+
+        Returns
+        --------
+            Context of the pass (PassContext)
+        """
+        targets = [target for target in targets if target.host is not None]
+        resolved = DNSCache.get_instance().resolve(
+            (target.hostname for target in targets if target.address is None), 80, RDNS_WORKERS,
+            None if deadline is None else max(deadline - perf_counter(), 0)
+        )
+        ips, pairs, addresses = set(), set(), set()
+        for target in targets:
+            ips.update(cls.get_target_ips(target, resolved))
+            pairs.update(cls.get_target_ports(target, resolved))
+            address = cls.get_target_address(target)
+            if address is not None:
+                addresses.add(address)
+
+        policy = TimeoutPolicy.get_instance()
+        timeout = policy.default if timeout is None else timeout
+        ping_timeouts = {ip: policy.get_timeout(ip, "icmp", timeout) for ip in ips}
+        connect_timeouts = {pair: policy.get_timeout(pair[0], "tcp", timeout) for pair in pairs}
+        if deadline is not None:
+            # timeouts cut by the deadline say nothing about the latency and are not observed
+            remaining = max(deadline - perf_counter(), 0)
+            timeout = min(timeout, remaining)
+            ping_timeouts = {ip: value for ip, value in ping_timeouts.items() if value <= remaining}
+            connect_timeouts = {pair: value for pair, value in connect_timeouts.items() if value <= remaining}
+            ping_cut = {ip: remaining for ip in ips if ip not in ping_timeouts}
+            connect_cut = {pair: remaining for pair in pairs if pair not in connect_timeouts}
+        else:
+            ping_cut, connect_cut = {}, {}
+
+        context = cls(flight=flight)
+        pinger = Thread(
+            target=lambda: context.rtts.update(
+                BatchPinger(timeout=timeout).ping(ips, {**ping_timeouts, **ping_cut})
+            ), daemon=True
+        )
+        pinger.start()
+        resolver = Thread(
+            target=lambda: context.names.update(
+                DNSCache.get_instance().reverse(
+                    addresses, RDNS_WORKERS, None if deadline is None else max(deadline - perf_counter(), 0)
+                )
+            ), daemon=True
+        )
+        resolver.start()
+        context.ports.update(
+            PortScanner(timeout=timeout, max_in_flight=max_in_flight).scan(pairs, {**connect_timeouts, **connect_cut})
+        )
+        pinger.join()
+        resolver.join()
+
+        for ip, rtt in context.rtts.items():
+            if rtt is not None:
+                policy.observe(ip, "icmp", rtt / 1000)
+            elif ip in ping_timeouts:
+                policy.observe(ip, "icmp", ping_timeouts[ip])
+        for pair, (status, latency) in context.ports.items():
+            if status == PortScanner.TIMEOUT:
+                if pair in connect_timeouts:
+                    policy.observe(pair[0], "tcp", connect_timeouts[pair])
+            elif latency is not None:
+                policy.observe(pair[0], "tcp", latency)
+        return context
+
+    def __repr__(self) -> str:
+        return "{0}(rtts={1}, ports={2}, names={3})".format(
+            self.__class__.__name__, len(self.rtts), len(self.ports), len(self.names)
+        )
@@ -20,28 +20,40 @@ DEALINGS IN THE SOFTWARE.
 """
 import re
 import socket
-import requests
-import urllib.error
-import urllib.request
+import urllib.parse
 
-from ping3 import ping
-from typing import Union, Any
+from time import perf_counter
+from typing import Union, Any, Optional
 
 from checker.units.exceptions import (
     IgnoreInternetExceptions, CheckerException, InternetConnectionError, SSCException
 )
+from checker.units.context import PassContext
+from checker.units.metrics import Metrics
+from checker.units.tracing import Tracer
+from checker.units.probe import HTTPProbe, ProbeResult
+from checker.units.resolver import DNSCache
+from checker.units.scanner import PortScanner
+from checker.units.timeouts import TimeoutPolicy
+from checker.units.tls import TLSInspector, CertificateInfo
 from checker.units.reader import ReadObject
-from checker.config import IP
-from checker.config import headers
+from checker.units.result import CheckResult
+from checker.config import IP, TIMEOUT_DEFAULT
 
 __all__ = ("Controller", )
 
+metrics = Metrics.get_instance()
+tracer = Tracer.get_instance()
+timeouts = TimeoutPolicy.get_instance()
+
 class Controller(object):
     r"""
     A class that conducts all the necessary checks for a single site
 
     get_correct_url(url: str) -> str
         The function for getting the correct type of link (http://url/)
+    get_probe(host: str) -> ProbeResult
+        The function that returns the result of the single-pass HTTP probe of the host
     get_ip_success(ip: str) -> bool
         The function that checks the availability of the ip address of the site
     get_status_code(url: str) -> int
@@ -50,20 +62,28 @@ class Controller(object):
         The function checking port availability (closed or open)
     get_ip_from_host(host: str) -> Union[set, bool]
         The function that gets an IP address from a domain name
-    get_host_from_ip(host: str) -> Union[bool, socket.gethostbyaddr]
-        The function that gets a domain name by IP address
-    check_domains(self, host: str, ports: Union[int, list]) -> Any
+    get_host_from_ip(host: str) -> Union[bool, str]
+        The function that gets a domain name by IP address (from the reverse lookups of the pass)
+    check_domains(self, target: ReadObject) -> Any
         The function that conducts all basic checks for the site
+    get_certificate(self, hostname: str, address: Optional[str] = None) -> CertificateInfo
+        The function that returns the certificate of the host (cached by TLSInspector)
     check_ssl(self, host: str) -> bool
         The function checks for the presence (relevance) of the site's ssl certificates
+    get_ping(self, ip: str) -> float
+        The function that returns the RTT of the ip address (from the batched ping of the pass)
     __call__(self) -> Any
         The method performs all necessary checks for the site and returns
     """
     __slots__ = (
-        "target",
+        "target", "context", "probes"
     )
-    def __init__(self, target: ReadObject) -> None:
+    PROBE: HTTPProbe = HTTPProbe(timeout=TIMEOUT_DEFAULT)
+
+    def __init__(self, target: ReadObject, context: Optional[PassContext] = None) -> None:
         self.target: ReadObject = target
+        self.context: PassContext = PassContext() if context is None else context
+        self.probes: dict[str, ProbeResult] = {}
 
     @staticmethod
     @IgnoreInternetExceptions()
@@ -84,6 +104,57 @@ class Controller(object):
             return url
         return "http://" + url
 
+    def get_probe(self, host: str) -> ProbeResult:
+        r"""
+        The function that returns the result of the single-pass HTTP probe of the host
+        (the probe is shared by all sites of the pass with the same address and host,
+        the timeout is learned from the history of the host by TimeoutPolicy)
+
+        Parameters
+        ------------
+            host: str
+                Host or link to probe
+
+        Returns
+        --------
+            Probe result (ProbeResult)
+        """
+        result = self.probes.get(host)
+        if result is None:
+            name = host.split("://", 1)[-1]
+            address = self.get_address(name.split("/", 1)[0])
+            result = self.context.flight.do(("http", address, 80, name), self.__probe, host)
+            self.probes[host] = result
+        return result
+
+    def __probe(self, host: str) -> ProbeResult:
+        result = self.PROBE.probe(host, timeout=timeouts.get_timeout(host, "http", self.PROBE.timeout))
+        metrics.observe("http", result.timings["http"])
+        timeouts.observe(host, "http", result.timings["http"])
+        if result.received:
+            metrics.receive(host, result.received)
+        return result
+
+    @staticmethod
+    def get_address(host: str) -> Optional[str]:
+        r"""
+        The function that returns the first address of the host from the DNS cache
+
+        Parameters
+        ------------
+            host: str
+                Domain name or IP address
+
+        Returns
+        --------
+            IP address or None if the host is not resolved (Optional[str])
+        """
+        try:
+            return DNSCache.get_instance().getaddrinfo(host, 80, type=socket.SOCK_STREAM)[0][-1][0]
+        except (socket.gaierror, UnicodeError, IndexError):
+            return None
+
+    @tracer.span("get_ip_success")
     @IgnoreInternetExceptions(check_ip=True)
     def get_ip_success(self, ip: str) -> bool:
         r"""
@@ -98,15 +169,9 @@ class Controller(object):
         --------
             Returns the availability status of an ip address (str)
         """
-        try:
-            requests.get(
-                self.get_correct_url(ip), timeout=5,
-                headers=headers
-            )
-        except requests.exceptions.Timeout:
-            return False
-        return True
+        return self.get_probe(ip).reachable
 
+    @tracer.span("get_status_code")
     @IgnoreInternetExceptions()
     def get_status_code(self, url: str) -> int:
         r"""
@@ -121,21 +186,15 @@ class Controller(object):
         --------
             Response status code (int)
         """
-        try:
-            conn = urllib.request.urlopen(
-               self.get_correct_url(url), timeout=5
-            )
-        except urllib.error.HTTPError as ex:
-            conn = ex
-        except urllib.error.URLError:
-            return 403
-        return conn.getcode()
+        status_code = self.get_probe(url).status_code
+        return 403 if status_code is None else status_code
 
-    @staticmethod
+    @tracer.span("check_port")
     @IgnoreInternetExceptions()
-    def check_port(host: str, port: int) -> bool:
+    def check_port(self, host: str, port: int) -> bool:
         r"""
         The function checking port availability (closed or open)
+        (from the port scan of the pass, the port is scanned if it is not there)
 
         Parameters
         ------------
@@ -148,16 +207,28 @@ class Controller(object):
         ------------
             Port availability (closed or open) (bool)
         """
-        socket_connection = socket.socket()
-        socket_connection.settimeout(5)
         try:
-            socket_connection.connect((host, port))
-        except (socket.gaierror, socket.timeout, ConnectionRefusedError, TimeoutError):
+            address = DNSCache.get_instance().getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][-1][0]
+        except (socket.gaierror, UnicodeError, IndexError):
             return False
-        return True
+
+        entry = self.context.ports.get((address, port))
+        if entry is None:
+            entry = self.context.flight.do(("tcp", address, port, None), self.__scan, address, port)
+        status, latency = entry
+        if latency is not None:
+            metrics.observe("tcp", latency)
+        return status == PortScanner.OPEN
+
+    def __scan(self, address: str, port: int) -> tuple[str, Optional[float]]:
+        timeout = timeouts.get_timeout(address, "tcp", self.PROBE.timeout)
+        self.context.ports.update(PortScanner(timeout=timeout).scan([(address, port)]))
+        return self.context.ports[(address, port)]
 
     @staticmethod
+    @tracer.span("get_ip_from_host")
     @IgnoreInternetExceptions()
+    @metrics.timed("dns")
     def get_ip_from_host(host: str) -> Union[set, bool]:
         r"""
         The function that gets an IP address from a domain name
@@ -175,16 +246,18 @@ class Controller(object):
         """
         try:
             data = []
-            for i in socket.getaddrinfo(host, 80):
+            for i in DNSCache.get_instance().getaddrinfo(host, 80):
                 data.append(i[-1][0])
             return set(data)
-        except socket.gaierror:
+        except (socket.gaierror, UnicodeError, IndexError):
             return False
 
+    @tracer.span("get_host_from_ip")
     @IgnoreInternetExceptions()
-    def get_host_from_ip(self, host: str) -> Union[bool, socket.gethostbyaddr]:
+    def get_host_from_ip(self, host: str) -> Union[bool, str]:
         r"""
         The function that gets a domain name by IP address
+        (from the reverse lookups of the pass, the address is looked up through the DNS cache if it is not there)
 
         Parameters
         ------------
@@ -193,13 +266,55 @@ class Controller(object):
 
         Returns
         ------------
-            Returns the domain name if possible, false otherwise (Union[bool, socket.gethostbyaddr])
+            Returns the domain name if possible, false otherwise (Union[bool, str])
         """
+        if host in self.context.names:
+            return self.context.names[host] or False
+        return self.context.flight.do(("rdns", host, None, None), self.__get_host_from_ip, host)
+
+    @staticmethod
+    def __get_host_from_ip(host: str) -> Union[bool, str]:
         try:
-            return socket.gethostbyaddr(host)
-        except (socket.gaierror, socket.herror):
+            return DNSCache.get_instance().gethostbyaddr(host)
+        except (socket.gaierror, socket.herror, UnicodeError):
             return False
 
+    def get_certificate(self, hostname: str, address: Optional[str] = None) -> CertificateInfo:
+        r"""
+        The function that returns the certificate of the host: only the TLS handshake is performed
+        (the session of the previous handshake is resumed), valid certificates are cached by TLSInspector
+        and the handshake is shared by all sites of the pass with the same address and host
+
+        Parameters
+        ------------
+            hostname: str
+                Host name to get the certificate of (SNI)
+            address: Optional[str]
+                IP address of the host (the first address from the DNS cache by default)
+
+        Returns
+        --------
+            Certificate (CertificateInfo)
+        """
+        if address is None:
+            address = self.get_address(hostname)
+            if address is None:
+                return CertificateInfo(False, error="can't get ip from the host ({0})".format(hostname))
+        info = TLSInspector.get_instance().get(address, hostname)
+        if info is not None:
+            return info
+        return self.context.flight.do(("tls", address, 443, hostname), self.__handshake, address, hostname)
+
+    def __handshake(self, address: str, hostname: str) -> CertificateInfo:
+        timeout = timeouts.get_timeout(hostname, "tls", self.PROBE.timeout)
+        start = perf_counter()
+        info = TLSInspector.get_instance().handshake(address, hostname, timeout)
+        elapsed = perf_counter() - start
+        metrics.observe("tls", elapsed)
+        timeouts.observe(hostname, "tls", min(elapsed, timeout))
+        return info
+
+    @tracer.span("check_ssl")
     @IgnoreInternetExceptions()
     def check_ssl(self, host: str) -> bool:
         r"""
@@ -214,41 +329,58 @@ class Controller(object):
         --------
             ssl status (bool)
         """
-        if "https://" not in host:
-            if "http://" in host:
-                host = "https://" + host[7:]
-            else:
-                host = "https://" + host
-        try:
-            requests.get(host, timeout=5, headers=headers)
-            return True
-        except requests.exceptions.SSLError:
-            return False
+        return self.get_certificate(urllib.parse.urlsplit(self.get_correct_url(host)).hostname).valid
+
+    @tracer.span("ping")
+    def get_ping(self, ip: str) -> float:
+        r"""
+        The function that returns the RTT of the ip address
+        (from the batched ping of the pass, the address is pinged if it is not there)
+
+        Parameters
+        ------------
+            ip: str
+                IP address to ping
+
+        Returns
+        --------
+            RTT in ms (CheckResult.NO_REPLY if there is no response) (float)
+        """
+        if ip in self.context.rtts:
+            host_ping = self.context.rtts[ip]
+        else:
+            host_ping = self.context.flight.do(("icmp", ip, None, None), self.__ping, ip)
+        if host_ping is None:
+            return CheckResult.NO_REPLY
+        metrics.observe("icmp", host_ping / 1000)
+        return host_ping
 
-    def check_domains(self, host: str, ports: Union[int, list]) -> Any:
+    def __ping(self, ip: str) -> Optional[float]:
+        from ping3 import ping
+
+        self.context.rtts[ip] = ping(ip, timeout=timeouts.get_timeout(ip, "icmp", self.PROBE.timeout), unit="ms")
+        return self.context.rtts[ip]
+
+    def check_domains(self, target: ReadObject) -> Any:
         r"""
         The function that conducts all basic checks for the site
 
         Parameters
         ------------
-            host: str
-                Domain name or IP address for which you want to
+            target: ReadObject
+                Site (IP address or domain name) for which you want to
                 perform all the necessary checks for errors
-            ports: Union[int, list]
-                Port or ports to check for errors
 
         Returns
         ------------
             Error class with message or status IP or domain name (Any)
         """
-        is_ip = re.findall(IP, host) != []
-
-        if is_ip and "127.0.0.1" not in host:
-            ip = ".".join(re.findall(IP, host)[0])
+        if target.address is not None and not target.is_localhost:
+            ip = target.address
             ip_status = self.get_ip_success(ip)
 
             if not isinstance(ip_status, InternetConnectionError) and not ip_status:
-                return CheckerException("ip is not success ({0})".format(ip, self.get_ip_success(ip)))
+                return CheckerException("ip is not success ({0})".format(ip))
 
             if not self.get_host_from_ip(ip):
                 return CheckerException("cant get host name by address")
@@ -258,23 +390,22 @@ class Controller(object):
 
             status_code = self.get_status_code(ip)
         else:
-            if isinstance(self.get_ip_from_host(host), bool):
-                return CheckerException("can't get ip from the host ({0})".format(host))
+            if isinstance(self.get_ip_from_host(target.hostname), bool):
+                return CheckerException("can't get ip from the host ({0})".format(target.host))
 
-            if host not in ["127.0.0.1", "localhost"]:
-                ip_status = self.get_ip_success(host)
+            if not target.is_localhost:
+                ip_status = self.get_ip_success(target.host)
 
                 if not ip_status and not isinstance(ip_status, InternetConnectionError):
-                    return CheckerException("ip is not success ({0})".format(host))
+                    return CheckerException("ip is not success ({0})".format(target.host))
 
-            if ports is not None and host not in ["localhost", "127.0.0.1"]:
-                if not self.check_port(host, 443) or not self.check_port(host, 80):
-                    return CheckerException("HTTPS or HTT ports closed {0}".format(host))
+                if not self.check_port(target.hostname, 443) or not self.check_port(target.hostname, 80):
+                    return CheckerException("HTTPS or HTT ports closed {0}".format(target.host))
 
-            status_code = self.get_status_code(host)
+            status_code = self.get_status_code(target.host)
         if status_code // 100 == 5:
             return CheckerException("server error ({0})".format(status_code))
-        return is_ip
+        return target.address is not None
 
     @IgnoreInternetExceptions()
     def __call__(self) -> Any:
@@ -285,61 +416,54 @@ class Controller(object):
         ------------
             The method returns the result of the check for one site (Any)
         """
-        if self.target.host is None:
+        target = self.target
+        if target.host is None:
             return
-        is_ip = self.check_domains(self.target.host, self.target.ports)
+        is_ip = self.check_domains(target)
 
         if isinstance(is_ip, SSCException):
             return is_ip
 
-        host_display_name = "???" if is_ip else self.target.host
-        host_ip = self.get_ip_from_host(self.target.host) if not is_ip else [self.target.host]
+        host_ip = self.get_ip_from_host(target.hostname) if not is_ip else [target.address]
 
         if isinstance(host_ip, InternetConnectionError):
             return host_ip
 
         host_ip = list(filter(lambda x: len(re.findall(IP, x)) == 1, host_ip))
 
-        if self.target.host in ["127.0.0.1", "localhost"]:
-            host_ping = ping(host_ip[0], timeout=5, unit="ms")
-            return dict(
-                host_name="localhost",
-                host_ip="127.0.0.1",
-                ping=5000 if host_ping is None else host_ping,
-                status=len(host_ip) > 1
+        if target.is_localhost:
+            return CheckResult(
+                target.host, "localhost", "127.0.0.1", self.get_ping(host_ip[0]), len(host_ip) > 1
             )
 
-        if not self.target.ports:
+        if is_ip:
+            host_name = self.get_host_from_ip(target.address)
+            host_display_name = host_name if isinstance(host_name, str) else "???"
+        else:
+            host_display_name = target.host
+
+        if not target.ports:
             result = []
 
             for ip in host_ip:
-                host_ping = ping(ip, timeout=5, unit="ms")
                 result.append(
-                    dict(
-                        host_name=host_display_name,
-                        host_ip=ip,
-                        ping=5000 if host_ping is None else host_ping,
-                        status=len(host_ip) > 1
-                    )
+                    CheckResult(target.host, host_display_name, ip, self.get_ping(ip), len(host_ip) > 1)
                 )
             return result
         else:
             result = []
 
             for ip in host_ip:
-                for port in self.target.ports:
-                    host_ping = ping(ip, timeout=5, unit="ms")
-                    check_result = dict(
-                            host_name=host_display_name,
-                            host_ip=ip,
-                            ping=5000 if host_ping is None else host_ping,
-                            port=port,
-                            port_status="Opened" if self.check_port(ip, port) else "Not opened",
-                            status=len(host_ip) > 1,
+                certificate = self.get_certificate(target.hostname, ip) if 443 in target.ports else None
+                for port in target.ports:
+                    result.append(
+                        CheckResult(
+                            target.host, host_display_name, ip, self.get_ping(ip), len(host_ip) > 1,
+                            port=port, port_status=bool(self.check_port(ip, port)),
+                            ssl=certificate.valid if port == 443 else None,
+                            ssl_days=certificate.days_left if port == 443 and certificate.valid else None
                         )
-                    if port == 443:
-                        check_result["ssl"] = "valid cert" if self.check_ssl(self.target.host) else "INVALID cert"
-                    result.append(check_result)
+                    )
             return result
 
     def __repr__(self) -> str:
@@ -18,16 +18,17 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
-import requests
-
-from time import sleep
+from inspect import iscoroutinefunction
 from functools import wraps
 
+from checker.units.connectivity import ConnectivityMonitor
+from checker.units.tracing import Tracer
+
 __all__ = (
     "IgnoreInternetExceptions", "SSCException",
     "CSVReaderException", "DataInvalidFormat",
     "FileInvalidFormat", "CheckerException",
-    "InternetConnectionError"
+    "CheckTimeoutError", "InternetConnectionError"
 )
 
 class IgnoreInternetExceptions(object):
@@ -41,23 +42,41 @@ class IgnoreInternetExceptions(object):
         return "{}()".format(self.__class__.__name__)
 
     @staticmethod
+    @Tracer.get_instance().span("IgnoreInternetExceptions")
     def __check_internet_connection() -> bool:
-        try:
-            requests.head("http://www.google.com/", timeout=3)
-        except requests.ConnectionError:
-            return False
-        return True
+        return ConnectivityMonitor.get_instance().is_connected()
 
     def __call__(self, func):
+        if iscoroutinefunction(func):
+            return self.__async_call(func)
+
         @wraps(func)
         def decorator(*args, **kwargs):
             if not self.__check_internet_connection():
-                sleep(3)
                 return InternetConnectionError()
 
+            from requests.exceptions import ConnectionError as RequestsConnectionError
+
             try:
                 result = func(*args, **kwargs)
-            except requests.exceptions.ConnectionError:
+            except RequestsConnectionError:
+                if self.check_ip:
+                    return False
+            else:
+                return result
+        return decorator
+
+    def __async_call(self, func):
+        @wraps(func)
+        async def decorator(*args, **kwargs):
+            if not self.__check_internet_connection():
+                return InternetConnectionError()
+
+            from requests.exceptions import ConnectionError as RequestsConnectionError
+
+            try:
+                result = await func(*args, **kwargs)
+            except (RequestsConnectionError, ConnectionError):
                 if self.check_ip:
                     return False
             else:
@@ -96,6 +115,10 @@ class CheckerException(SSCException):
     def __init__(self, message: str = ""):
         super().__init__(message)
 
+class CheckTimeoutError(CheckerException):
+    def __init__(self, message: str = ""):
+        super().__init__(message)
+
 class InternetConnectionError(SSCException):
     def __init__(self, message: str = ""):
         super().__init__(message)
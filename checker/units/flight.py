@@ -0,0 +1,186 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import asyncio
+import threading
+
+from typing import Any, Callable, Optional
+
+from checker.units.metrics import Metrics
+
+__all__ = (
+    "SingleFlight",
+)
+
+class SingleFlight(object):
+    r"""
+    Shares the probes of one pass between all checks: the first call of a key makes the probe,
+    calls of the same key made while it is in flight wait for it and later calls get its result,
+    so addresses shared by many sites (CDN fronts, virtual hosts, the same host with other ports)
+    are probed once per pass
+
+    Keys are (stage, ip, port, sni): "http" and "tls" probes are shared by the sites with the same
+    address and host name, "tcp", "icmp" and "rdns" probes by the sites with the same address
+
+    made: dict[str, int]
+        Stage -> the number of probes made
+    saved: dict[str, int]
+        Stage -> the number of probes shared instead of being made
+
+    do(key: tuple, func: Callable, *args) -> Any
+        Returns the result of the probe of the key (made by func once per pass)
+    do_async(key: tuple, func: Callable, *args) -> Any
+        Coroutine version of do (func is a coroutine function)
+    cancel() -> None
+        Cancels the probes in flight on the event loop
+    get_description() -> str
+        Returns the description of the made and saved probes
+    """
+    __slots__ = (
+        "made", "saved", "_results", "_calls", "_lock"
+    )
+    def __init__(self) -> None:
+        self.made: dict[str, int] = {}
+        self.saved: dict[str, int] = {}
+        self._results: dict[tuple, Any] = {}
+        self._calls: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def __count(self, counts: dict[str, int], stage: str) -> None:
+        counts[stage] = counts.get(stage, 0) + 1
+        if counts is self.saved:
+            Metrics.get_instance().coalesce(stage)
+
+    def do(self, key: tuple, func: Callable, *args) -> Any:
+        r"""
+        Returns the result of the probe of the key: the probe is made by the first caller,
+        concurrent callers wait for it (if it raises, they make the probe themselves)
+
+        Parameters
+        ------------
+            key: tuple
+                (stage, ip, port, sni)
+            func: Callable
+                Function that makes the probe
+            args: Any
+                Arguments of the function
+
+        Returns
+        --------
+            Result of the probe (Any)
+        """
+        with self._lock:
+            if key in self._results:
+                self.__count(self.saved, key[0])
+                return self._results[key]
+            event = self._calls.get(key)
+            if event is None:
+                event = self._calls[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                if key in self._results:
+                    self.__count(self.saved, key[0])
+                    return self._results[key]
+            return func(*args)
+
+        try:
+            result = func(*args)
+            with self._lock:
+                self._results[key] = result
+                self.__count(self.made, key[0])
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            event.set()
+
+    async def do_async(self, key: tuple, func: Callable, *args) -> Any:
+        r"""
+        Coroutine version of do: the probe runs as a task that all callers of the key await
+        (a caller that is cancelled does not cancel the probe of the others)
+
+        Parameters
+        ------------
+            key: tuple
+                (stage, ip, port, sni)
+            func: Callable
+                Coroutine function that makes the probe
+            args: Any
+                Arguments of the function
+
+        Returns
+        --------
+            Result of the probe (Any)
+        """
+        if key in self._results:
+            self.__count(self.saved, key[0])
+            return self._results[key]
+
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda done: self.__finish(key, done))
+            self.__count(self.made, key[0])
+        else:
+            self.__count(self.saved, key[0])
+        return await asyncio.shield(task)
+
+    def __finish(self, key: tuple, task: asyncio.Future) -> None:
+        self._calls.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._results[key] = task.result()
+
+    def cancel(self) -> None:
+        r"""
+        Cancels the probes in flight on the event loop (the probes of the cancelled checks)
+
+        Returns
+        --------
+            None
+        """
+        for task in list(self._calls.values()):
+            if isinstance(task, asyncio.Future):
+                task.cancel()
+
+    def get_description(self) -> str:
+        r"""
+        Returns the description of the made and saved probes
+
+        Returns
+        --------
+            Textual representation of the probes (str)
+        """
+        stages = "\t|\t".join(
+            "{0}: {1} made, {2} saved".format(stage, self.made.get(stage, 0), self.saved.get(stage, 0))
+            for stage in sorted(set(self.made) | set(self.saved))
+        )
+        return "probes: {0} made, {1} saved{2}".format(
+            sum(self.made.values()), sum(self.saved.values()), "\t|\t" + stages if stages else ""
+        )
+
+    def __repr__(self) -> str:
+        return "{0}(made={1}, saved={2})".format(
+            self.__class__.__name__, sum(self.made.values()), sum(self.saved.values())
+        )
@@ -0,0 +1,478 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import inspect
+import threading
+import weakref
+
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+__all__ = (
+    "Metrics",
+)
+
+class MetricsShard(object):
+    r"""
+    Metrics of one thread (only this thread writes to it, so no locks are needed)
+
+    durations: list[list[int]]
+        Stage -> counts of the histogram buckets (pre-allocated)
+    sums: list[float]
+        Stage -> sum of the observed durations in seconds
+    outcomes: dict[str, dict[str, int]]
+        Host -> outcome -> number of the checks
+    in_flight: int
+        Checks started minus checks finished by this thread
+    saved: dict[str, int]
+        Stage -> the number of probes shared by SingleFlight instead of being made
+    handshakes: dict[str, int]
+        Kind ("full", "resumed", "cached") -> the number of TLS handshakes (TLSInspector)
+    received: dict[str, int]
+        Host -> bytes received by the http probes
+
+    merge(shard: MetricsShard) -> None
+        Adds the counts of the shard to this one
+    """
+    __slots__ = (
+        "durations", "sums", "outcomes", "in_flight", "saved", "handshakes", "received"
+    )
+    def __init__(self, stages: int, buckets: int) -> None:
+        self.durations = [[0] * (buckets + 1) for _ in range(stages)]
+        self.sums = [0.0] * stages
+        self.outcomes: dict[str, dict[str, int]] = {}
+        self.in_flight = 0
+        self.saved: dict[str, int] = {}
+        self.handshakes: dict[str, int] = {}
+        self.received: dict[str, int] = {}
+
+    def merge(self, shard: "MetricsShard") -> None:
+        r"""
+        Adds the counts of the shard to this one
+
+        Parameters
+        ------------
+            shard: MetricsShard
+                Shard to add (it may still be written by its thread)
+
+        Returns
+        --------
+            None
+        """
+        self.in_flight += shard.in_flight
+        for index in range(len(self.durations)):
+            self.durations[index] = [a + b for a, b in zip(self.durations[index], shard.durations[index])]
+            self.sums[index] += shard.sums[index]
+        for total, counts in ((self.saved, shard.saved), (self.handshakes, shard.handshakes), (self.received, shard.received)):
+            for key, count in list(counts.items()):
+                total[key] = total.get(key, 0) + count
+        for host, counts in list(shard.outcomes.items()):
+            outcomes = self.outcomes.setdefault(host, {})
+            for outcome, count in list(counts.items()):
+                outcomes[outcome] = outcomes.get(outcome, 0) + count
+
+
+class ShardOwner(object):
+    r"""
+    Thread-local token of a shard, released together with the thread-local data of its thread
+    """
+    __slots__ = (
+        "__weakref__",
+    )
+
+
+class Metrics(object):
+    r"""
+    Process-wide metrics of the checks: outcomes per host, RTT per address,
+    latency histograms of the stages and the number of checks in flight.
+
+    Every thread writes to its own shard with pre-allocated histogram buckets,
+    so recording a sample takes no locks and allocates nothing,
+    the shards are summed only when the metrics are rendered.
+    The shard of a finished thread is added to the retired shard, so the number of shards
+    stays bounded by the number of live threads (pools are created for every pass).
+
+    STAGES: tuple[str]
+        Instrumented stages ("dns", "tcp", "http", "tls", "icmp", "connectivity")
+    BUCKETS: tuple[float]
+        Upper bounds of the histogram buckets in seconds
+    rtts: dict[tuple[str, str], float]
+        (host, ip) -> last RTT in ms
+    expiry: dict[tuple[str, str], int]
+        (host, ip) -> days to the expiry of the ssl certificate
+
+    get_instance() -> Metrics
+        Returns the metrics of the process
+    get_shard() -> MetricsShard
+        Returns the shard of the current thread
+    get_shards() -> int
+        Returns the number of the shards of the live threads
+    observe(stage: str, seconds: float) -> None
+        Adds the duration of the stage to its histogram
+    timed(stage: str) -> Callable
+        Decorator that observes the duration of the function (or coroutine function)
+    enter() -> None
+        Marks the start of a check
+    leave() -> None
+        Marks the end of a check
+    coalesce(stage: str) -> None
+        Counts the probe of the stage that was shared instead of being made
+    handshake(kind: str) -> None
+        Counts the TLS handshake of the kind
+    receive(host: str, count: int) -> None
+        Counts the bytes received by the http probe of the host
+    record(host: str, result: Any) -> None
+        Counts the outcome of the check and updates the RTT and certificate expiry gauges
+    render() -> bytes
+        Renders the metrics in the Prometheus text format
+    """
+    __slots__ = (
+        "rtts", "expiry", "_local", "_shards", "_retired", "_lock"
+    )
+    STAGES: tuple = ("dns", "tcp", "http", "tls", "icmp", "connectivity")
+    BUCKETS: tuple = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    INDEXES: dict = {stage: index for index, stage in enumerate(STAGES)}
+
+    _instance: Optional["Metrics"] = None
+    _instance_lock: threading.Lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self.rtts: dict[tuple[str, str], float] = {}
+        self.expiry: dict[tuple[str, str], int] = {}
+        self._local = threading.local()
+        self._shards: list[MetricsShard] = []
+        self._retired = MetricsShard(len(self.STAGES), len(self.BUCKETS))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> "Metrics":
+        r"""
+        Returns the metrics of the process (creates them if necessary)
+
+        Returns
+        --------
+            Metrics (Metrics)
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def get_shard(self) -> MetricsShard:
+        r"""
+        Returns the shard of the current thread (registers it on the first call,
+        the shard is retired when the thread-local data of the thread is released)
+
+        Returns
+        --------
+            Shard (MetricsShard)
+        """
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = MetricsShard(len(self.STAGES), len(self.BUCKETS))
+            self._local.owner = owner = ShardOwner()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self.__retire, shard)
+        return shard
+
+    def get_shards(self) -> int:
+        r"""
+        Returns the number of the shards of the live threads
+
+        Returns
+        --------
+            Shards (int)
+        """
+        with self._lock:
+            return len(self._shards)
+
+    def __retire(self, shard: MetricsShard) -> None:
+        with self._lock:
+            self._shards.remove(shard)
+            self._retired.merge(shard)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        r"""
+        Adds the duration of the stage to its histogram
+
+        Parameters
+        ------------
+            stage: str
+                One of the STAGES
+            seconds: float
+                Duration in seconds
+
+        Returns
+        --------
+            None
+        """
+        shard = self.get_shard()
+        index = self.INDEXES[stage]
+        shard.durations[index][bisect_left(self.BUCKETS, seconds)] += 1
+        shard.sums[index] += seconds
+
+    def timed(self, stage: str) -> Callable:
+        r"""
+        Decorator that observes the duration of the function (or coroutine function)
+
+        Parameters
+        ------------
+            stage: str
+                One of the STAGES
+
+        Returns
+        --------
+            Decorator (Callable)
+        """
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+                @wraps(func)
+                async def wrapper(*args, **kwargs) -> Any:
+                    start = perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.observe(stage, perf_counter() - start)
+            else:
+                @wraps(func)
+                def wrapper(*args, **kwargs) -> Any:
+                    start = perf_counter()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        self.observe(stage, perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def enter(self) -> None:
+        r"""
+        Marks the start of a check
+
+        Returns
+        --------
+            None
+        """
+        self.get_shard().in_flight += 1
+
+    def leave(self) -> None:
+        r"""
+        Marks the end of a check
+
+        Returns
+        --------
+            None
+        """
+        self.get_shard().in_flight -= 1
+
+    def coalesce(self, stage: str) -> None:
+        r"""
+        Counts the probe of the stage that was shared instead of being made (SingleFlight)
+
+        Parameters
+        ------------
+            stage: str
+                Stage of the probe ("http", "tls", "tcp", "icmp", "rdns")
+
+        Returns
+        --------
+            None
+        """
+        saved = self.get_shard().saved
+        saved[stage] = saved.get(stage, 0) + 1
+
+    def handshake(self, kind: str) -> None:
+        r"""
+        Counts the TLS handshake of the kind (TLSInspector)
+
+        Parameters
+        ------------
+            kind: str
+                "full", "resumed" (abbreviated handshake) or "cached" (no handshake)
+
+        Returns
+        --------
+            None
+        """
+        handshakes = self.get_shard().handshakes
+        handshakes[kind] = handshakes.get(kind, 0) + 1
+
+    def receive(self, host: str, count: int) -> None:
+        r"""
+        Counts the bytes received by the http probe of the host
+
+        Parameters
+        ------------
+            host: str
+                Probed host
+            count: int
+                Received bytes
+
+        Returns
+        --------
+            None
+        """
+        received = self.get_shard().received
+        received[host] = received.get(host, 0) + count
+
+    def record(self, host: str, result: Any) -> None:
+        r"""
+        Counts the outcome of the check ("ok" or the name of the error class)
+        and updates the RTT and certificate expiry gauges of the addresses of the host
+
+        Parameters
+        ------------
+            host: str
+                Host of the site
+            result: Any
+                Result of the controller (CheckResult, list of CheckResult or error)
+
+        Returns
+        --------
+            None
+        """
+        if host is None or result is None:
+            return
+
+        if isinstance(result, Exception):
+            outcome = result.__class__.__name__
+        else:
+            outcome = "ok"
+            for output in result if isinstance(result, list) else [result]:
+                self.rtts[(host, output.host_ip)] = output.ping
+                if output.ssl_days is not None:
+                    self.expiry[(host, output.host_ip)] = output.ssl_days
+
+        outcomes = self.get_shard().outcomes.get(host)
+        if outcomes is None:
+            outcomes = self.get_shard().outcomes[host] = {}
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    @staticmethod
+    def escape(value: Any) -> str:
+        r"""
+        Escapes the label value
+
+        Parameters
+        ------------
+            value: Any
+                Label value
+
+        Returns
+        --------
+            Escaped value (str)
+        """
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    def render(self) -> bytes:
+        r"""
+        Renders the metrics in the Prometheus text format (version 0.0.4)
+
+        Returns
+        --------
+            Metrics (bytes)
+        """
+        total = MetricsShard(len(self.STAGES), len(self.BUCKETS))
+        with self._lock:
+            # a shard is either live or retired while the lock is held, so it is counted once
+            total.merge(self._retired)
+            for shard in self._shards:
+                total.merge(shard)
+
+        in_flight, durations, sums = total.in_flight, total.durations, total.sums
+        saved, handshakes, received = total.saved, total.handshakes, total.received
+        outcomes = {
+            (host, outcome): count for host, counts in total.outcomes.items() for outcome, count in counts.items()
+        }
+
+        lines = [
+            "# HELP ssc_checks_total Number of the checks by host and outcome",
+            "# TYPE ssc_checks_total counter",
+        ]
+        for (host, outcome), count in sorted(outcomes.items()):
+            lines.append('ssc_checks_total{{host="{0}",outcome="{1}"}} {2}'.format(
+                self.escape(host), self.escape(outcome), count
+            ))
+
+        lines += [
+            "# HELP ssc_rtt_milliseconds Last RTT of the address of the host",
+            "# TYPE ssc_rtt_milliseconds gauge",
+        ]
+        for (host, ip), rtt in sorted(self.rtts.copy().items()):
+            lines.append('ssc_rtt_milliseconds{{host="{0}",ip="{1}"}} {2}'.format(
+                self.escape(host), self.escape(ip), rtt
+            ))
+
+        lines += [
+            "# HELP ssc_certificate_expiry_days Days to the expiry of the ssl certificate of the address of the host",
+            "# TYPE ssc_certificate_expiry_days gauge",
+        ]
+        for (host, ip), days in sorted(self.expiry.copy().items()):
+            lines.append('ssc_certificate_expiry_days{{host="{0}",ip="{1}"}} {2}'.format(
+                self.escape(host), self.escape(ip), days
+            ))
+
+        lines += [
+            "# HELP ssc_stage_duration_seconds Latency of the stages of the checks",
+            "# TYPE ssc_stage_duration_seconds histogram",
+        ]
+        for index, stage in enumerate(self.STAGES):
+            cumulative = 0
+            for bound, count in zip(self.BUCKETS + ("+Inf", ), durations[index]):
+                cumulative += count
+                lines.append('ssc_stage_duration_seconds_bucket{{stage="{0}",le="{1}"}} {2}'.format(
+                    stage, bound, cumulative
+                ))
+            lines.append('ssc_stage_duration_seconds_sum{{stage="{0}"}} {1}'.format(stage, sums[index]))
+            lines.append('ssc_stage_duration_seconds_count{{stage="{0}"}} {1}'.format(stage, cumulative))
+
+        lines += [
+            "# HELP ssc_probes_saved_total Number of the probes shared between the checks of a pass instead of being made",
+            "# TYPE ssc_probes_saved_total counter",
+        ]
+        for stage, count in sorted(saved.items()):
+            lines.append('ssc_probes_saved_total{{stage="{0}"}} {1}'.format(stage, count))
+
+        lines += [
+            "# HELP ssc_tls_handshakes_total Number of the TLS handshakes by kind (full, resumed, cached - no handshake)",
+            "# TYPE ssc_tls_handshakes_total counter",
+        ]
+        for kind, count in sorted(handshakes.items()):
+            lines.append('ssc_tls_handshakes_total{{kind="{0}"}} {1}'.format(kind, count))
+
+        lines += [
+            "# HELP ssc_http_received_bytes_total Bytes received by the http probes of the host",
+            "# TYPE ssc_http_received_bytes_total counter",
+        ]
+        for host, count in sorted(received.items()):
+            lines.append('ssc_http_received_bytes_total{{host="{0}"}} {1}'.format(self.escape(host), count))
+
+        lines += [
+            "# HELP ssc_in_flight_checks Number of the checks in progress",
+            "# TYPE ssc_in_flight_checks gauge",
+            "ssc_in_flight_checks {0}".format(in_flight),
+        ]
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def __repr__(self) -> str:
+        return "{0}(shards={1})".format(self.__class__.__name__, len(self._shards))
@@ -0,0 +1,199 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+import socket
+import select
+import struct
+import heapq
+import ipaddress
+
+from time import perf_counter
+from typing import Iterable, Optional
+
+__all__ = (
+    "BatchPinger",
+)
+
+class BatchPinger(object):
+    r"""
+    ICMP engine that pings many IPv4 addresses through one socket:
+    all echo requests are sent at once and the replies are matched by id/sequence,
+    so the whole batch takes about one timeout window (the longest timeout of its addresses)
+
+    timeout: float
+        Time to wait for the replies in seconds (addresses without their own timeout)
+
+    open_socket() -> Optional[socket.socket]
+        Opens an ICMP socket (unprivileged datagram socket or raw socket)
+    get_checksum(data: bytes) -> int
+        Returns the internet checksum of the data
+    build_packet(identifier: int, sequence: int) -> bytes
+        Builds an ICMP echo request
+    ping(ips: Iterable[str], timeouts: Optional[dict[str, float]] = None) -> dict[str, Optional[float]]
+        Pings all addresses and returns their RTT in ms
+    """
+    __slots__ = (
+        "timeout",
+    )
+    ECHO_REPLY: int = 0
+    ECHO_REQUEST: int = 8
+    MAX_BATCH: int = 0xFFFF
+
+    def __init__(self, timeout: float = 5) -> None:
+        self.timeout = timeout
+
+    @staticmethod
+    def open_socket() -> Optional[socket.socket]:
+        r"""
+        Opens an ICMP socket (unprivileged datagram socket or raw socket)
+
+        Returns
+        --------
+            ICMP socket or None if there is no permission (Optional[socket.socket])
+        """
+        for socket_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                return socket.socket(socket.AF_INET, socket_type, socket.IPPROTO_ICMP)
+            except OSError:
+                continue
+        return None
+
+    @staticmethod
+    def get_checksum(data: bytes) -> int:
+        r"""
+        Returns the internet checksum of the data
+
+        Parameters
+        ------------
+            data: bytes
+                ICMP packet
+
+        Returns
+        --------
+            Checksum (int)
+        """
+        if len(data) % 2:
+            data += b"\x00"
+        total = sum(struct.unpack("!{0}H".format(len(data) // 2), data))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
+
+    def build_packet(self, identifier: int, sequence: int) -> bytes:
+        r"""
+        Builds an ICMP echo request
+
+        Parameters
+        ------------
+            identifier: int
+                Echo identifier
+            sequence: int
+                Echo sequence number
+
+        Returns
+        --------
+            ICMP packet (bytes)
+        """
+        payload = struct.pack("!d", perf_counter())
+        header = struct.pack("!BBHHH", self.ECHO_REQUEST, 0, 0, identifier, sequence)
+        checksum = self.get_checksum(header + payload)
+        return struct.pack("!BBHHH", self.ECHO_REQUEST, 0, checksum, identifier, sequence) + payload
+
+    def ping(self, ips: Iterable[str], timeouts: Optional[dict[str, float]] = None) -> dict[str, Optional[float]]:
+        r"""
+        Pings all addresses (each unique address once) and returns their RTT in ms
+
+        Parameters
+        ------------
+            ips: Iterable[str]
+                IPv4 addresses to ping (other values are ignored)
+            timeouts: Optional[dict[str, float]]
+                IP address -> reply timeout in seconds (self.timeout for the missing addresses)
+
+        Returns
+        --------
+            IP address -> RTT in ms (None if there is no reply), empty if the
+            ICMP socket can not be opened (dict[str, Optional[float]])
+        """
+        addresses = []
+        for ip in set(ips):
+            try:
+                if ipaddress.ip_address(ip).version == 4:
+                    addresses.append(ip)
+            except ValueError:
+                continue
+
+        result = {}
+        timeouts = {} if timeouts is None else timeouts
+        for start in range(0, len(addresses), self.MAX_BATCH):
+            batch = self.__ping_batch(addresses[start:start + self.MAX_BATCH], timeouts)
+            if batch is None:
+                return {}
+            result.update(batch)
+        return result
+
+    def __ping_batch(self, addresses: list[str], timeouts: dict[str, float]) -> Optional[dict[str, Optional[float]]]:
+        sock = self.open_socket()
+        if sock is None:
+            return None
+
+        result = dict.fromkeys(addresses)
+        identifier = os.getpid() & 0xFFFF
+        is_raw = sock.type == socket.SOCK_RAW
+        sent = {}
+        deadlines = []
+
+        with sock:
+            for sequence, ip in enumerate(addresses):
+                try:
+                    sock.sendto(self.build_packet(identifier, sequence), (ip, 0))
+                except OSError:
+                    continue
+                sent[sequence] = (ip, perf_counter())
+                heapq.heappush(deadlines, (sent[sequence][1] + timeouts.get(ip, self.timeout), sequence))
+
+            while sent:
+                while deadlines and (deadlines[0][1] not in sent or deadlines[0][0] <= perf_counter()):
+                    sent.pop(heapq.heappop(deadlines)[1], None)
+                if not deadlines:
+                    break
+                remaining = deadlines[0][0] - perf_counter()
+                if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+                    continue
+                data, (address, _) = sock.recvfrom(2048)
+                received = perf_counter()
+
+                if is_raw:
+                    data = data[(data[0] & 0x0F) * 4:]
+                if len(data) < 8:
+                    continue
+                icmp_type, _, _, reply_identifier, sequence = struct.unpack("!BBHHH", data[:8])
+                if icmp_type != self.ECHO_REPLY or (is_raw and reply_identifier != identifier):
+                    continue
+
+                request = sent.get(sequence)
+                if request is not None and request[0] == address:
+                    result[address] = (received - request[1]) * 1000
+                    del sent[sequence]
+        return result
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, self.timeout)
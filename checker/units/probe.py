@@ -0,0 +1,245 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import threading
+
+from time import perf_counter
+from typing import Optional
+
+from checker.units.resolver import DNSCache
+from checker.config import headers, PROBE_METHOD, PROBE_MAX_BYTES
+
+__all__ = (
+    "ProbeResult", "HTTPProbe"
+)
+
+class ProbeResult(object):
+    r"""
+    The result of the HTTP probe of one host
+
+    host: str
+        Probed host (IP or domain name)
+    reachable: bool
+        Whether the host responded over http (following redirects)
+    status_code: Optional[int]
+        Response status code (None if there is no response)
+    redirect: Optional[str]
+        Final url if the request was redirected
+    ssl: Optional[bool]
+        Validity of the ssl certificate (None if the request was not redirected to https)
+    timings: dict[str, float]
+        Time of the request in seconds ("http", "http_headers")
+    received: int
+        Bytes received from the host (headers and the read part of the bodies, estimated from the parsed responses)
+    """
+    __slots__ = (
+        "host", "reachable", "status_code", "redirect", "ssl", "timings", "received"
+    )
+    def __init__(self, host: str) -> None:
+        self.host = host
+        self.reachable = False
+        self.status_code = None
+        self.redirect = None
+        self.ssl = None
+        self.timings = {}
+        self.received = 0
+
+    def __repr__(self) -> str:
+        return "{0}({1}, reachable={2}, status_code={3}, ssl={4})".format(
+            self.__class__.__name__, self.host, self.reachable, self.status_code, self.ssl
+        )
+
+
+class HTTPProbe(object):
+    r"""
+    Single-pass HTTP probe: one request returns reachability, status code and redirect target of the host
+    (the certificates are checked by TLSInspector).
+    Each thread uses its own requests.Session (connection pool per scheme).
+    The request is HEAD, servers rejecting it get a GET whose body is read
+    up to max_bytes before the connection is closed
+
+    timeout: float
+        Request timeout in seconds
+    method: str
+        "HEAD" (GET if the server rejects HEAD) or "GET"
+    max_bytes: int
+        The maximum number of body bytes read by GET
+    FALLBACK: frozenset[int]
+        Status codes of HEAD after which GET is sent
+
+    get_session() -> requests.Session
+        Returns the session of the current thread (connections use the DNS cache)
+    get_url(host: str, scheme: str) -> str
+        Returns the link to the host with the given scheme
+    get_size(response: requests.Response, body: int = 0) -> int
+        Returns the estimated number of bytes of the response
+    request(url: str, timeout: float) -> tuple[requests.Response, int]
+        Makes the request (following redirects) and returns the response and the received bytes
+    probe(host: str, timeout: Optional[float] = None) -> ProbeResult
+        Probes the host over http
+    """
+    __slots__ = (
+        "timeout", "method", "max_bytes", "_local"
+    )
+    FALLBACK: frozenset = frozenset((400, 403, 405, 501))
+
+    def __init__(self, timeout: float = 5, method: str = PROBE_METHOD, max_bytes: int = PROBE_MAX_BYTES) -> None:
+        self.timeout = timeout
+        self.method = method.upper()
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def get_session(self) -> "requests.Session":
+        r"""
+        Returns the session of the current thread (connections use the DNS cache)
+
+        Returns
+        --------
+            Session of the current thread (requests.Session)
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            session.headers.update(headers)
+            cache = DNSCache.get_instance()
+            session.mount("http://", cache.get_adapter())
+            session.mount("https://", cache.get_adapter())
+            self._local.session = session
+        return session
+
+    @staticmethod
+    def get_url(host: str, scheme: str) -> str:
+        r"""
+        Returns the link to the host with the given scheme
+
+        Parameters
+        ------------
+            host: str
+                Host or link
+            scheme: str
+                "http" or "https"
+
+        Returns
+        --------
+            Link (str)
+        """
+        if "://" in host:
+            host = host.split("://", 1)[1]
+        return "{0}://{1}".format(scheme, host)
+
+    @staticmethod
+    def get_size(response: "requests.Response", body: int = 0) -> int:
+        r"""
+        Returns the estimated number of bytes of the response (status line, headers and the read body)
+
+        Parameters
+        ------------
+            response: requests.Response
+                Response
+            body: int
+                The number of read bytes of the body
+
+        Returns
+        --------
+            Bytes (int)
+        """
+        return len("HTTP/1.1 {0} {1}\r\n\r\n".format(response.status_code, response.reason or "")) + sum(
+            len(name) + len(value) + 4 for name, value in response.raw.headers.items()
+        ) + body
+
+    def request(self, url: str, timeout: float) -> tuple["requests.Response", int]:
+        r"""
+        Makes the request (following redirects) and returns the response and the received bytes:
+        HEAD first (unless method is "GET"), then GET if the server rejects HEAD,
+        GET reads at most max_bytes of the body and closes the connection
+
+        Parameters
+        ------------
+            url: str
+                Link to request
+            timeout: float
+                Timeout of the request in seconds
+
+        Returns
+        --------
+            Closed response and the number of received bytes (tuple[requests.Response, int])
+        """
+        session = self.get_session()
+        received = 0
+        if self.method == "HEAD":
+            response = session.head(url, timeout=timeout, allow_redirects=True)
+            received += sum(self.get_size(redirect) for redirect in response.history) + self.get_size(response)
+            if response.status_code not in self.FALLBACK:
+                return response, received
+            response.close()
+
+        response = session.get(url, timeout=timeout, stream=True)
+        try:
+            body = len(response.raw.read(self.max_bytes, decode_content=False))
+        except Exception:
+            body = 0
+        finally:
+            response.close()
+        received += sum(
+            self.get_size(redirect, len(redirect.content)) for redirect in response.history
+        ) + self.get_size(response, body)
+        return response, received
+
+    def probe(self, host: str, timeout: Optional[float] = None) -> ProbeResult:
+        r"""
+        Probes the host over http, at most max_bytes of the response body are downloaded
+
+        Parameters
+        ------------
+            host: str
+                Host or link to probe
+            timeout: Optional[float]
+                Timeout of the http request in seconds (self.timeout by default)
+
+        Returns
+        --------
+            Probe result (ProbeResult)
+        """
+        import requests
+
+        result = ProbeResult(host)
+        start = perf_counter()
+        try:
+            response, received = self.request(self.get_url(host, "http"), self.timeout if timeout is None else timeout)
+        except requests.exceptions.SSLError:
+            result.ssl = False
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            pass
+        else:
+            result.reachable = True
+            result.received += received
+            result.status_code = response.status_code
+            result.timings["http_headers"] = response.elapsed.total_seconds()
+            if response.history:
+                result.redirect = response.url
+            if response.url.startswith("https://"):
+                result.ssl = True
+        result.timings["http"] = perf_counter() - start
+        return result
+
+    def __repr__(self) -> str:
+        return "{0}({1}, method={2})".format(self.__class__.__name__, self.timeout, self.method)
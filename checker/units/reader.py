@@ -19,11 +19,15 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
 DEALINGS IN THE SOFTWARE.
 """
 import os
-import pandas as pd
+import csv
+import gzip
+import ipaddress
+import urllib.parse
 
-from typing import Union, Generator
+from typing import Union, Generator, Iterable, TextIO, Optional
 
 from checker.units.exceptions import DataInvalidFormat, FileInvalidFormat
+from checker.config import PLAN_CACHE_SIZE
 
 
 __all__ = (
@@ -32,56 +36,112 @@ __all__ = (
 
 class ReadObject(object):
     r"""
-    A single site-object for which checks will be carried out
+    A single site-object for which checks will be carried out, compiled once when its row is read:
+    the classification of the host and its endpoints never change, so the object is immutable
+    and is reused by every pass
 
-    host: str
-        Website host (IP or domain name)
-    ports: list[int]
+    host: Optional[str]
+        Website host (IP or domain name, as written in the .csv file)
+    ports: tuple[int]
         Site port or ports
+    interval: Optional[float]
+        Check interval of the site in seconds (None - the default interval)
+    hostname: Optional[str]
+        Host name of the link (lowercase, without scheme, port and path)
+    address: Optional[str]
+        IPv4 address of the site if the host is an address (None for domain names)
+    is_localhost: bool
+        Whether the host is "localhost" or "127.0.0.1"
+    http_url: Optional[str]
+        Link to the site over http
+    https_url: Optional[str]
+        Link to the site over https
+    key: Optional[str]
+        Dedup key (host name and ports), the same for all spellings of one site
     """
     __slots__ = (
-        "host", "_ports", "_results"
+        "host", "ports", "interval", "hostname", "address", "is_localhost", "http_url", "https_url", "key"
     )
-    def __init__(self, host: str, ports: Union[str, None]) -> None:
-        self.host = host
-        self._ports = ports
+    LOCALHOST: frozenset = frozenset(("localhost", "127.0.0.1"))
 
-        if ports == "" or ports is None:
-            self._ports = ""
+    def __init__(
+            self, host: Optional[str], ports: Union[str, Iterable[int], None], interval: Optional[float] = None
+    ) -> None:
+        if isinstance(ports, str):
+            ports = tuple(int(port) for port in ports.split(",")) if ports else ()
+        else:
+            ports = tuple(ports or ())
 
-        self._results = []
+        hostname = address = http_url = https_url = key = None
+        if host is not None:
+            link = host if "://" in host else "http://" + host
+            try:
+                hostname = urllib.parse.urlsplit(link).hostname
+            except ValueError:
+                hostname = None
+            hostname = hostname or host.lower()
+            try:
+                ip = ipaddress.ip_address(hostname)
+            except ValueError:
+                ip = None
+            if ip is not None and ip.version == 4:
+                address = str(ip)
+            rest = link.split("://", 1)[1]
+            http_url, https_url = "http://" + rest, "https://" + rest
+            key = "{0}|{1}".format(hostname, ",".join(map(str, ports)))
 
-    @property
-    def ports(self) -> list[int]:
-        if self._results or self._ports == "":
-            return self._results
+        for name, value in (
+                ("host", host), ("ports", ports), ("interval", interval), ("hostname", hostname),
+                ("address", address), ("is_localhost", hostname in self.LOCALHOST), ("http_url", http_url),
+                ("https_url", https_url), ("key", key)
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("{0} is immutable".format(self.__class__.__name__))
 
-        self._results = [int(port) for port in self._ports.split(",")]
-        return self._results
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("{0} is immutable".format(self.__class__.__name__))
 
     def __repr__(self) -> str:
-        return "{0}({1}, {2})".format(self.__class__.__name__, self.host, self.ports)
+        return "{0}({1}, {2})".format(self.__class__.__name__, self.host, list(self.ports))
 
 
 class CSVReader(object):
     """
-    Class for reading and processing data from a .csv file
+    Class for reading and processing data from a .csv (or gzip-compressed .csv.gz) file,
+    the file is read lazily (row by row) on every pass, valid rows are compiled into ReadObject once
+    and the next passes reuse them (up to PLAN_CACHE_SIZE rows).
+    Columns: "Host", "Ports" and optional "Interval" (seconds or a number with s/m/h/d suffix)
 
     get_file_exists_status() -> bool
         Checks for the existence of a .csv file
-    read() -> list[ReadObject]
-        Reads .csv file and performs necessary checks
+    get_interval(interval: str) -> Optional[float]
+        Converts the value of the "Interval" column to seconds
+    open() -> TextIO
+        Opens the .csv file (decompresses .csv.gz)
+    read_rows() -> Generator
+        Reads .csv file row by row and checks the file itself
+    parse_row(row: list[str]) -> Optional[ReadObject]
+        Performs necessary checks of one row
+    read() -> Generator
+        Reads .csv file row by row and performs necessary checks
+    units -> list[ReadObject]
+        All sites from the .csv file
     __call__(self) -> Generator
         Returns a generator from ReadObject objects
     """
     __slots__ = (
-        "filename", "input_error_status", "units"
+        "filename", "input_error_status", "columns", "plans"
     )
     def __init__(self, filename: str) -> None:
         self.filename = filename
         self.input_error_status = False
+        self.columns = ["host", "ports"]
+        self.plans: dict[tuple, ReadObject] = {}
 
-        self.units = self.read()
+        for _ in self.read():
+            pass
 
     def get_file_exists_status(self) -> bool:
         r"""
@@ -93,53 +153,161 @@ class CSVReader(object):
         """
         return os.path.isfile(self.filename)
 
-    def read(self) -> list[ReadObject]:
+    @staticmethod
+    def get_interval(interval: str) -> Optional[float]:
         r"""
-        Reads .csv file and performs necessary checks
+        Converts the value of the "Interval" column to seconds
+
+        Parameters
+        ------------
+            interval: str
+                Interval ("90", "30s", "15m", "1h", "1d" or "")
 
         Returns
         --------
-           List of sites from .csv file (list[ReadObject])
+           Interval in seconds, None if the value is empty or invalid (Optional[float])
+        """
+        interval = interval.strip().lower()
+        if interval == "":
+            return None
+
+        multiplier = {"s": 1, "m": 60, "h": 3600, "d": 86400}.get(interval[-1])
+        if multiplier is not None:
+            interval = interval[:-1]
+        try:
+            value = float(interval) * (multiplier or 1)
+        except ValueError:
+            return None
+        return value if value > 0 else None
+
+    def open(self) -> TextIO:
+        r"""
+        Opens the .csv file (decompresses .csv.gz)
+
+        Returns
+        --------
+           Text stream of the file (TextIO)
+        """
+        if self.filename.endswith(".gz"):
+            return gzip.open(self.filename, "rt", encoding="utf-8-sig", newline="")
+        return open(self.filename, "r", encoding="utf-8-sig", newline="")
+
+    def read_rows(self) -> Generator:
+        r"""
+        Reads .csv file row by row and checks the file itself (existence, extension, columns),
+        the rows are not checked (errors are stored in input_error_status)
+
+        Returns
+        --------
+           Generator of non-empty rows of the .csv file (Generator[list[str]])
         """
         if not self.get_file_exists_status():
             self.input_error_status = FileInvalidFormat("file {0} not found".format(self.filename))
-            return []
+            return
 
         try:
-            if self.filename[-4:] != ".csv":
-                self.input_error_status = FileInvalidFormat("file {0} must be .csv".format(self.filename))
-                return []
+            if self.filename[-4:] != ".csv" and self.filename[-7:] != ".csv.gz":
+                self.input_error_status = FileInvalidFormat("file {0} must be .csv (or .csv.gz)".format(self.filename))
+                return
         except IndexError:
             self.input_error_status = FileInvalidFormat("the total filename length must be >= 4 characters")
-            return []
+            return
         except Exception as e:
             self.input_error_status = FileInvalidFormat(e.args[0] + f"{e.__class__.__name__}")
-            return []
+            return
+
+        try:
+            with self.open() as file:
+                rows = csv.reader(file, delimiter=";")
+
+                self.columns = list(map(str.lower, next(rows, [])))
+                if self.columns not in (["host", "ports"], ["host", "ports", "interval"]):
+                    self.input_error_status = FileInvalidFormat(
+                        "the table should have columns \"Host\" and \"Ports\" (and optional \"Interval\")"
+                    )
+                    return
 
-        data = pd.read_csv(self.filename, sep=";")
+                for row in rows:
+                    if row:
+                        yield row
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            self.input_error_status = FileInvalidFormat("{0} ({1})".format(e, e.__class__.__name__))
 
-        if list(map(str.lower, data.columns)) != ["host", "ports"]:
-            self.input_error_status = FileInvalidFormat("the table should have columns \"Host\" and \"Ports\"")
-            return []
+    def parse_row(self, row: list[str]) -> Optional[ReadObject]:
+        r"""
+        Performs necessary checks of one row (errors are stored in input_error_status)
+
+        Parameters
+        ------------
+            row: list[str]
+                Row of the .csv file
+
+        Returns
+        --------
+           Site from the row or None if the row is invalid (Optional[ReadObject])
+        """
+        if len(row) > len(self.columns):
+            self.input_error_status = DataInvalidFormat(
+                "the row must have {0} columns ({1})".format(len(self.columns), ";".join(row))
+            )
+            return None
 
-        data = data.astype(str)
-        values = []
+        host, ports, interval = (row + ["", ""])[:3]
+        if ports == "":
+            ports = None
+        else:
+            if not ports.isdigit():
+                if not all([i.isdigit() for i in ports.split(",")]):
+                    self.input_error_status = DataInvalidFormat("all ports must be int ({0})".format(ports))
+                    return None
+            if not all([0 < int(i) <= 65535 for i in ports.split(",")]):
+                self.input_error_status = DataInvalidFormat("all ports must be from 1 to 65535 ({0})".format(ports))
+                return None
 
-        for host, ports in data.values.tolist():
-            if ports in ["nan", "", [], None]:
-                ports = None
-            else:
-                if not ports.isdigit():
-                    if not all([i.isdigit() for i in ports.split(",")]):
-                        self.input_error_status = DataInvalidFormat("all ports must be int ({0})".format(ports))
-                        continue
+        if interval != "" and self.get_interval(interval) is None:
+            self.input_error_status = DataInvalidFormat("interval must be a positive number ({0})".format(interval))
+            return None
 
-            if host in ["nan", "", [], None]:
-                host = None
-                self.input_error_status = DataInvalidFormat("host must be not None")
+        if host == "":
+            host = None
+            self.input_error_status = DataInvalidFormat("host must be not None")
 
-            values.append(ReadObject(host, ports))
-        return values
+        return ReadObject(host, ports, self.get_interval(interval))
+
+    def read(self) -> Generator:
+        r"""
+        Reads .csv file row by row and performs necessary checks
+        (errors of the pass are stored in input_error_status), the rows compiled by the previous pass
+        are not parsed again
+
+        Returns
+        --------
+           Generator of sites from .csv file (Generator[ReadObject])
+        """
+        self.input_error_status = False
+        plans = {}
+        for row in self.read_rows():
+            key = tuple(row)
+            unit = self.plans.get(key)
+            if unit is None:
+                unit = self.parse_row(row)
+                if unit is None:
+                    continue
+            if unit.host is not None and len(plans) < PLAN_CACHE_SIZE:
+                plans[key] = unit
+            yield unit
+        self.plans = plans
+
+    @property
+    def units(self) -> list[ReadObject]:
+        r"""
+        All sites from the .csv file (the file is read completely)
+
+        Returns
+        --------
+           List of sites from .csv file (list[ReadObject])
+        """
+        return list(self.read())
 
     def __repr__(self) -> str:
         return "{0}({1})".format(self.__class__.__name__, self.filename)
@@ -155,4 +323,4 @@ class CSVReader(object):
         --------
            A generator from ReadObject objects
         """
-        yield from self.units
+        yield from self.read()
@@ -0,0 +1,420 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import socket
+import ipaddress
+
+from time import monotonic, perf_counter
+from threading import Lock, Thread
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from checker import config
+
+__all__ = (
+    "DNSCache",
+)
+
+class DNSCache(object):
+    r"""
+    Process-wide cache of socket.getaddrinfo and socket.gethostbyaddr results with LRU eviction and TTL expiry
+
+    getaddrinfo does not return the TTL of the records, so every entry lives `ttl` seconds
+    (clamped to [min_ttl, max_ttl]), NXDOMAIN answers (and addresses without PTR records)
+    are cached for `negative_ttl` seconds. IP addresses are not cached (they are not resolved)
+
+    size: int
+        The maximum number of cached hosts
+    ttl: float
+        Lifetime of the entries in seconds
+    min_ttl: float
+        The minimum lifetime of the entries in seconds
+    max_ttl: float
+        The maximum lifetime of the entries in seconds
+    negative_ttl: float
+        Lifetime of NXDOMAIN answers in seconds
+    hits: int
+        The number of lookups answered from the cache
+    misses: int
+        The number of lookups sent to the resolver
+
+    get_instance() -> DNSCache
+        Returns the cache of the current process
+    is_ip(host: str) -> bool
+        Checks whether the host is an IP address
+    getaddrinfo(host: str, port: Optional[int], family: int = 0, type: int = 0) -> list[tuple]
+        Cached version of socket.getaddrinfo
+    gethostbyaddr(ip: str) -> str
+        Cached reverse lookup, returns the host name of the address
+    resolve(hosts: Iterable[str], port: Optional[int] = 80, workers: int = 32, timeout: Optional[float] = None)
+            -> dict[str, Optional[list[tuple]]]
+        Looks up the addresses of the hosts concurrently
+    reverse(ips: Iterable[str], workers: int = 32, timeout: Optional[float] = None) -> dict[str, Optional[str]]
+        Looks up the host names of the addresses concurrently
+    put(key: tuple, value: Any, ttl: Optional[float] = None) -> None
+        Puts the entry into the cache
+    clear() -> None
+        Removes all entries from the cache
+    stats() -> dict[str, int]
+        Returns hit/miss counters
+    get_adapter() -> requests.adapters.HTTPAdapter
+        Returns a requests adapter whose connections use the cache
+        (Host header and SNI stay the same)
+    """
+    __slots__ = (
+        "size", "ttl", "min_ttl", "max_ttl", "negative_ttl",
+        "hits", "misses", "_entries", "_lock"
+    )
+    _instance: Optional["DNSCache"] = None
+    _instance_lock: Lock = Lock()
+
+    def __init__(
+            self, size: Optional[int] = None, ttl: Optional[float] = None,
+            min_ttl: Optional[float] = None, max_ttl: Optional[float] = None,
+            negative_ttl: Optional[float] = None
+    ) -> None:
+        self.size = config.DNS_CACHE_SIZE if size is None else size
+        self.ttl = config.DNS_TTL if ttl is None else ttl
+        self.min_ttl = config.DNS_MIN_TTL if min_ttl is None else min_ttl
+        self.max_ttl = config.DNS_MAX_TTL if max_ttl is None else max_ttl
+        self.negative_ttl = config.DNS_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    @classmethod
+    def get_instance(cls) -> "DNSCache":
+        r"""
+        Returns the cache of the current process
+
+        Returns
+        --------
+            DNS cache (DNSCache)
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def is_ip(host: str) -> bool:
+        r"""
+        Checks whether the host is an IP address
+
+        Parameters
+        ------------
+            host: str
+                Host to check
+
+        Returns
+        --------
+            IP address status (bool)
+        """
+        try:
+            ipaddress.ip_address(host.strip("[]"))
+        except ValueError:
+            return False
+        return True
+
+    def getaddrinfo(self, host: str, port: Optional[int], family: int = 0, type: int = 0) -> list[tuple]:
+        r"""
+        Cached version of socket.getaddrinfo (raises socket.gaierror in the same way)
+
+        Parameters
+        ------------
+            host: str
+                Domain name or IP address
+            port: Optional[int]
+                Port to put into the socket addresses
+            family: int
+                Address family (socket.AF_*)
+            type: int
+                Socket type (socket.SOCK_*)
+
+        Returns
+        --------
+            List of (family, type, proto, canonname, sockaddr) (list[tuple])
+        """
+        if self.is_ip(host):
+            return socket.getaddrinfo(host, port, family, type)
+
+        key = (host.lower(), family, type)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[1]
+            else:
+                value = None
+                self.misses += 1
+
+        if value is None:
+            try:
+                value = socket.getaddrinfo(host, None, family, type)
+            except socket.gaierror as ex:
+                if ex.errno == socket.EAI_NONAME:
+                    self.put(key, ex, self.negative_ttl)
+                raise
+            self.put(key, value)
+
+        if isinstance(value, socket.gaierror):
+            raise socket.gaierror(value.errno, value.strerror)
+        return [
+            (af, socktype, proto, canonname, (sockaddr[0], port or 0) + tuple(sockaddr[2:]))
+            for af, socktype, proto, canonname, sockaddr in value
+        ]
+
+    def gethostbyaddr(self, ip: str) -> str:
+        r"""
+        Cached reverse lookup (raises socket.herror or socket.gaierror in the same way as socket.gethostbyaddr)
+
+        Parameters
+        ------------
+            ip: str
+                IP address
+
+        Returns
+        --------
+            Host name of the address (str)
+        """
+        key = (ip, "PTR")
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[1]
+            else:
+                value = None
+                self.misses += 1
+
+        if value is None:
+            try:
+                value = socket.gethostbyaddr(ip)[0]
+            except socket.herror as ex:
+                # HOST_NOT_FOUND (1) and NO_DATA (4) are answers, TRY_AGAIN (2) and the rest are not
+                if ex.errno in (1, 4):
+                    self.put(key, ex, self.negative_ttl)
+                raise
+            self.put(key, value)
+
+        if isinstance(value, socket.herror):
+            raise socket.herror(value.errno, value.strerror)
+        return value
+
+    def resolve(
+            self, hosts: Iterable[str], port: Optional[int] = 80, workers: int = 32, timeout: Optional[float] = None
+    ) -> dict[str, Optional[list[tuple]]]:
+        r"""
+        Looks up the addresses of the hosts concurrently (once per host, cached answers are returned at once),
+        the lookups that are not finished in `timeout` seconds are left running and are not returned
+
+        Parameters
+        ------------
+            hosts: Iterable[str]
+                Domain names or IP addresses
+            port: Optional[int]
+                Port to put into the socket addresses
+            workers: int
+                The maximum number of simultaneous lookups
+            timeout: Optional[float]
+                The maximum time to wait for the lookups in seconds (None - no limit)
+
+        Returns
+        --------
+            Host -> getaddrinfo result (None if the host is not resolved) (dict[str, Optional[list[tuple]]])
+        """
+        pending = list(dict.fromkeys(hosts))
+        addresses: dict[str, Optional[list[tuple]]] = {}
+        lock = Lock()
+
+        def lookup() -> None:
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    host = pending.pop()
+                try:
+                    addresses[host] = self.getaddrinfo(host, port)
+                except (socket.gaierror, UnicodeError):
+                    addresses[host] = None
+
+        threads = [Thread(target=lookup, daemon=True) for _ in range(min(workers, len(pending)))]
+        for thread in threads:
+            thread.start()
+        end = None if timeout is None else perf_counter() + timeout
+        for thread in threads:
+            thread.join(None if end is None else max(end - perf_counter(), 0))
+        return dict(addresses)
+
+    def reverse(
+            self, ips: Iterable[str], workers: int = 32, timeout: Optional[float] = None
+    ) -> dict[str, Optional[str]]:
+        r"""
+        Looks up the host names of the addresses concurrently (cached answers are returned at once),
+        the lookups that are not finished in `timeout` seconds are left running and are not returned
+
+        Parameters
+        ------------
+            ips: Iterable[str]
+                IP addresses
+            workers: int
+                The maximum number of simultaneous lookups
+            timeout: Optional[float]
+                The maximum time to wait for the lookups in seconds (None - no limit)
+
+        Returns
+        --------
+            IP address -> host name (None if the address has no name) (dict[str, Optional[str]])
+        """
+        pending = list(dict.fromkeys(ips))
+        names: dict[str, Optional[str]] = {}
+        lock = Lock()
+
+        def lookup() -> None:
+            while True:
+                with lock:
+                    if not pending:
+                        return
+                    ip = pending.pop()
+                try:
+                    names[ip] = self.gethostbyaddr(ip)
+                except (socket.herror, socket.gaierror, UnicodeError):
+                    names[ip] = None
+
+        threads = [Thread(target=lookup, daemon=True) for _ in range(min(workers, len(pending)))]
+        for thread in threads:
+            thread.start()
+        end = None if timeout is None else perf_counter() + timeout
+        for thread in threads:
+            thread.join(None if end is None else max(end - perf_counter(), 0))
+        return dict(names)
+
+    def put(self, key: tuple, value, ttl: Optional[float] = None) -> None:
+        r"""
+        Puts the entry into the cache (the least recently used entry is evicted)
+
+        Parameters
+        ------------
+            key: tuple
+                (host, family, type) or (ip, "PTR")
+            value: Union[list, str, socket.gaierror, socket.herror]
+                getaddrinfo or gethostbyaddr result, NXDOMAIN error
+            ttl: Optional[float]
+                Lifetime of the entry in seconds (clamped to [min_ttl, max_ttl] for positive answers)
+
+        Returns
+        --------
+            None
+        """
+        if ttl is None:
+            ttl = min(max(self.ttl, self.min_ttl), self.max_ttl)
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        r"""
+        Removes all entries from the cache
+
+        Returns
+        --------
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        r"""
+        Returns hit/miss counters
+
+        Returns
+        --------
+            Counters and the number of entries (dict[str, int])
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self._entries))
+
+    def get_adapter(self) -> "requests.adapters.HTTPAdapter":
+        r"""
+        Returns a requests adapter whose connections connect to the cached addresses of the host
+        (Host header and SNI stay the same, only the address of the socket changes),
+        the other sessions and urllib3 users of the process are not affected
+
+        Returns
+        --------
+            Adapter to mount on the http:// and https:// prefixes of a session (requests.adapters.HTTPAdapter)
+        """
+        from requests.adapters import HTTPAdapter
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+        from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+        cache = self
+
+        def new_conn(connection, base) -> socket.socket:
+            # urllib3 resolves _dns_host, it is replaced by every cached address in turn
+            host = connection._dns_host
+            try:
+                addresses = cache.getaddrinfo(host.strip("[]"), connection.port, 0, socket.SOCK_STREAM)
+            except (socket.gaierror, UnicodeError) as e:
+                raise NewConnectionError(connection, "Failed to establish a new connection: {0}".format(e)) from e
+
+            error = None
+            for *_, sockaddr in addresses:
+                connection._dns_host = sockaddr[0]
+                try:
+                    return base._new_conn(connection)
+                except ConnectTimeoutError as e:
+                    error = e
+                finally:
+                    connection._dns_host = host
+            raise error if error is not None else NewConnectionError(connection, "getaddrinfo returns an empty list")
+
+        class CachedHTTPConnection(HTTPConnection):
+            def _new_conn(self) -> socket.socket:
+                return new_conn(self, HTTPConnection)
+
+        class CachedHTTPSConnection(HTTPSConnection):
+            def _new_conn(self) -> socket.socket:
+                return new_conn(self, HTTPSConnection)
+
+        class CachedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = CachedHTTPConnection
+
+        class CachedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = CachedHTTPSConnection
+
+        class CachedHTTPAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs) -> None:
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    "http": CachedHTTPConnectionPool, "https": CachedHTTPSConnectionPool
+                }
+
+        return CachedHTTPAdapter()
+
+    def __repr__(self) -> str:
+        return "{0}(hits={1}, misses={2})".format(self.__class__.__name__, self.hits, self.misses)
@@ -0,0 +1,123 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+from typing import Optional
+
+__all__ = (
+    "CheckResult",
+)
+
+class CheckResult(object):
+    r"""
+    The result of the check of one address (and port) of a site,
+    the text and JSON representations are made only on demand
+
+    host: str
+        Checked site (host from the .csv file)
+    host_name: str
+        Host name for the output (the name of the address for IP addresses, "???" if it has no name, "localhost")
+    host_ip: str
+        Checked IP address
+    ping: float
+        RTT in ms (NO_REPLY if there is no response)
+    multy_ip: bool
+        Whether the site has more than one IP address
+    port: Optional[int]
+        Checked port (None - ports are not checked)
+    port_status: Optional[bool]
+        Whether the port is opened (None - ports are not checked)
+    ssl: Optional[bool]
+        Validity of the ssl certificate (None - not checked, only for port 443)
+    ssl_days: Optional[int]
+        Days to the expiry of the ssl certificate (None - not checked or not valid)
+
+    to_dict() -> dict
+        Returns the result as a dict (JSON types)
+    to_json() -> str
+        Returns the result as one line of JSON
+    """
+    __slots__ = (
+        "host", "host_name", "host_ip", "ping", "multy_ip", "port", "port_status", "ssl", "ssl_days"
+    )
+    NO_REPLY: float = 5000
+    def __init__(
+            self, host: str, host_name: str, host_ip: str, ping: float, multy_ip: bool,
+            port: Optional[int] = None, port_status: Optional[bool] = None, ssl: Optional[bool] = None,
+            ssl_days: Optional[int] = None
+    ) -> None:
+        self.host = host
+        self.host_name = host_name
+        self.host_ip = host_ip
+        self.ping = ping
+        self.multy_ip = multy_ip
+        self.port = port
+        self.port_status = port_status
+        self.ssl = ssl
+        self.ssl_days = ssl_days
+
+    def to_dict(self) -> dict:
+        r"""
+        Returns the result as a dict (JSON types)
+
+        Returns
+        --------
+            Result (dict)
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_json(self) -> str:
+        r"""
+        Returns the result as one line of JSON
+
+        Returns
+        --------
+            Result (str)
+        """
+        import json
+
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def __str__(self) -> str:
+        if self.port is None:
+            return "host: {0}\t|\tip: {1}\t|\tRTT: {2:.3f} ms\t|\tport: ???\t|\tmulty ip: {3}".format(
+                self.host_name, self.host_ip, self.ping, self.multy_ip
+            )
+        text = "host: {0}\t|\tip: {1}\t|\tRTT: {2:.3f} ms\t|\tport: {3}\t|\tstatus: {4}\t|\tmulty ip: {5}".format(
+            self.host_name, self.host_ip, self.ping, self.port,
+            "Opened" if self.port_status else "Not opened", self.multy_ip
+        )
+        if self.ssl is not None:
+            text += "\t|\tssl: {0}".format("valid cert" if self.ssl else "INVALID cert")
+            if self.ssl and self.ssl_days is not None:
+                text += " ({0} days)".format(self.ssl_days)
+        return text
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CheckResult):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    # the results are mutable and compared by value, so they are not hashable
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(
+            self.__class__.__name__, ", ".join("{0}={1!r}".format(name, getattr(self, name)) for name in self.__slots__)
+        )
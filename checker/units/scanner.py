@@ -0,0 +1,151 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import errno
+import heapq
+import socket
+import selectors
+
+from itertools import count
+from time import perf_counter
+from typing import Iterable, Optional
+
+__all__ = (
+    "PortScanner",
+)
+
+class PortScanner(object):
+    r"""
+    Port-scan stage built on non-blocking connect() and selectors:
+    all (ip, port) pairs of a pass are connected concurrently
+    (at most `max_in_flight` at a time), every socket is closed as soon as its status is known
+
+    timeout: float
+        Connect timeout in seconds (pairs without their own timeout)
+    max_in_flight: int
+        The maximum number of simultaneous connects (open sockets)
+
+    scan(pairs: Iterable[tuple[str, int]], timeouts: Optional[dict] = None) -> dict[tuple[str, int], tuple[str, Optional[float]]]
+        Connects to every unique pair and returns its status and connect latency
+    """
+    __slots__ = (
+        "timeout", "max_in_flight"
+    )
+    OPEN: str = "open"
+    CLOSED: str = "closed"
+    TIMEOUT: str = "timeout"
+
+    def __init__(self, timeout: float = 5, max_in_flight: int = 512) -> None:
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+
+    def scan(
+            self, pairs: Iterable[tuple[str, int]], timeouts: Optional[dict[tuple[str, int], float]] = None
+    ) -> dict[tuple[str, int], tuple[str, Optional[float]]]:
+        r"""
+        Connects to every unique pair and returns its status and connect latency
+
+        Parameters
+        ------------
+            pairs: Iterable[tuple[str, int]]
+                (IP address, port) pairs
+            timeouts: Optional[dict[tuple[str, int], float]]
+                (IP address, port) -> connect timeout in seconds (self.timeout for the missing pairs)
+
+        Returns
+        --------
+            (ip, port) -> (OPEN / CLOSED / TIMEOUT, connect latency in seconds or None)
+            (dict[tuple[str, int], tuple[str, Optional[float]]])
+        """
+        queue = iter(dict.fromkeys(pairs))
+        result = {}
+        in_flight = {}
+        timeouts = {} if timeouts is None else timeouts
+        deadlines = []
+        sequence = count()
+        selector = selectors.DefaultSelector()
+
+        try:
+            while True:
+                while len(in_flight) < self.max_in_flight:
+                    pair = next(queue, None)
+                    if pair is None:
+                        break
+                    sock = self.__connect(pair, result)
+                    if sock is not None:
+                        start = perf_counter()
+                        in_flight[sock] = (pair, start)
+                        heapq.heappush(deadlines, (start + timeouts.get(pair, self.timeout), next(sequence), sock))
+                        selector.register(sock, selectors.EVENT_WRITE)
+                if not in_flight:
+                    break
+
+                while deadlines and deadlines[0][2] not in in_flight:
+                    heapq.heappop(deadlines)
+                for key, _ in selector.select(max(0.0, deadlines[0][0] - perf_counter())):
+                    sock = key.fileobj
+                    pair, start = in_flight.pop(sock)
+                    error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if error == 0:
+                        result[pair] = (self.OPEN, perf_counter() - start)
+                    elif error == errno.ETIMEDOUT:
+                        result[pair] = (self.TIMEOUT, None)
+                    else:
+                        result[pair] = (self.CLOSED, perf_counter() - start)
+                    selector.unregister(sock)
+                    sock.close()
+
+                now = perf_counter()
+                while deadlines and deadlines[0][0] <= now:
+                    *_, sock = heapq.heappop(deadlines)
+                    if sock in in_flight:
+                        pair, _ = in_flight.pop(sock)
+                        result[pair] = (self.TIMEOUT, None)
+                        selector.unregister(sock)
+                        sock.close()
+        finally:
+            for sock in in_flight:
+                selector.unregister(sock)
+                sock.close()
+            selector.close()
+        return result
+
+    def __connect(self, pair: tuple[str, int], result: dict) -> Optional[socket.socket]:
+        ip, port = pair
+        try:
+            sock = socket.socket(socket.AF_INET6 if ":" in ip else socket.AF_INET, socket.SOCK_STREAM)
+        except OSError:
+            result[pair] = (self.CLOSED, None)
+            return None
+
+        sock.setblocking(False)
+        try:
+            error = sock.connect_ex((ip, port))
+        except (OSError, OverflowError):
+            error = errno.EINVAL
+        if error in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+            return sock
+
+        result[pair] = (self.OPEN if error == 0 else self.CLOSED, 0.0 if error == 0 else None)
+        sock.close()
+        return None
+
+    def __repr__(self) -> str:
+        return "{0}({1}, {2})".format(self.__class__.__name__, self.timeout, self.max_in_flight)
@@ -0,0 +1,175 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import threading
+
+from collections import deque
+from typing import Optional
+
+from checker import config
+
+__all__ = (
+    "TimeoutPolicy",
+)
+
+class TimeoutPolicy(object):
+    r"""
+    Process-wide timeouts per target and stage learned from the observed latency:
+    the timeout is `multiplier` x the p99 of the last `window` samples,
+    clamped to [minimum, maximum] (the default is used until `min_samples` are observed).
+    Timeouts are observed as samples as well, so a stalling target gets more time (up to maximum)
+
+    Targets are host names for the http and tls stages and IP addresses for tcp and icmp
+
+    default: float
+        Timeout of targets without history in seconds
+    minimum: float
+        The minimum timeout in seconds
+    maximum: float
+        The maximum timeout in seconds
+    multiplier: float
+        Multiplier of the p99 latency
+    window: int
+        The number of the last samples per target and stage
+    min_samples: int
+        The number of samples after which the timeout is learned
+
+    get_instance() -> TimeoutPolicy
+        Returns the policy of the process
+    observe(target: str, stage: str, seconds: float) -> None
+        Adds the latency of the stage of the target
+    get_timeout(target: str, stage: str, default: Optional[float] = None) -> float
+        Returns the timeout of the stage of the target
+    forget(target: str) -> None
+        Removes the history of the target
+    """
+    __slots__ = (
+        "default", "minimum", "maximum", "multiplier", "window", "min_samples", "_samples", "_timeouts"
+    )
+    _instance: Optional["TimeoutPolicy"] = None
+    _instance_lock: threading.Lock = threading.Lock()
+
+    def __init__(
+            self, default: float = 5, minimum: float = 0.5, maximum: float = 15,
+            multiplier: float = 3, window: int = 50, min_samples: int = 5
+    ) -> None:
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[tuple[str, str], deque] = {}
+        self._timeouts: dict[tuple[str, str], float] = {}
+
+    @classmethod
+    def get_instance(cls) -> "TimeoutPolicy":
+        r"""
+        Returns the policy of the process (created from the TIMEOUT_* settings)
+
+        Returns
+        --------
+            Timeout policy (TimeoutPolicy)
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        config.TIMEOUT_DEFAULT, config.TIMEOUT_MIN, config.TIMEOUT_MAX,
+                        config.TIMEOUT_MULTIPLIER, config.TIMEOUT_WINDOW, config.TIMEOUT_MIN_SAMPLES
+                    )
+        return cls._instance
+
+    def observe(self, target: str, stage: str, seconds: float) -> None:
+        r"""
+        Adds the latency of the stage of the target (or the timeout if it was reached)
+
+        Parameters
+        ------------
+            target: str
+                Host name or IP address
+            stage: str
+                "http", "tls", "tcp", "icmp" or "connectivity"
+            seconds: float
+                Latency in seconds
+
+        Returns
+        --------
+            None
+        """
+        key = (target, stage)
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples.setdefault(key, deque(maxlen=self.window))
+        samples.append(seconds)
+        self._timeouts.pop(key, None)
+
+    def get_timeout(self, target: str, stage: str, default: Optional[float] = None) -> float:
+        r"""
+        Returns the timeout of the stage of the target
+
+        Parameters
+        ------------
+            target: str
+                Host name or IP address
+            stage: str
+                "http", "tls", "tcp", "icmp" or "connectivity"
+            default: Optional[float]
+                Timeout without history (self.default by default)
+
+        Returns
+        --------
+            Timeout in seconds (float)
+        """
+        key = (target, stage)
+        timeout = self._timeouts.get(key)
+        if timeout is not None:
+            return timeout
+
+        samples = self._samples.get(key)
+        if samples is None or len(samples) < self.min_samples:
+            return self.default if default is None else default
+
+        ordered = sorted(samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        timeout = self._timeouts[key] = min(max(p99 * self.multiplier, self.minimum), self.maximum)
+        return timeout
+
+    def forget(self, target: str) -> None:
+        r"""
+        Removes the history of the target
+
+        Parameters
+        ------------
+            target: str
+                Host name or IP address
+
+        Returns
+        --------
+            None
+        """
+        for key in [key for key in self._samples if key[0] == target]:
+            self._samples.pop(key, None)
+            self._timeouts.pop(key, None)
+
+    def __repr__(self) -> str:
+        return "{0}({1}, [{2}, {3}], x{4})".format(
+            self.__class__.__name__, self.default, self.minimum, self.maximum, self.multiplier
+        )
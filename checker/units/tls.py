@@ -0,0 +1,328 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import ssl
+import socket
+import hashlib
+
+from time import time
+from threading import Lock
+from collections import OrderedDict
+from typing import Optional
+
+from checker import config
+from checker.units.metrics import Metrics
+
+__all__ = (
+    "CertificateInfo", "TLSInspector"
+)
+
+class CertificateInfo(object):
+    r"""
+    The certificate of one (ip, sni) pair learned from the TLS handshake
+
+    valid: bool
+        Whether the certificate was verified (chain and host name)
+    expires: Optional[float]
+        Expiry of the certificate (UNIX time, None if it is not known)
+    issuer: Optional[str]
+        Organization (or common name) of the issuer
+    sans: tuple[str]
+        DNS names of the subjectAltName extension
+    fingerprint: Optional[str]
+        SHA-256 of the certificate (hex)
+    error: Optional[str]
+        Reason of the failed verification or connection
+    resumed: bool
+        Whether the handshake resumed a previous TLS session
+    checked_at: float
+        Time of the handshake (UNIX time)
+    """
+    __slots__ = (
+        "valid", "expires", "issuer", "sans", "fingerprint", "error", "resumed", "checked_at"
+    )
+    def __init__(
+            self, valid: bool, expires: Optional[float] = None, issuer: Optional[str] = None,
+            sans: tuple = (), fingerprint: Optional[str] = None, error: Optional[str] = None,
+            resumed: bool = False
+    ) -> None:
+        self.valid = valid
+        self.expires = expires
+        self.issuer = issuer
+        self.sans = sans
+        self.fingerprint = fingerprint
+        self.error = error
+        self.resumed = resumed
+        self.checked_at = time()
+
+    @property
+    def days_left(self) -> Optional[int]:
+        r"""
+        Returns the number of whole days to the expiry of the certificate
+
+        Returns
+        --------
+            Days to the expiry, None if the expiry is not known (Optional[int])
+        """
+        if self.expires is None:
+            return None
+        return int((self.expires - time()) // 86400)
+
+    def __repr__(self) -> str:
+        return "{0}(valid={1}, days_left={2}, issuer={3!r}, error={4!r})".format(
+            self.__class__.__name__, self.valid, self.days_left, self.issuer, self.error
+        )
+
+
+class TLSInspector(object):
+    r"""
+    Process-wide TLS stage: completes the handshake (no request is sent) and extracts the expiry,
+    issuer and SANs of the certificate. Valid certificates are cached per (ip, sni) for `ttl` seconds
+    unless they expire in less than `refresh_days` days, the sessions are kept (LRU) and resumed
+    by the next handshakes of the pair, a changed fingerprint replaces the cached certificate
+
+    ttl: float
+        Lifetime of the cached valid certificates in seconds
+    refresh_days: float
+        Certificates expiring sooner are checked on every call
+    size: int
+        The maximum number of cached certificates and sessions
+    ticket_wait: float
+        The maximum wait for the session tickets after a full TLS 1.3 handshake in seconds
+    context: ssl.SSLContext
+        Context of the handshakes (the sessions can only be resumed with the same context)
+
+    get_instance() -> TLSInspector
+        Returns the inspector of the process
+    get(ip: str, sni: str) -> Optional[CertificateInfo]
+        Returns the cached certificate of the pair if it is still fresh
+    is_fresh(info: Optional[CertificateInfo]) -> bool
+        Checks whether the cached certificate can be used without a handshake
+    handshake(ip: str, sni: str, timeout: float, port: int = 443) -> CertificateInfo
+        Performs the TLS handshake and caches the certificate
+    inspect(ip: str, sni: str, timeout: float, port: int = 443) -> CertificateInfo
+        Returns the cached certificate or performs the handshake
+    get_issuer(cert: dict) -> Optional[str]
+        Returns the organization (or common name) of the issuer of the certificate
+    """
+    __slots__ = (
+        "ttl", "refresh_days", "size", "ticket_wait", "context", "_certificates", "_sessions", "_lock"
+    )
+    _instance: Optional["TLSInspector"] = None
+    _instance_lock: Lock = Lock()
+
+    def __init__(
+            self, ttl: float = config.CERT_CACHE_TTL, refresh_days: float = config.CERT_REFRESH_DAYS,
+            size: int = config.CERT_CACHE_SIZE, ticket_wait: float = config.CERT_TICKET_WAIT
+    ) -> None:
+        self.ttl = ttl
+        self.refresh_days = refresh_days
+        self.size = size
+        self.ticket_wait = ticket_wait
+        self.context = ssl.create_default_context()
+        self._certificates: OrderedDict[tuple[str, str], CertificateInfo] = OrderedDict()
+        self._sessions: OrderedDict[tuple[str, str], ssl.SSLSession] = OrderedDict()
+        self._lock = Lock()
+
+    @classmethod
+    def get_instance(cls) -> "TLSInspector":
+        r"""
+        Returns the inspector of the process (created from the CERT_* settings)
+
+        Returns
+        --------
+            Inspector (TLSInspector)
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        config.CERT_CACHE_TTL, config.CERT_REFRESH_DAYS, config.CERT_CACHE_SIZE, config.CERT_TICKET_WAIT
+                    )
+        return cls._instance
+
+    def get(self, ip: str, sni: str) -> Optional[CertificateInfo]:
+        r"""
+        Returns the cached certificate of the pair if it is still fresh
+        (valid, checked less than ttl seconds ago and not close to the expiry)
+
+        Parameters
+        ------------
+            ip: str
+                Address of the server
+            sni: str
+                Host name of the server
+
+        Returns
+        --------
+            Certificate or None if the handshake is needed (Optional[CertificateInfo])
+        """
+        info = self._certificates.get((ip, sni))
+        if not self.is_fresh(info):
+            return None
+        Metrics.get_instance().handshake("cached")
+        return info
+
+    def is_fresh(self, info: Optional[CertificateInfo]) -> bool:
+        r"""
+        Checks whether the cached certificate can be used without a handshake
+        (valid, checked less than ttl seconds ago and not close to the expiry)
+
+        Parameters
+        ------------
+            info: Optional[CertificateInfo]
+                Cached certificate
+
+        Returns
+        --------
+            Freshness status (bool)
+        """
+        if info is None or not info.valid:
+            return False
+        now = time()
+        if now - info.checked_at >= self.ttl:
+            return False
+        return info.expires is None or info.expires - now >= self.refresh_days * 86400
+
+    @staticmethod
+    def get_issuer(cert: dict) -> Optional[str]:
+        r"""
+        Returns the organization (or common name) of the issuer of the certificate
+
+        Parameters
+        ------------
+            cert: dict
+                Certificate (SSLSocket.getpeercert())
+
+        Returns
+        --------
+            Issuer (Optional[str])
+        """
+        fields = dict(field for rdn in cert.get("issuer", ()) for field in rdn)
+        return fields.get("organizationName") or fields.get("commonName")
+
+    def handshake(self, ip: str, sni: str, timeout: float, port: int = 443) -> CertificateInfo:
+        r"""
+        Performs the TLS handshake with the pair and caches the certificate (invalid and expired certificates
+        and failed connections are not cached). The previous session of the pair is resumed only while its
+        cached certificate is fresh: a resumed session is not verified again and returns the certificate
+        stored in it, so stale certificates and certificates close to the expiry get a full handshake
+
+        Parameters
+        ------------
+            ip: str
+                Address of the server
+            sni: str
+                Host name of the server
+            timeout: float
+                Connect and handshake timeout in seconds
+            port: int
+                Port of the server
+
+        Returns
+        --------
+            Certificate (CertificateInfo)
+        """
+        key = (ip, sni)
+        session = self._sessions.get(key) if self.is_fresh(self._certificates.get(key)) else None
+        try:
+            with socket.create_connection((ip, port), timeout=timeout) as sock:
+                with self.context.wrap_socket(sock, server_hostname=sni, session=session) as tls:
+                    cert = tls.getpeercert()
+                    fingerprint = hashlib.sha256(tls.getpeercert(binary_form=True)).hexdigest()
+                    resumed = tls.session_reused
+                    if not resumed and tls.version() == "TLSv1.3" and self.ticket_wait > 0:
+                        # TLS 1.3 tickets arrive after the handshake (TLS 1.2 sessions are ready without a read)
+                        tls.settimeout(min(self.ticket_wait, timeout))
+                        try:
+                            tls.recv(1)
+                        except (OSError, ssl.SSLError):
+                            pass
+                    session = tls.session
+        except ssl.SSLCertVerificationError as e:
+            Metrics.get_instance().handshake("full")
+            self.__forget(key)
+            return CertificateInfo(False, error=e.verify_message or str(e))
+        except (OSError, ssl.SSLError) as e:
+            self.__forget(key)
+            return CertificateInfo(False, error="{0} ({1})".format(e, e.__class__.__name__))
+
+        Metrics.get_instance().handshake("resumed" if resumed else "full")
+        expires = ssl.cert_time_to_seconds(cert["notAfter"]) if "notAfter" in cert else None
+        info = CertificateInfo(
+            True, expires=expires,
+            issuer=self.get_issuer(cert), sans=tuple(value for kind, value in cert.get("subjectAltName", ()) if kind == "DNS"),
+            fingerprint=fingerprint, resumed=resumed
+        )
+        if expires is not None and expires <= time():
+            info.valid, info.error = False, "certificate has expired"
+            self.__forget(key)
+            return info
+        with self._lock:
+            previous = self._certificates.get(key)
+            if previous is not None and previous.fingerprint != fingerprint:
+                # the certificate was replaced, the session of the old one is not resumed
+                session = None
+            self.__put(self._certificates, key, info)
+            if session is not None:
+                self.__put(self._sessions, key, session)
+            else:
+                self._sessions.pop(key, None)
+        return info
+
+    def inspect(self, ip: str, sni: str, timeout: float, port: int = 443) -> CertificateInfo:
+        r"""
+        Returns the cached certificate of the pair or performs the handshake
+
+        Parameters
+        ------------
+            ip: str
+                Address of the server
+            sni: str
+                Host name of the server
+            timeout: float
+                Connect and handshake timeout in seconds
+            port: int
+                Port of the server
+
+        Returns
+        --------
+            Certificate (CertificateInfo)
+        """
+        info = self.get(ip, sni)
+        if info is not None:
+            return info
+        return self.handshake(ip, sni, timeout, port)
+
+    def __put(self, entries: OrderedDict, key: tuple, value) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def __forget(self, key: tuple) -> None:
+        with self._lock:
+            self._certificates.pop(key, None)
+            self._sessions.pop(key, None)
+
+    def __repr__(self) -> str:
+        return "{0}(certificates={1}, sessions={2})".format(
+            self.__class__.__name__, len(self._certificates), len(self._sessions)
+        )
@@ -0,0 +1,357 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+import inspect
+import threading
+
+from functools import wraps
+from time import monotonic, perf_counter_ns
+from typing import Any, Callable, Optional, TextIO
+
+__all__ = (
+    "Tracer", "TraceSink", "MemoryTraceSink", "ChromeTraceSink"
+)
+
+class TraceSink(object):
+    r"""
+    Receiver of the spans (the base sink drops them)
+
+    emit(name: str, start: int, duration: int, tid: int, args: dict) -> None
+        Receives one span (times in microseconds)
+    close() -> None
+        Flushes the spans
+    """
+    __slots__ = ()
+
+    def emit(self, name: str, start: int, duration: int, tid: int, args: dict) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __repr__(self) -> str:
+        return "{0}()".format(self.__class__.__name__)
+
+
+class MemoryTraceSink(TraceSink):
+    r"""
+    Sink that keeps the spans in memory (one profiled pass)
+
+    events: list[dict]
+        Received spans (complete "X" events)
+    """
+    __slots__ = (
+        "events", "pid"
+    )
+    def __init__(self) -> None:
+        self.events: list[dict] = []
+        self.pid = os.getpid()
+
+    def emit(self, name: str, start: int, duration: int, tid: int, args: dict) -> None:
+        self.events.append(dict(name=name, ph="X", ts=start, dur=duration, pid=self.pid, tid=tid, args=args))
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, len(self.events))
+
+
+class ChromeTraceSink(TraceSink):
+    r"""
+    Sink that streams the spans to a Chrome trace-event JSON file (array format,
+    chrome://tracing, https://ui.perfetto.dev), the spans are buffered and appended in batches,
+    a file that was not closed (killed process) is still loaded without the closing bracket
+
+    path: str
+        Path of the trace file
+    batch: int
+        The number of buffered spans that triggers a write (the maximum size of the buffer)
+    flush_interval: float
+        The maximum time between writes in seconds
+    max_events: int
+        The number of spans after which the file is rotated to path + ".1" (0 - the file is not rotated)
+
+    write(event: dict) -> None
+        Buffers one event
+    flush() -> None
+        Appends the buffered spans to the file
+    rotate() -> None
+        Closes the file and moves it to path + ".1"
+    close() -> None
+        Flushes and closes the file
+    """
+    __slots__ = (
+        "path", "batch", "flush_interval", "max_events", "pid",
+        "_events", "_file", "_written", "_flushed_at", "_lock"
+    )
+    def __init__(
+            self, path: str = "trace.json", batch: int = 1000, flush_interval: float = 5, max_events: int = 1000000
+    ) -> None:
+        self.path = path
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.pid = os.getpid()
+        self._events: list[str] = []
+        self._file: Optional[TextIO] = None
+        self._written = 0
+        self._flushed_at = monotonic()
+        self._lock = threading.Lock()
+
+    def emit(self, name: str, start: int, duration: int, tid: int, args: dict) -> None:
+        self.write(dict(name=name, ph="X", ts=start, dur=duration, pid=self.pid, tid=tid, args=args))
+
+    def write(self, event: dict) -> None:
+        r"""
+        Buffers one event (the buffer is written when it is full or flush_interval passed)
+
+        Parameters
+        ------------
+            event: dict
+                Trace event
+
+        Returns
+        --------
+            None
+        """
+        import json
+
+        line = json.dumps(event, separators=(",", ":"))
+        with self._lock:
+            self._events.append(line)
+            full = len(self._events) >= self.batch
+        if full or monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        r"""
+        Appends the buffered spans to the file (the file is rotated every max_events spans)
+
+        Returns
+        --------
+            None
+        """
+        with self._lock:
+            events, self._events = self._events, []
+            self._flushed_at = monotonic()
+            while events:
+                if self._file is None:
+                    self._file = open(self.path, "w", encoding="utf-8")
+                    self._file.write("[\n")
+                    self._written = 0
+                count = len(events) if self.max_events <= 0 else min(len(events), self.max_events - self._written)
+                self._file.write(("" if self._written == 0 else ",\n") + ",\n".join(events[:count]))
+                self._file.flush()
+                self._written += count
+                events = events[count:]
+                if 0 < self.max_events <= self._written:
+                    self.__rotate()
+
+    def rotate(self) -> None:
+        r"""
+        Flushes the spans, closes the file and moves it to path + ".1" (the next spans start a new file)
+
+        Returns
+        --------
+            None
+        """
+        self.flush()
+        with self._lock:
+            self.__rotate()
+
+    def close(self) -> None:
+        r"""
+        Flushes and closes the file (an empty trace is written if there were no spans)
+
+        Returns
+        --------
+            None
+        """
+        self.flush()
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+                self._file.write("[")
+            self._file.write("\n]\n")
+            self._file.close()
+            self._file = None
+
+    def __rotate(self) -> None:
+        if self._file is None:
+            return
+        self._file.write("\n]\n")
+        self._file.close()
+        self._file = None
+        os.replace(self.path, self.path + ".1")
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, self.path)
+
+
+class Tracer(object):
+    r"""
+    Process-wide tracer that records a span for every call of the traced stages
+
+    Spans are recorded only while a sink is set,
+    otherwise a traced call costs one attribute check
+
+    sink: Optional[TraceSink]
+        Receiver of the spans (None - tracing is disabled)
+
+    get_instance() -> Tracer
+        Returns the tracer of the process
+    enable(sink: TraceSink) -> None
+        Starts sending spans to the sink
+    disable() -> Optional[TraceSink]
+        Stops tracing and returns the closed sink
+    get_args(args: tuple) -> dict
+        Returns the arguments of the span (target of the controller and the first argument)
+    span(name: str) -> Callable
+        Decorator that records a span for every call of the function (or coroutine function)
+    """
+    __slots__ = (
+        "sink",
+    )
+    _instance: Optional["Tracer"] = None
+    _instance_lock: threading.Lock = threading.Lock()
+
+    def __init__(self, sink: Optional[TraceSink] = None) -> None:
+        self.sink = sink
+
+    @classmethod
+    def get_instance(cls) -> "Tracer":
+        r"""
+        Returns the tracer of the process (creates it if necessary)
+
+        Returns
+        --------
+            Tracer (Tracer)
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def enable(self, sink: TraceSink) -> None:
+        r"""
+        Starts sending spans to the sink
+
+        Parameters
+        ------------
+            sink: TraceSink
+                Receiver of the spans
+
+        Returns
+        --------
+            None
+        """
+        self.sink = sink
+
+    def disable(self) -> Optional[TraceSink]:
+        r"""
+        Stops tracing and closes the sink
+
+        Returns
+        --------
+            Closed sink or None if tracing was disabled (Optional[TraceSink])
+        """
+        sink, self.sink = self.sink, None
+        if sink is not None:
+            sink.close()
+        return sink
+
+    @staticmethod
+    def get_args(args: tuple) -> dict:
+        r"""
+        Returns the arguments of the span: the host of the controller ("target")
+        and the first argument of the call ("arg", the host of a site)
+
+        Parameters
+        ------------
+            args: tuple
+                Positional arguments of the call
+
+        Returns
+        --------
+            Arguments of the span (dict)
+        """
+        if not args:
+            return {}
+        arg = args[1] if len(args) > 1 else args[0]
+        result = {"arg": str(getattr(arg, "host", arg))}
+        target = getattr(args[0], "target", None)
+        if target is not None:
+            result["target"] = str(target.host)
+        return result
+
+    def span(self, name: str) -> Callable:
+        r"""
+        Decorator that records a span for every call of the function (or coroutine function),
+        spans of coroutines are grouped by task
+
+        Parameters
+        ------------
+            name: str
+                Name of the span
+
+        Returns
+        --------
+            Decorator (Callable)
+        """
+        def decorator(func: Callable) -> Callable:
+            if inspect.iscoroutinefunction(func):
+                import asyncio
+
+                @wraps(func)
+                async def wrapper(*args, **kwargs) -> Any:
+                    if self.sink is None:
+                        return await func(*args, **kwargs)
+                    start = perf_counter_ns()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        end = perf_counter_ns()
+                        sink = self.sink
+                        if sink is not None:
+                            sink.emit(
+                                name, start // 1000, (end - start) // 1000,
+                                id(asyncio.current_task()), self.get_args(args)
+                            )
+            else:
+                @wraps(func)
+                def wrapper(*args, **kwargs) -> Any:
+                    if self.sink is None:
+                        return func(*args, **kwargs)
+                    start = perf_counter_ns()
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        end = perf_counter_ns()
+                        sink = self.sink
+                        if sink is not None:
+                            sink.emit(
+                                name, start // 1000, (end - start) // 1000,
+                                threading.get_ident(), self.get_args(args)
+                            )
+            return wrapper
+        return decorator
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, repr(self.sink))
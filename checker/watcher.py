@@ -0,0 +1,134 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import os
+
+from typing import Optional
+
+from checker.units.exceptions import SSCException, FileInvalidFormat
+from checker.units.reader import CSVReader, ReadObject
+
+__all__ = (
+    "CSVWatcher",
+)
+
+class CSVWatcher(object):
+    r"""
+    Watches the .csv file of the reader (modification time and size) and
+    diffs the new set of sites against the loaded one: unchanged rows keep
+    their ReadObject (so the schedule, caches and history of the site are kept)
+    and are not validated again, only added and removed sites are returned
+
+    reader: CSVReader
+        Reader of the watched file
+    targets: dict[tuple, list[ReadObject]]
+        Loaded sites by their row
+    errors: list[SSCException]
+        Errors of the last reload
+
+    get_signature() -> Optional[tuple[int, int]]
+        Returns the modification time and size of the file
+    load() -> list[ReadObject]
+        Loads all sites of the file
+    poll() -> tuple[list[ReadObject], list[ReadObject]]
+        Reloads the file if it was changed
+    """
+    __slots__ = (
+        "reader", "targets", "errors", "_signature"
+    )
+    def __init__(self, reader: CSVReader) -> None:
+        self.reader = reader
+        self.targets: dict[tuple, list[ReadObject]] = {}
+        self.errors: list[SSCException] = []
+        self._signature = None
+
+    def get_signature(self) -> Optional[tuple[int, int]]:
+        r"""
+        Returns the modification time and size of the file
+
+        Returns
+        --------
+            (mtime in ns, size) or None if the file does not exist (Optional[tuple[int, int]])
+        """
+        try:
+            stat = os.stat(self.reader.filename)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self) -> list[ReadObject]:
+        r"""
+        Loads all sites of the file
+
+        Returns
+        --------
+            Sites of the file (list[ReadObject])
+        """
+        self._signature = self.get_signature()
+        self.targets = {}
+        for row in self.reader.read_rows():
+            target = self.reader.parse_row(row)
+            if target is not None:
+                self.targets.setdefault(tuple(row), []).append(target)
+        return [target for targets in self.targets.values() for target in targets]
+
+    def poll(self) -> tuple[list[ReadObject], list[ReadObject]]:
+        r"""
+        Reloads the file if it was changed: rows that were loaded before reuse their
+        ReadObject without validation, new rows are validated
+        (their errors are stored in errors, the sites of the invalid file are kept)
+
+        Returns
+        --------
+            Added and removed sites (tuple[list[ReadObject], list[ReadObject]])
+        """
+        self.errors = []
+        signature = self.get_signature()
+        if signature is None or signature == self._signature:
+            return [], []
+
+        self._signature = signature
+        self.reader.input_error_status = False
+
+        old = {key: list(targets) for key, targets in self.targets.items()}
+        targets, added = {}, []
+        for row in self.reader.read_rows():
+            key = tuple(row)
+            if old.get(key):
+                target = old[key].pop()
+            else:
+                target = self.reader.parse_row(row)
+                if target is None:
+                    self.errors.append(self.reader.input_error_status)
+                    continue
+                if target.host is None:
+                    self.errors.append(self.reader.input_error_status)
+                added.append(target)
+            targets.setdefault(key, []).append(target)
+
+        if isinstance(self.reader.input_error_status, FileInvalidFormat):
+            self.errors.append(self.reader.input_error_status)
+            return [], []
+
+        self.targets = targets
+        return added, [target for targets in old.values() for target in targets]
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, repr(self.reader))
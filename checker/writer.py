@@ -0,0 +1,148 @@
+# -*- coding:utf-8 -*-
+"""
+The MIT License (MIT)
+Copyright (c) 2023-present Dmitry Filinov (D1ffic00lt)
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+import sys
+import json
+
+from threading import Lock
+from time import monotonic
+from typing import Any, Optional, TextIO
+
+from checker.units.exceptions import SSCException
+from checker.units.result import CheckResult
+
+__all__ = (
+    "NDJSONWriter",
+)
+
+class NDJSONWriter(object):
+    r"""
+    Streams the results of the worker as newline-delimited JSON (one object per line)
+    to a file or stdout, lines are buffered and written in batches
+
+    Results are written as CheckResult.to_dict(), errors as {"error": class, "message": text},
+    other values (timings of the pass) as {"info": text}
+
+    path: str
+        Path of the file ("-" - stdout), the file is appended to
+    batch: int
+        The number of buffered lines that triggers a write
+    flush_interval: float
+        The maximum time between writes in seconds
+
+    get_lines(value: Any) -> list[str]
+        Returns the JSON lines of the value
+    write(value: Any) -> None
+        Buffers the value (CheckResult, list of CheckResult, error or text)
+    flush() -> None
+        Writes the buffered lines
+    close() -> None
+        Flushes and closes the file
+    """
+    __slots__ = (
+        "path", "batch", "flush_interval", "_file", "_lines", "_flushed_at", "_lock"
+    )
+    def __init__(self, path: str = "-", batch: int = 1000, flush_interval: float = 1) -> None:
+        self.path = path
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self._file: Optional[TextIO] = None
+        self._lines: list[str] = []
+        self._flushed_at = monotonic()
+        self._lock = Lock()
+
+    @staticmethod
+    def get_lines(value: Any) -> list[str]:
+        r"""
+        Returns the JSON lines of the value
+
+        Parameters
+        ------------
+            value: Any
+                CheckResult, list of CheckResult, error or text
+
+        Returns
+        --------
+            JSON lines without line breaks (list[str])
+        """
+        if isinstance(value, list):
+            return [line for output in value if output is not None for line in NDJSONWriter.get_lines(output)]
+        if isinstance(value, CheckResult):
+            return [value.to_json()]
+        if isinstance(value, SSCException):
+            return [json.dumps({"error": value.__class__.__name__, "message": str(value)}, separators=(",", ":"))]
+        return [json.dumps({"info": str(value)}, separators=(",", ":"))]
+
+    def write(self, value: Any) -> None:
+        r"""
+        Buffers the value (the buffer is written when it is full or flush_interval passed)
+
+        Parameters
+        ------------
+            value: Any
+                CheckResult, list of CheckResult, error or text
+
+        Returns
+        --------
+            None
+        """
+        if value is None:
+            return
+        lines = self.get_lines(value)
+        with self._lock:
+            self._lines.extend(lines)
+            full = len(self._lines) >= self.batch
+        if full or monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        r"""
+        Writes the buffered lines (one write call)
+
+        Returns
+        --------
+            None
+        """
+        with self._lock:
+            lines, self._lines = self._lines, []
+            self._flushed_at = monotonic()
+            if not lines:
+                return
+            if self._file is None:
+                self._file = sys.stdout if self.path == "-" else open(self.path, "a", encoding="utf-8")
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        r"""
+        Flushes and closes the file (stdout stays open)
+
+        Returns
+        --------
+            None
+        """
+        self.flush()
+        with self._lock:
+            if self._file is not None and self._file is not sys.stdout:
+                self._file.close()
+            self._file = None
+
+    def __repr__(self) -> str:
+        return "{0}({1})".format(self.__class__.__name__, self.path)
@@ -0,0 +1,89 @@
+# -*- coding:utf-8 -*-
+"""
+SingleFlight: concurrent probes of one key are made once per pass
+"""
+import asyncio
+import threading
+
+from time import sleep
+
+import pytest
+
+from checker.units.flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_probe():
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def probe(value):
+        calls.append(value)
+        sleep(0.1)
+        return value * 2
+
+    def check():
+        barrier.wait()
+        results.append(flight.do(("http", "127.0.0.1", 80, "a.test"), probe, 21))
+
+    threads = [threading.Thread(target=check) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [21]
+    assert results == [42] * 8
+    assert flight.made == {"http": 1}
+    assert flight.saved == {"http": 7}
+
+
+def test_later_calls_get_the_result():
+    flight = SingleFlight()
+    calls = []
+    key = ("tcp", "127.0.0.1", 443, None)
+
+    assert flight.do(key, lambda: calls.append(1) or "open") == "open"
+    assert flight.do(key, lambda: calls.append(1) or "closed") == "open"
+    assert len(calls) == 1
+    assert flight.saved == {"tcp": 1}
+
+
+def test_keys_are_separate():
+    flight = SingleFlight()
+    assert flight.do(("tls", "127.0.0.1", 443, "a.test"), lambda: "a") == "a"
+    assert flight.do(("tls", "127.0.0.1", 443, "b.test"), lambda: "b") == "b"
+    assert flight.made == {"tls": 2}
+    assert "2 made, 0 saved" in flight.get_description()
+
+
+def test_failed_probe_is_not_shared():
+    flight = SingleFlight()
+    key = ("rdns", "127.0.0.1", None, None)
+
+    def fail():
+        raise OSError("no answer")
+
+    with pytest.raises(OSError):
+        flight.do(key, fail)
+    assert flight.do(key, lambda: "localhost") == "localhost"
+    assert flight.made == {"rdns": 1}
+
+
+def test_do_async():
+    flight = SingleFlight()
+    calls = []
+
+    async def probe():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 200
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async(("https", "127.0.0.1", 443, "a.test"), probe) for _ in range(5)))
+
+    assert asyncio.run(run()) == [200] * 5
+    assert len(calls) == 1
+    assert flight.made == {"https": 1}
+    assert flight.saved == {"https": 4}
@@ -0,0 +1,30 @@
+# -*- coding:utf-8 -*-
+"""
+Metrics: the shards of finished threads are retired without losing their counts
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from checker.units.metrics import Metrics
+
+
+def test_shards_stay_bounded_over_passes():
+    metrics = Metrics()
+    for _ in range(20):
+        # every pass uses a new pool, like SiteStatusChecker.iter_checks and Scheduler.check
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: metrics.observe("tcp", 0.001), range(32)))
+        assert metrics.get_shards() <= 8
+
+    text = metrics.render().decode()
+    assert 'ssc_stage_duration_seconds_count{stage="tcp"} 640' in text
+
+
+def test_retired_counts_are_kept():
+    metrics = Metrics()
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda host: metrics.record(host, ValueError()), ["a.test", "a.test", "b.test"]))
+    metrics.record("a.test", ValueError())
+
+    text = metrics.render().decode()
+    assert 'ssc_checks_total{host="a.test",outcome="ValueError"} 3' in text
+    assert 'ssc_checks_total{host="b.test",outcome="ValueError"} 1' in text
@@ -0,0 +1,103 @@
+# -*- coding:utf-8 -*-
+"""
+BatchPinger with a fake raw ICMP socket: late, duplicate and foreign replies, and the ping3 fallback
+"""
+import socket
+import struct
+
+from collections import deque
+from threading import Lock, Timer
+
+from checker.units.context import PassContext
+from checker.units.controller import Controller
+from checker.units.pinger import BatchPinger
+from checker.units.reader import ReadObject
+
+
+class FakeSocket(object):
+    r"""
+    Raw ICMP socket that answers the echo requests as told by `replies`:
+    ip -> list of (delay in seconds, identifier offset), select() works through a socket pair
+    """
+    type = socket.SOCK_RAW
+
+    def __init__(self, replies: dict) -> None:
+        self.replies = replies
+        self.reader, self.writer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.addresses = deque()
+        self.timers = []
+        self.lock = Lock()
+
+    def fileno(self) -> int:
+        return self.reader.fileno()
+
+    def sendto(self, packet: bytes, address: tuple) -> None:
+        ip = address[0]
+        _, _, _, identifier, sequence = struct.unpack("!BBHHH", packet[:8])
+        for delay, offset in self.replies.get(ip, ()):
+            # IPv4 header (20 bytes) + echo reply
+            reply = b"\x45" + b"\x00" * 19 + struct.pack(
+                "!BBHHH", BatchPinger.ECHO_REPLY, 0, 0, (identifier + offset) & 0xFFFF, sequence
+            ) + packet[8:]
+            timer = Timer(delay, self.reply, (reply, ip))
+            timer.start()
+            self.timers.append(timer)
+
+    def reply(self, data: bytes, ip: str) -> None:
+        with self.lock:
+            self.addresses.append(ip)
+            self.writer.send(data)
+
+    def recvfrom(self, size: int) -> tuple:
+        data = self.reader.recv(size)
+        return data, (self.addresses.popleft(), 0)
+
+    def __enter__(self) -> "FakeSocket":
+        return self
+
+    def __exit__(self, *args) -> None:
+        for timer in self.timers:
+            timer.join()
+        self.reader.close()
+        self.writer.close()
+
+
+def ping(monkeypatch, replies: dict, timeout: float = 0.3) -> dict:
+    monkeypatch.setattr(BatchPinger, "open_socket", staticmethod(lambda: FakeSocket(replies)))
+    return BatchPinger(timeout=timeout).ping(replies)
+
+
+def test_late_reply_is_ignored(monkeypatch):
+    result = ping(monkeypatch, {"10.0.0.1": [(0.01, 0)], "10.0.0.2": [(0.6, 0)]})
+    assert result["10.0.0.1"] is not None
+    assert result["10.0.0.2"] is None
+
+
+def test_own_deadline_of_the_address(monkeypatch):
+    monkeypatch.setattr(BatchPinger, "open_socket", staticmethod(lambda: FakeSocket({"10.0.0.1": [(0.15, 0)]})))
+    assert BatchPinger(timeout=1).ping(["10.0.0.1"], {"10.0.0.1": 0.05}) == {"10.0.0.1": None}
+
+
+def test_duplicate_reply_is_counted_once(monkeypatch):
+    result = ping(monkeypatch, {"10.0.0.1": [(0.01, 0), (0.2, 0)], "10.0.0.2": [(0.05, 0)]})
+    # the RTT of the first reply is kept
+    assert result["10.0.0.1"] < 150
+    assert result["10.0.0.2"] is not None
+
+
+def test_reply_of_another_process_is_ignored(monkeypatch):
+    result = ping(monkeypatch, {"10.0.0.1": [(0.01, 1)], "10.0.0.2": [(0.01, 0)]})
+    assert result["10.0.0.1"] is None
+    assert result["10.0.0.2"] is not None
+
+
+def test_controller_falls_back_to_ping3(monkeypatch):
+    monkeypatch.setattr(BatchPinger, "open_socket", staticmethod(lambda: None))
+    assert BatchPinger(timeout=0.1).ping(["127.0.0.1"]) == {}
+
+    calls = []
+    monkeypatch.setattr("ping3.ping", lambda ip, timeout, unit: calls.append(ip) or 1.5)
+    controller = Controller(ReadObject("127.0.0.1", "80"), PassContext())
+    assert controller.get_ping("127.0.0.1") == 1.5
+    assert controller.get_ping("127.0.0.1") == 1.5
+    assert calls == ["127.0.0.1"]
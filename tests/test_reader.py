@@ -0,0 +1,66 @@
+# -*- coding:utf-8 -*-
+"""
+CSVReader: rows are compiled into immutable ReadObject once and reused by the next passes
+"""
+import pytest
+
+from checker.units.reader import CSVReader, ReadObject
+
+
+def write(path, *rows: str) -> str:
+    path.write_text("\n".join(("Host;Ports",) + rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_plans_are_reused(tmp_path):
+    reader = CSVReader(write(tmp_path / "sites.csv", "a.test;80", "b.test;80,443", "127.0.0.1;"))
+    first, second = reader.units, reader.units
+
+    assert [unit.host for unit in first] == ["a.test", "b.test", "127.0.0.1"]
+    assert all(old is new for old, new in zip(first, second))
+
+
+def test_changed_rows_are_compiled_again(tmp_path):
+    filename = write(tmp_path / "sites.csv", "a.test;80", "b.test;80")
+    reader = CSVReader(filename)
+    first = reader.units
+
+    write(tmp_path / "sites.csv", "a.test;80", "b.test;443", "c.test;80")
+    second = reader.units
+
+    assert second[0] is first[0]
+    assert second[1] is not first[1] and second[1].ports == (443,)
+    assert second[2].host == "c.test"
+    assert set(reader.plans) == {("a.test", "80"), ("b.test", "443"), ("c.test", "80")}
+
+
+def test_invalid_rows_are_not_cached(tmp_path):
+    reader = CSVReader(write(tmp_path / "sites.csv", "a.test;http", "b.test;80"))
+    assert [unit.host for unit in reader.units] == ["b.test"]
+    assert ("a.test", "http") not in reader.plans
+    assert reader.input_error_status
+
+
+def test_errors_are_reset_by_the_next_pass(tmp_path):
+    filename = write(tmp_path / "sites.csv", "a.test;http", "b.test;80")
+    reader = CSVReader(filename)
+    reader.units
+    assert reader.input_error_status
+
+    write(tmp_path / "sites.csv", "b.test;80")
+    assert [unit.host for unit in reader.units] == ["b.test"]
+    assert reader.input_error_status is False
+
+
+def test_read_object():
+    unit = ReadObject("HTTPS://Example.test:8443/path", "443,80")
+    assert unit.hostname == "example.test"
+    assert unit.ports == (443, 80)
+    assert unit.address is None
+    assert unit.key == "example.test|443,80"
+    assert ReadObject("127.0.0.1", None).is_localhost
+
+    with pytest.raises(AttributeError):
+        unit.host = "other.test"
+    with pytest.raises(AttributeError):
+        del unit.ports
@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+"""
+HashRing: stable assignment of the sites and minimal movement when shards are added or removed
+"""
+import pytest
+
+from checker.shard import HashRing
+
+KEYS = ["site-{0}.test|80,443".format(index) for index in range(2000)]
+
+
+def get_assignment(ring: HashRing) -> dict[str, str]:
+    return {key: ring.get_node(key) for key in KEYS}
+
+
+def test_assignment_is_stable():
+    first = get_assignment(HashRing(["a", "b", "c"]))
+    assert get_assignment(HashRing(["a", "b", "c"])) == first
+    assert get_assignment(HashRing(["c", "a", "b"])) == first
+
+
+def test_every_shard_gets_a_share():
+    counts = {}
+    for node in get_assignment(HashRing(["a", "b", "c", "d"])).values():
+        counts[node] = counts.get(node, 0) + 1
+    assert set(counts) == {"a", "b", "c", "d"}
+    assert min(counts.values()) > len(KEYS) / 4 / 2
+
+
+def test_remove_moves_only_the_sites_of_the_shard():
+    ring = HashRing(["a", "b", "c"])
+    before = get_assignment(ring)
+    ring.remove("b")
+    after = get_assignment(ring)
+
+    assert "b" not in after.values()
+    assert all(after[key] == node for key, node in before.items() if node != "b")
+
+
+def test_add_moves_sites_only_to_the_new_shard():
+    ring = HashRing(["a", "b"])
+    before = get_assignment(ring)
+    ring.add("c")
+    after = get_assignment(ring)
+
+    moved = [key for key in KEYS if after[key] != before[key]]
+    assert moved
+    assert all(after[key] == "c" for key in moved)
+
+
+def test_empty_ring():
+    ring = HashRing(["a"])
+    ring.remove("a")
+    assert len(ring) == 0
+    with pytest.raises(LookupError):
+        ring.get_node(KEYS[0])
@@ -0,0 +1,72 @@
+# -*- coding:utf-8 -*-
+"""
+PortScanner against sockets on 127.0.0.1: open, closed and timed-out connects
+"""
+import sys
+import socket
+
+import pytest
+
+from checker.units.scanner import PortScanner
+
+
+@pytest.fixture
+def listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    yield sock
+    sock.close()
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_open(listener):
+    pair = ("127.0.0.1", listener.getsockname()[1])
+    status, latency = PortScanner(timeout=2).scan([pair])[pair]
+    assert status == PortScanner.OPEN
+    assert latency is not None and latency >= 0
+
+
+def test_closed():
+    pair = ("127.0.0.1", get_free_port())
+    assert PortScanner(timeout=2).scan([pair])[pair][0] == PortScanner.CLOSED
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="relies on Linux dropping SYNs to a full accept queue")
+def test_timeout():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(0)
+    pair = ("127.0.0.1", server.getsockname()[1])
+    # the connections are never accepted, so the queue is full and the next SYN is dropped
+    clients = []
+    for _ in range(4):
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client.setblocking(False)
+        client.connect_ex(pair)
+        clients.append(client)
+    try:
+        assert PortScanner(timeout=0.5).scan([pair])[pair] == (PortScanner.TIMEOUT, None)
+    finally:
+        for client in clients:
+            client.close()
+        server.close()
+
+
+def test_out_of_range_port_is_closed():
+    pair = ("127.0.0.1", 70000)
+    assert PortScanner(timeout=1).scan([pair])[pair] == (PortScanner.CLOSED, None)
+
+
+def test_duplicates_and_mixed(listener):
+    open_pair = ("127.0.0.1", listener.getsockname()[1])
+    closed_pair = ("127.0.0.1", get_free_port())
+    result = PortScanner(timeout=2, max_in_flight=1).scan([open_pair, closed_pair, open_pair])
+    assert set(result) == {open_pair, closed_pair}
+    assert result[open_pair][0] == PortScanner.OPEN
+    assert result[closed_pair][0] == PortScanner.CLOSED
@@ -0,0 +1,87 @@
+# -*- coding:utf-8 -*-
+"""
+ShardedSiteStatusChecker with two local shard processes against loopback targets:
+the results of the shards are merged, every site stays on its shard across passes
+and the sites of a failed shard are checked by the other one
+"""
+import threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from checker import config
+from checker.shard import HashRing, ShardedSiteStatusChecker
+from checker.units.exceptions import CheckerException
+from checker.units.result import CheckResult
+
+SITES = 12
+
+
+class OKHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OKHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # the local shards are started with the settings of this config module
+    monkeypatch.setattr(config, "CONNECTIVITY_URL", "http://127.0.0.1:{0}/".format(server.server_address[1]))
+    monkeypatch.setattr(config, "TIMEOUT_DEFAULT", 1)
+
+    path = tmp_path / "sites.csv"
+    path.write_text(
+        "Host;Ports\n" + "".join("http://localhost/{0};{1}\n".format(index, index + 1) for index in range(SITES)),
+        encoding="utf-8"
+    )
+    worker = ShardedSiteStatusChecker(str(path))
+    worker.PROCESSES = 2
+    worker.WORKERS = 4
+    yield worker
+    worker.close()
+    server.shutdown()
+    server.server_close()
+
+
+def get_hosts(values: list) -> list[str]:
+    return sorted(value.host for value in values if isinstance(value, CheckResult))
+
+
+def test_results_are_merged(worker):
+    values = list(worker())
+
+    assert get_hosts(values) == sorted("http://localhost/{0}".format(index) for index in range(SITES))
+    assert values[-1].startswith("shards: 2")
+    assert sum(client.sent for client in worker.clients) == SITES
+
+
+def test_assignment_is_stable(worker):
+    list(worker())
+    first = {client.node: client.sent for client in worker.clients}
+    list(worker())
+    second = {client.node: client.sent for client in worker.clients}
+
+    ring = HashRing([client.node for client in worker.clients], replicas=worker.REPLICAS)
+    expected = dict.fromkeys(first, 0)
+    for reader in worker.units:
+        expected[ring.get_node(str(reader.key))] += 1
+    assert first == second == expected
+
+
+def test_sites_of_a_failed_shard_are_moved(worker):
+    list(worker())
+    worker.processes[0].kill()
+    worker.processes[0].join()
+    values = list(worker())
+
+    assert get_hosts(values) == sorted("http://localhost/{0}".format(index) for index in range(SITES))
+    assert any(isinstance(value, CheckerException) and "local-0" in str(value) for value in values)
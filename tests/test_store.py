@@ -0,0 +1,40 @@
+# -*- coding:utf-8 -*-
+"""
+ResultStore: pings without reply are stored as unknown RTT and the buffer is flushed by a timer
+"""
+import math
+import time
+
+from datetime import datetime, timezone
+
+from checker.store import ResultStore
+from checker.units.reader import ReadObject
+from checker.units.result import CheckResult
+
+
+def test_no_reply_is_not_an_rtt(tmp_path):
+    store = ResultStore(str(tmp_path), flush_interval=0)
+    target = ReadObject("a.test", "80")
+    store.append_result(target, CheckResult("a.test", "a.test", "127.0.0.2", 12.5, False, 80, True))
+    store.append_result(target, CheckResult("a.test", "a.test", "127.0.0.2", CheckResult.NO_REPLY, False, 80, False))
+    store.close()
+
+    rtts = [record[4] for record in store.read_raw(datetime.now(timezone.utc))]
+    assert rtts[0] == 12.5 and math.isnan(rtts[1])
+
+    now = time.time()
+    hours = store.read_hours("a.test", now - 3600, now)
+    assert sum(hour[1] for hour in hours) == 2
+    assert max(hour[5] for hour in hours) == 12.5
+    assert store.percentile("a.test", 99, now - 3600, now) <= 12.5
+
+
+def test_buffer_is_flushed_by_the_timer(tmp_path):
+    store = ResultStore(str(tmp_path), batch=1000, flush_interval=0.1)
+    store.append("a.test", "127.0.0.2", 80, 1.0)
+
+    deadline = time.monotonic() + 5
+    while not list(store.read_raw(datetime.now(timezone.utc))) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(list(store.read_raw(datetime.now(timezone.utc)))) == 1
+    store.close()
@@ -0,0 +1,91 @@
+# -*- coding:utf-8 -*-
+"""
+TLSInspector against a local TLS server whose certificate is replaced (openssl is required)
+"""
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+
+from threading import Thread
+
+import pytest
+
+from checker.units.tls import TLSInspector
+
+SNI = "tls.test"
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl is required")
+
+
+def openssl(*args: str) -> None:
+    subprocess.run(("openssl",) + args, check=True, capture_output=True)
+
+
+@pytest.fixture(scope="module")
+def pki(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("pki"))
+    ca, ca_key = os.path.join(directory, "ca.pem"), os.path.join(directory, "ca.key")
+    ext = os.path.join(directory, "server.ext")
+    with open(ext, "w") as file:
+        file.write("subjectAltName=DNS:{0}\n".format(SNI))
+    openssl("req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", ca_key, "-out", ca, "-days", "1", "-subj", "/CN=test-ca")
+
+    chains = []
+    for name in ("first", "second"):
+        cert, key = os.path.join(directory, name + ".pem"), os.path.join(directory, name + ".key")
+        csr = os.path.join(directory, name + ".csr")
+        openssl("req", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", csr, "-subj", "/CN=" + SNI)
+        openssl(
+            "x509", "-req", "-in", csr, "-CA", ca, "-CAkey", ca_key, "-CAcreateserial", "-out", cert,
+            "-days", "1", "-extfile", ext
+        )
+        chains.append((cert, key))
+    return ca, chains
+
+
+@pytest.fixture
+def server(pki):
+    ca, chains = pki
+    # one context for the whole test: the session tickets stay valid when the certificate is replaced
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(*chains[0])
+    listener = socket.create_server(("127.0.0.1", 0))
+
+    def serve() -> None:
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            try:
+                with context.wrap_socket(conn, server_side=True) as tls:
+                    tls.settimeout(2)
+                    while tls.recv(1024):
+                        pass
+            except (OSError, ssl.SSLError):
+                pass
+
+    Thread(target=serve, daemon=True).start()
+    yield context, listener.getsockname()[1], ca, chains
+    listener.close()
+
+
+def test_replaced_certificate_is_picked_up(server):
+    context, port, ca, chains = server
+    inspector = TLSInspector(ttl=3600, refresh_days=0, size=10, ticket_wait=0.5)
+    inspector.context = ssl.create_default_context(cafile=ca)
+
+    first = inspector.inspect("127.0.0.1", SNI, 2, port)
+    assert first.valid and not first.resumed
+    # the session of a fresh certificate is resumed
+    assert inspector.handshake("127.0.0.1", SNI, 2, port).resumed
+
+    context.load_cert_chain(*chains[1])
+    assert inspector.inspect("127.0.0.1", SNI, 2, port) is inspector.get("127.0.0.1", SNI)
+
+    inspector.ttl = 0
+    second = inspector.inspect("127.0.0.1", SNI, 2, port)
+    assert second.valid and not second.resumed
+    assert second.fingerprint != first.fingerprint